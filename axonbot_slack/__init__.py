@@ -1,6 +1,36 @@
 """Axonbot plugin package for slack-machine."""
 from . import version
+from . import caches
+from . import catalog
+from . import exports
+from . import jobs
+from . import mirror
+from . import netindex
+from . import routes
+from . import schedules
+from . import schema
+from . import sessions
+from . import storage
+from . import uploads
+from . import watches
 from . import main
 from . import cli
 
-__all__ = ("version", "main", "cli")
+__all__ = (
+    "version",
+    "caches",
+    "catalog",
+    "exports",
+    "jobs",
+    "mirror",
+    "netindex",
+    "routes",
+    "schedules",
+    "schema",
+    "sessions",
+    "storage",
+    "uploads",
+    "watches",
+    "main",
+    "cli",
+)
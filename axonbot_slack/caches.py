@@ -0,0 +1,327 @@
+"""Caches used by axonbot_slack to avoid repeating calls to Axonius."""
+import collections
+import sys
+import threading
+import time
+
+import cachetools
+
+from . import exports
+
+SIZE_SAMPLE = 100
+""":obj:`int`: Items of a list to measure when estimating its size in bytes."""
+
+
+def estimate_size(obj):
+    """Estimate the bytes used by obj and everything it contains.
+
+    Only the first :data:`SIZE_SAMPLE` items of a list or tuple are measured, and
+    the rest are assumed to be the same average size.
+    """
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)) and obj:
+        sample = obj[:SIZE_SAMPLE]
+        measured = sum(estimate_size(x) for x in sample)
+        size += measured * len(obj) // len(sample)
+    return size
+
+
+class _Flight(object):
+    """A call in progress that other callers for the same key can wait on."""
+
+    def __init__(self):
+        """Pass."""
+        self.event = threading.Event()
+        self.value = None
+        self.exc = None
+
+
+class SingleFlightCache(object):
+    """TTL cache where concurrent misses for the same key share one call.
+
+    The first caller to miss on a key runs the fetch, every other caller that
+    asks for the same key while that fetch is running waits for it and gets the
+    same value (or the same exception).
+    """
+
+    def __init__(self, ttl, clock=time.monotonic):
+        """Pass."""
+        self.ttl = ttl
+        self.clock = clock
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "refreshes": 0}
+        self._entries = {}
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, fetch, refresh=False):
+        """Get the value for key, calling fetch on a miss.
+
+        Returns:
+            :obj:`tuple` of value, seconds since the value was fetched
+
+        """
+        with self._lock:
+            now = self.clock()
+            entry = self._entries.get(key)
+
+            if refresh:
+                self.stats["refreshes"] += 1
+            elif entry and now - entry[1] < self.ttl:
+                self.stats["hits"] += 1
+                return entry[0], now - entry[1]
+
+            flight = self._flights.get(key)
+            if flight:
+                self.stats["coalesced"] += 1
+                leader = False
+            else:
+                self.stats["misses"] += 1
+                flight = self._flights[key] = _Flight()
+                leader = True
+
+        if leader:
+            try:
+                flight.value = fetch()
+            except Exception as exc:
+                flight.exc = exc
+            with self._lock:
+                if flight.exc is None:
+                    self._entries[key] = (flight.value, self.clock())
+                del self._flights[key]
+            flight.event.set()
+        else:
+            flight.event.wait()
+
+        if flight.exc is not None:
+            raise flight.exc
+        return flight.value, 0.0
+
+    def clear(self, key=None):
+        """Drop one key, or every key if key is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+class ResultCache(object):
+    """Encoded exports keyed by what was asked for, bounded by total bytes.
+
+    Keys cover the object type, the query or field/value/regex, the response
+    fields and the export format, so identical requests from any thread or
+    channel can be answered without asking Axonius again. Entries are evicted
+    least recently used first once the total size goes over maxsize bytes, and
+    expire after ttl seconds.
+    """
+
+    def __init__(self, maxsize, ttl, clock=time.monotonic):
+        """Pass."""
+        self.maxsize = maxsize
+        self.clock = clock
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "invalidations": 0}
+        self._lock = threading.Lock()
+        self._cache = cachetools.TTLCache(
+            maxsize=maxsize or 1, ttl=ttl, getsizeof=lambda x: x["size"]
+        )
+
+    @staticmethod
+    def fields_key(response_fields):
+        """Build a hashable key from response fields."""
+        return tuple(sorted((k, tuple(v)) for k, v in response_fields.items()))
+
+    def get(self, key):
+        """Get a cached export for key, or None."""
+        if not self.maxsize:
+            return None
+
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+
+        return exports.CachedExport(
+            fmt=entry["fmt"],
+            data=entry["data"],
+            context=entry["context"],
+            row_count=entry["row_count"],
+            age=self.clock() - entry["created"],
+        )
+
+    def put(self, key, api_type, export):
+        """Cache an export if it fits, rewinding it for the caller."""
+        if not self.maxsize or export.size > self.maxsize:
+            return
+
+        data = export.fh.read()
+        export.fh.seek(0)
+
+        entry = {
+            "api_type": api_type,
+            "fmt": export.fmt,
+            "data": data,
+            "context": export.context,
+            "row_count": export.row_count,
+            "created": self.clock(),
+            "size": len(data),
+        }
+        with self._lock:
+            self._cache[key] = entry
+            self.stats["stores"] += 1
+
+    def invalidate(self, api_type):
+        """Drop every entry for an object type."""
+        with self._lock:
+            for key, entry in list(self._cache.items()):
+                if entry["api_type"] == api_type:
+                    del self._cache[key]
+                    self.stats["invalidations"] += 1
+
+    @property
+    def currsize(self):
+        """Get the total bytes currently cached."""
+        return self._cache.currsize
+
+
+class ThreadCache(object):
+    """Thread context for thread sub-commands, bounded by total bytes.
+
+    Each entry maps a thread_ts to the object type, context rows, and request of
+    the result uploaded into that thread. Once the estimated total size goes over
+    maxsize bytes, the least recently used entries are first trimmed down to
+    just their internal_axon_id values, which is all that labels need, and
+    only dropped if that is still not enough. Entries expire ttl seconds after
+    they were stored.
+    """
+
+    ID_KEY = "internal_axon_id"
+
+    def __init__(self, maxsize, ttl, clock=time.monotonic):
+        """Pass."""
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.currsize = 0
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "trims": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """Pass."""
+        return len(self._entries)
+
+    def has(self, key):
+        """Check if key has an entry that has not expired, without counting a hit."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and not self._expired(entry)
+
+    def get(self, key):
+        """Get the entry for key, or None.
+
+        Returns:
+            :obj:`dict`: with api_type, rows, row_count, request, age, and trimmed
+
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(entry):
+                self._drop(key, "expirations")
+                entry = None
+
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+
+        if entry["trimmed"]:
+            rows = [{self.ID_KEY: x} for x in entry["rows"]]
+        else:
+            rows = entry["rows"]
+
+        return {
+            "api_type": entry["api_type"],
+            "rows": rows,
+            "row_count": entry["row_count"],
+            "request": entry["request"],
+            "age": self.clock() - entry["created"],
+            "trimmed": entry["trimmed"],
+        }
+
+    def put(self, key, api_type, rows, request=None, row_count=None):
+        """Store the context rows for key, evicting others to stay in budget.
+
+        row_count is the number of rows uploaded to the thread, when context was
+        only kept for some of them.
+        """
+        entry = {
+            "api_type": api_type,
+            "rows": rows,
+            "row_count": len(rows) if row_count is None else row_count,
+            "request": request,
+            "created": self.clock(),
+            "trimmed": False,
+        }
+        entry["size"] = estimate_size(rows) + estimate_size(request)
+
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = entry
+            self.currsize += entry["size"]
+            self.stats["stores"] += 1
+            self._shrink()
+
+    def update(self, key, rows):
+        """Replace the rows for key without changing when it expires."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            size = estimate_size(rows) + estimate_size(entry["request"])
+            self.currsize += size - entry["size"]
+            entry.update(rows=rows, size=size, trimmed=False)
+            self._shrink()
+
+    def _expired(self, entry):
+        return self.clock() - entry["created"] >= self.ttl
+
+    def _drop(self, key, stat=None):
+        entry = self._entries.pop(key)
+        self.currsize -= entry["size"]
+        if stat:
+            self.stats[stat] += 1
+
+    def _trim(self, entry):
+        ids = tuple(x[self.ID_KEY] for x in entry["rows"] if self.ID_KEY in x)
+        size = estimate_size(ids) + estimate_size(entry["request"])
+        self.currsize += size - entry["size"]
+        entry.update(rows=ids, size=size, trimmed=True)
+        self.stats["trims"] += 1
+
+    def _shrink(self):
+        for key, entry in list(self._entries.items()):
+            if self.currsize <= self.maxsize:
+                return
+            if self._expired(entry):
+                self._drop(key, "expirations")
+            elif not entry["trimmed"]:
+                self._trim(entry)
+
+        for key in list(self._entries):
+            if self.currsize <= self.maxsize:
+                return
+            self._drop(key, "evictions")
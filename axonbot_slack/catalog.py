@@ -0,0 +1,162 @@
+"""Cached catalog of saved queries with a name index."""
+import bisect
+import logging
+import threading
+import time
+
+REFRESH = 5 * 60
+""":obj:`int`: Default seconds between refreshes of the catalog."""
+
+MISS_REFRESH = 30
+""":obj:`int`: Minimum age in seconds of a catalog before a lookup miss refreshes it."""
+
+logger = logging.getLogger(__name__)
+
+
+class AmbiguousName(Exception):
+    """Pass."""
+
+
+class _Snapshot(object):
+    """The saved queries of one type, indexed by name."""
+
+    def __init__(self, rows, built):
+        """Pass."""
+        self.built = built
+        self.rows = sorted(rows, key=lambda x: x["name"].lower())
+        self.keys = [x["name"].lower() for x in self.rows]
+        self.names = {}
+        self.lower = {}
+        for row in self.rows:
+            self.names[row["name"]] = row
+            self.lower.setdefault(row["name"].lower(), []).append(row)
+
+    def find(self, name):
+        """Get the saved queries named name, ignoring case, or starting with name."""
+        if name in self.names:
+            return [self.names[name]]
+
+        lower = name.lower()
+        if lower in self.lower:
+            return self.lower[lower]
+
+        start = bisect.bisect_left(self.keys, lower)
+        end = bisect.bisect_left(self.keys, lower + "\uffff")
+        return self.rows[start:end]
+
+
+class SavedQueryCatalog(object):
+    """Saved queries of each type, fetched once and refreshed in the background.
+
+    Names are looked up exactly first, then ignoring case, then as a prefix
+    ignoring case. A lookup that finds nothing refreshes the catalog if it is
+    older than miss_refresh seconds, so new saved queries can be used right
+    away. With refresh set to 0 the catalog is fetched for every lookup.
+    """
+
+    def __init__(
+        self, fetch, refresh=REFRESH, miss_refresh=MISS_REFRESH, clock=time.monotonic
+    ):
+        """Pass."""
+        self.fetch = fetch
+        self.refresh = refresh
+        self.miss_refresh = miss_refresh
+        self.clock = clock
+        self.stats = {
+            "lookups": 0,
+            "builds": 0,
+            "miss_builds": 0,
+            "errors": 0,
+            "build_seconds": 0.0,
+        }
+        self._snapshots = {}
+        self._lock = threading.Lock()
+        self._build_locks = {}
+        self._thread = None
+
+    def start(self, api_types):
+        """Fetch the catalog of api_types now and every refresh seconds in a thread."""
+        self._thread = threading.Thread(
+            target=self._run, args=(api_types,), name="axonbot_catalog"
+        )
+        self._thread.daemon = True
+        self._thread.start()
+
+    def rows(self, api_type):
+        """Get every saved query of api_type, sorted by name."""
+        return self._get(api_type).rows
+
+    def find(self, api_type, name):
+        """Get the saved query of api_type that matches name.
+
+        Returns:
+            :obj:`dict`: the saved query, or None if none match
+
+        Raises:
+            :exc:`AmbiguousName`: if name matches more than one saved query.
+
+        """
+        self._count("lookups")
+        snapshot = self._get(api_type)
+        found = snapshot.find(name)
+
+        if not found and self.clock() - snapshot.built >= self.miss_refresh:
+            self._count("miss_builds")
+            found = self.build(api_type).find(name)
+
+        if len(found) > 1:
+            msg = "Saved query {name!r} for {api_type} matches {count}: {names}"
+            msg = msg.format(
+                name=name,
+                api_type=api_type,
+                count=len(found),
+                names=", ".join(repr(x["name"]) for x in found[:10])
+                + (", ..." if len(found) > 10 else ""),
+            )
+            raise AmbiguousName(msg)
+        return found[0] if found else None
+
+    def build(self, api_type):
+        """Fetch every saved query of api_type and replace its catalog."""
+        with self._build_lock(api_type):
+            start = self.clock()
+            snapshot = _Snapshot(rows=self.fetch(api_type), built=self.clock())
+            took = self.clock() - start
+
+            with self._lock:
+                self._snapshots[api_type] = snapshot
+                self.stats["builds"] += 1
+                self.stats["build_seconds"] = took
+
+        m = "Fetched {count} saved queries for {api_type} in {took:.2f}s"
+        logger.debug(m.format(count=len(snapshot.rows), api_type=api_type, took=took))
+        return snapshot
+
+    def _get(self, api_type):
+        if not self.refresh:
+            return self.build(api_type)
+
+        snapshot = self._snapshots.get(api_type)
+        if snapshot is None:
+            # only the first lookup fetches, the others wait for it
+            with self._build_lock(api_type):
+                snapshot = self._snapshots.get(api_type) or self.build(api_type)
+        return snapshot
+
+    def _build_lock(self, api_type):
+        with self._lock:
+            return self._build_locks.setdefault(api_type, threading.RLock())
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _run(self, api_types):
+        while True:
+            for api_type in api_types:
+                try:
+                    self.build(api_type)
+                except Exception:
+                    self._count("errors")
+                    logger.exception("Error fetching saved queries for " + api_type)
+            time.sleep(self.refresh)
@@ -41,10 +41,16 @@ SLACK_SETUP_URL = "https://bit.ly/2LUE2ie"
 PROXY_URL = "https://bit.ly/315XZGp"
 FIELDS_URL = "https://bit.ly/31dUnlX"
 LOG_URL = "https://bit.ly/2Zpttqu"
+TUNING_URL = "https://axonbot-slack.readthedocs.io/en/latest/variables_optional.html"
 
 USER_FIELDS = "generic:labels,username,last_seen,mail"
 DEVICE_FIELDS = "generic:labels,hostname,network_interfaces,last_seen"
 
+STORAGE_BACKENDS = {
+    "memory": "machine.storage.backends.memory.MemoryStorage",
+    "sqlite": "axonbot_slack.storage.SqliteStorage",
+}
+
 VARINFOS = [
     {
         "var": "SLACK_API_TOKEN",
@@ -121,6 +127,343 @@ VARINFOS = [
         "default_value": "info",
         "check": "loglevel",
     },
+    {
+        "var": "AX_START_MODE",
+        "desc": "How to set up users and devices at startup (parallel, serial, lazy)",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "parallel",
+        "check": "choice",
+        "choices": ["parallel", "serial", "lazy"],
+    },
+    {
+        "var": "AX_START_TIMEOUT",
+        "desc": "Seconds that commands will wait for users or devices to be set up",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "300",
+        "check": "int",
+    },
+    {
+        "var": "AX_WORKERS",
+        "desc": "Number of get, saved query, and labels commands to run at once",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "4",
+        "check": "int",
+    },
+    {
+        "var": "AX_WORKER_QUEUE",
+        "desc": "Number of get, saved query, and labels commands that can wait to run",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "32",
+        "check": "int",
+    },
+    {
+        "var": "AX_WORKER_FULL",
+        "desc": "What to do with commands when the queue is full (reject, wait, inline)",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "reject",
+        "check": "choice",
+        "choices": ["reject", "wait", "inline"],
+    },
+    {
+        "var": "AX_FIELDS_TTL",
+        "desc": "Seconds to cache the known fields fetched from the Axonius instance",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "3600",
+        "check": "int",
+    },
+    {
+        "var": "AX_COUNT_TTL",
+        "desc": "Seconds to cache the results of the count commands",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "30",
+        "check": "int",
+    },
+    {
+        "var": "AX_RESULT_CACHE_TTL",
+        "desc": "Seconds to cache results of identical get and saved query commands",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "300",
+        "check": "int",
+    },
+    {
+        "var": "AX_RESULT_CACHE_SIZE",
+        "desc": "Maximum bytes of cached results, 0 to disable the result cache",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "67108864",
+        "check": "int",
+    },
+    {
+        "var": "AX_STORAGE",
+        "desc": "Where to keep bot and thread state (memory, sqlite)",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "memory",
+        "check": "choice",
+        "choices": ["memory", "sqlite"],
+    },
+    {
+        "var": "AX_STORAGE_PATH",
+        "desc": "Path of the SQLite file used when AX_STORAGE is sqlite",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "axonbot_slack.sqlite3",
+    },
+    {
+        "var": "AX_THREAD_CACHE_TTL",
+        "desc": "Seconds to keep thread context for thread commands",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "600",
+        "check": "int",
+    },
+    {
+        "var": "AX_THREAD_CACHE_SIZE",
+        "desc": "Maximum bytes of thread context before it is trimmed to IDs",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "16777216",
+        "check": "int",
+    },
+    {
+        "var": "AX_LABEL_BATCH_SIZE",
+        "desc": "Number of objects per batch when adding or deleting labels",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "1000",
+        "check": "int",
+    },
+    {
+        "var": "AX_LABEL_WORKERS",
+        "desc": "Number of label batches to send to Axonius at the same time",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "4",
+        "check": "int",
+    },
+    {
+        "var": "AX_LABEL_PROGRESS",
+        "desc": "Minimum seconds between label progress updates in a thread",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "15",
+        "check": "int",
+    },
+    {
+        "var": "AX_PREVIEW_THRESHOLD",
+        "desc": "Only return a preview when more objects than this match, 0 to disable",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "5000",
+        "check": "int",
+    },
+    {
+        "var": "AX_PREVIEW_ROWS",
+        "desc": "Number of objects to return in a preview or a page of more",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "25",
+        "check": "int",
+    },
+    {
+        "var": "AX_BULK_MAX",
+        "desc": "Maximum number of values in a single get command",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "1000",
+        "check": "int",
+    },
+    {
+        "var": "AX_BULK_BATCH_SIZE",
+        "desc": "Number of values to look up in each query of a bulk get command",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "50",
+        "check": "int",
+    },
+    {
+        "var": "AX_BULK_WORKERS",
+        "desc": "Number of bulk get queries to send to Axonius at the same time",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "4",
+        "check": "int",
+    },
+    {
+        "var": "AX_BULK_FILE_SIZE",
+        "desc": "Maximum bytes of a file of values attached to a get command",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "1048576",
+        "check": "int",
+    },
+    {
+        "var": "AX_NET_INDEX_REFRESH",
+        "desc": "Seconds between rebuilds of the device network index, 0 to disable",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "0",
+        "check": "int",
+    },
+    {
+        "var": "AX_MIRROR_REFRESH",
+        "desc": "Seconds between refreshes of the local mirror of users and devices, 0 to disable",  # noqa
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "0",
+        "check": "int",
+    },
+    {
+        "var": "AX_MIRROR_PATH",
+        "desc": "Path of the SQLite file used for the local mirror of users and devices",  # noqa
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "axonbot_slack_mirror.sqlite3",
+    },
+    {
+        "var": "AX_SAVED_QUERY_REFRESH",
+        "desc": "Seconds between refreshes of the cached saved queries, 0 to disable",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "300",
+        "check": "int",
+    },
+    {
+        "var": "AX_WATCH_WORKERS",
+        "desc": "Number of watched saved queries that can be polled at the same time",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "2",
+        "check": "int",
+    },
+    {
+        "var": "AX_WATCH_MIN_INTERVAL",
+        "desc": "Minimum seconds between polls of a watched saved query",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "60",
+        "check": "int",
+    },
+    {
+        "var": "AX_WATCH_MAX_FAILURES",
+        "desc": "Number of failed polls in a row that stop a watched saved query",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "5",
+        "check": "int",
+    },
+    {
+        "var": "AX_SCHEDULE_WORKERS",
+        "desc": "Number of scheduled saved query reports that can run at the same time",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "2",
+        "check": "int",
+    },
+    {
+        "var": "AX_SCHEDULE_JITTER",
+        "desc": "Maximum random seconds to delay the start of each scheduled report",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "60",
+        "check": "int",
+    },
+    {
+        "var": "AX_HTTP_POOL_SIZE",
+        "desc": "Number of connections to keep open to the Axonius instance",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "20",
+        "check": "int",
+    },
+    {
+        "var": "AX_HTTP_RETRIES",
+        "desc": "Number of times to retry requests to the Axonius instance that fail",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "3",
+        "check": "int",
+    },
+    {
+        "var": "AX_HTTP_BACKOFF",
+        "desc": "Backoff factor in seconds between retries of requests to the Axonius instance",  # noqa
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "1",
+        "check": "float",
+    },
+    {
+        "var": "AX_HTTP_CONNECT_TIMEOUT",
+        "desc": "Seconds to wait for a connection to the Axonius instance",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "5",
+        "check": "int",
+    },
+    {
+        "var": "AX_HTTP_READ_TIMEOUT",
+        "desc": "Seconds to wait for a response from the Axonius instance",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "60",
+        "check": "int",
+    },
+    {
+        "var": "AX_KEEPALIVE",
+        "desc": "Seconds between health checks of the Axonius session, 0 to disable",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "60",
+        "check": "int",
+    },
+    {
+        "var": "AX_UPLOAD_RATE",
+        "desc": "Uploads per minute sent to Slack, the files.upload rate limit",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "20",
+        "check": "int",
+    },
+    {
+        "var": "AX_UPLOAD_BURST",
+        "desc": "Number of uploads that can be sent to Slack back to back",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "5",
+        "check": "int",
+    },
+    {
+        "var": "AX_UPLOAD_RETRIES",
+        "desc": "Number of times to retry an upload that Slack failed",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "3",
+        "check": "int",
+    },
+    {
+        "var": "AX_EXPORT_FORMAT",
+        "desc": "Default format of uploaded results (json, compact, ndjson, csv, *.gz)",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "json",
+        "check": "export_format",
+    },
+    {
+        "var": "AX_EXPORT_SPOOL_SIZE",
+        "desc": "Bytes of an export to hold in memory before spooling to disk",
+        "url": TUNING_URL,
+        "req": False,
+        "default_value": "8388608",
+        "check": "int",
+    },
 ]
 
 DOT_VAR_TMPL = """
@@ -259,11 +602,66 @@ def patch_import_settings(settings):
     machine.singletons.import_settings = import_settings
 
 
+def get_int(value, var):
+    """Pass."""
+    try:
+        value = int(value)
+    except Exception:
+        text = "Invalid integer {value!r} in variable {var}"
+        text = text.format(value=value, var=var)
+        click.echo(style_bold(text, "red"))
+        sys.exit(1)
+    return value
+
+
+def get_float(value, var):
+    """Pass."""
+    try:
+        value = float(value)
+    except Exception:
+        text = "Invalid number {value!r} in variable {var}"
+        text = text.format(value=value, var=var)
+        click.echo(style_bold(text, "red"))
+        sys.exit(1)
+    return value
+
+
+def get_export_format(value, var):
+    """Pass."""
+    try:
+        axonbot_slack.exports.parse_format(value)
+    except axonbot_slack.exports.ExportError as exc:
+        text = "Invalid export format in variable {var}: {exc}"
+        text = text.format(var=var, exc=exc)
+        click.echo(style_bold(text, "red"))
+        sys.exit(1)
+    return value
+
+
+def get_choice(value, var, choices):
+    """Pass."""
+    value = value.strip().lower()
+    if value not in choices:
+        text = "Invalid value {value!r} in variable {var}, valid values: {valid}"
+        text = text.format(value=value, var=var, valid=", ".join(choices))
+        click.echo(style_bold(text, "red"))
+        sys.exit(1)
+    return value
+
+
 def check_var(varinfo, value):
     """Pass."""
     check = varinfo.get("check", "")
     if check == "loglevel":
         value = get_loglvl(lvl=value, var=varinfo["var"])
+    elif check == "int":
+        value = get_int(value=value, var=varinfo["var"])
+    elif check == "float":
+        value = get_float(value=value, var=varinfo["var"])
+    elif check == "choice":
+        value = get_choice(value=value, var=varinfo["var"], choices=varinfo["choices"])
+    elif check == "export_format":
+        value = get_export_format(value=value, var=varinfo["var"])
     return value
 
 
@@ -317,7 +715,7 @@ def load_settings(ctx):
         click.echo(rerun)
         sys.exit(1)
 
-    settings["STORAGE_BACKEND"] = "machine.storage.backends.memory.MemoryStorage"
+    settings["STORAGE_BACKEND"] = STORAGE_BACKENDS[settings["AX_STORAGE"]]
     settings["PLUGINS"] = [
         "axonbot_slack.main.AxonBotSlack",
         "machine.plugins.builtin.help.HelpPlugin",
@@ -334,6 +732,11 @@ ENV_HELP = (
     "if environment variable 'AX_DOTENV' is not set and this is not supplied."
 ).format(env=format(DEFAULT_ENV))
 
+TUNING_HELP = (
+    "Also prompt for the optional tuning variables, which use their default values "
+    "until they are set."
+)
+
 
 @click.group()
 @click.option(
@@ -352,10 +755,13 @@ def cli(ctx, env):
 
 
 @cli.command()
+@click.option("--tuning", is_flag=True, default=False, help=TUNING_HELP)
 @click.pass_context
-def config(ctx):
+def config(ctx, tuning):
     """Used to configure axonbot_slack."""
     for varinfo in VARINFOS:
+        if varinfo["url"] == TUNING_URL and not tuning:
+            continue
         prompt_var(ctx, varinfo)
 
 
@@ -0,0 +1,297 @@
+"""Streaming export helpers for uploading result rows to Slack."""
+import collections
+import csv
+import gzip
+import io
+import json
+import tempfile
+
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+""":obj:`int`: Bytes to hold in memory before an export spools to disk."""
+
+CONTEXT_KEYS = ["internal_axon_id", "labels"]
+""":obj:`list` of :obj:`str`: Row keys kept as thread context for labels."""
+
+DEFAULT_FORMAT = "json"
+""":obj:`str`: Export format used when none is supplied."""
+
+GZIP_POSTFIX = ".gz"
+""":obj:`str`: Postfix of an export format that enables gzip compression."""
+
+CSV_JOIN = "\n"
+""":obj:`str`: Used to join multiple values into a single CSV cell."""
+
+COMPACT = (",", ":")
+""":obj:`tuple`: Separators passed to json.dumps for compact encoding."""
+
+
+class ExportError(Exception):
+    """Pass."""
+
+
+def context_row(row):
+    """Reduce a row down to the keys needed for thread sub-commands."""
+    return {k: row[k] for k in CONTEXT_KEYS if k in row}
+
+
+def flatten(obj, prefix="", into=None):
+    """Flatten nested dicts and lists of dicts into dotted keys.
+
+    Lists of values found under the same dotted key are merged, so a row with
+    network_interfaces=[{"ips": [a]}, {"ips": [b, c]}] becomes
+    network_interfaces.ips=[a, b, c].
+    """
+    into = collections.OrderedDict() if into is None else into
+
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            flatten(obj=value, prefix=prefix + "." + key if prefix else key, into=into)
+    elif isinstance(obj, (list, tuple)):
+        for value in obj:
+            flatten(obj=value, prefix=prefix, into=into)
+        if not obj:
+            into.setdefault(prefix, [])
+    else:
+        into.setdefault(prefix, []).append(obj)
+    return into
+
+
+def cell(value):
+    """Format a single value for a CSV cell."""
+    return "" if value is None else format(value)
+
+
+class JsonWriter(object):
+    """Write rows as a JSON array."""
+
+    extension = ".json"
+
+    def __init__(self, write, indent=None):
+        """Pass."""
+        self.write = write
+        self.indent = indent
+        self.count = 0
+
+    def start(self):
+        """Pass."""
+        self.write("[")
+
+    def write_row(self, row):
+        """Pass."""
+        if self.indent:
+            # match json.dumps(rows, indent=N) by nesting each row one level deeper
+            pad = " " * self.indent
+            encoded = json.dumps(row, indent=self.indent).replace("\n", "\n" + pad)
+            sep = ",\n" if self.count else "\n"
+            self.write(sep + pad + encoded)
+        else:
+            sep = "," if self.count else ""
+            self.write(sep + json.dumps(row, separators=COMPACT))
+        self.count += 1
+
+    def finish(self):
+        """Pass."""
+        self.write("\n]" if self.indent and self.count else "]")
+
+
+class NdjsonWriter(object):
+    """Write rows as newline delimited JSON, one row per line."""
+
+    extension = ".ndjson"
+
+    def __init__(self, write):
+        """Pass."""
+        self.write = write
+
+    def start(self):
+        """Pass."""
+
+    def write_row(self, row):
+        """Pass."""
+        self.write(json.dumps(row, separators=COMPACT) + "\n")
+
+    def finish(self):
+        """Pass."""
+
+
+class CsvWriter(object):
+    """Write rows as CSV with nested fields flattened into dotted columns.
+
+    Columns are not known until every row has been seen, so flattened rows are
+    spooled to a scratch file on the first pass and written out as CSV once the
+    full set of columns is known.
+    """
+
+    extension = ".csv"
+
+    def __init__(self, write, spool_max_size=SPOOL_MAX_SIZE):
+        """Pass."""
+        self.write = write
+        self.columns = collections.OrderedDict()
+        self.scratch = tempfile.SpooledTemporaryFile(max_size=spool_max_size, mode="w+")
+
+    def start(self):
+        """Pass."""
+
+    def write_row(self, row):
+        """Pass."""
+        flat = flatten(row)
+        for column in flat:
+            self.columns.setdefault(column, None)
+        self.scratch.write(json.dumps(flat) + "\n")
+
+    def finish(self):
+        """Pass."""
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=list(self.columns))
+
+        def flush():
+            self.write(buf.getvalue())
+            buf.seek(0)
+            buf.truncate()
+
+        writer.writeheader()
+        flush()
+
+        self.scratch.seek(0)
+        for line in self.scratch:
+            flat = json.loads(line)
+            writer.writerow(
+                {k: CSV_JOIN.join(cell(x) for x in v) for k, v in flat.items()}
+            )
+            flush()
+        self.scratch.close()
+
+
+FORMATS = {
+    "json": (JsonWriter, {"indent": 2}),
+    "compact": (JsonWriter, {}),
+    "ndjson": (NdjsonWriter, {}),
+    "csv": (CsvWriter, {}),
+}
+""":obj:`dict`: Export format names mapped to writer class and writer kwargs."""
+
+
+def parse_format(fmt):
+    """Split an export format like 'csv.gz' into a format name and gzip flag."""
+    fmt = (fmt or DEFAULT_FORMAT).strip().lower()
+    compress = fmt.endswith(GZIP_POSTFIX)
+    name = fmt[: -len(GZIP_POSTFIX)] if compress else fmt
+
+    if name not in FORMATS:
+        valid = sorted(FORMATS) + [x + GZIP_POSTFIX for x in sorted(FORMATS)]
+        msg = "Invalid export format {fmt!r}, valid formats: {valid}"
+        msg = msg.format(fmt=fmt, valid=", ".join(valid))
+        raise ExportError(msg)
+    return name, compress
+
+
+def extension(fmt):
+    """Get the file extension for an export format."""
+    name, compress = parse_format(fmt)
+    return FORMATS[name][0].extension + (GZIP_POSTFIX if compress else "")
+
+
+class CachedExport(object):
+    """An export that was already encoded, restored from a result cache."""
+
+    def __init__(self, fmt, data, context, row_count, age=0.0):
+        """Pass."""
+        self.fmt = fmt
+        self.fh = io.BytesIO(data)
+        self.size = len(data)
+        self.context = context
+        self.row_count = row_count
+        self.age = age
+        self.extension = extension(fmt)
+
+    def __enter__(self):
+        """Pass."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Pass."""
+        self.close()
+
+    def filename(self, prefix):
+        """Build a filename for this export."""
+        return prefix + self.extension
+
+    def close(self):
+        """Pass."""
+        self.fh.close()
+
+
+class RowExport(object):
+    """Encode rows from a generator into a spooled temporary file.
+
+    Rows are encoded one at a time as they are yielded from the API client, so
+    the full list of rows and the full encoded document never need to be held in
+    memory at the same time. Thread context is only kept for the first
+    context_max rows, or for every row if context_max is None.
+    """
+
+    def __init__(
+        self, fmt=DEFAULT_FORMAT, spool_max_size=SPOOL_MAX_SIZE, context_max=None
+    ):
+        """Pass."""
+        self.fmt = fmt
+        self.context_max = context_max
+        self.fmt_name, self.compress = parse_format(fmt)
+        self.fh = tempfile.SpooledTemporaryFile(max_size=spool_max_size, mode="w+b")
+        self.row_count = 0
+        self.size = 0
+        self.context = []
+
+        if self.compress:
+            self._out = gzip.GzipFile(fileobj=self.fh, mode="wb")
+        else:
+            self._out = self.fh
+
+        writer_cls, writer_kwargs = FORMATS[self.fmt_name]
+        if writer_cls is CsvWriter:
+            writer_kwargs = dict(writer_kwargs, spool_max_size=spool_max_size)
+        self.writer = writer_cls(write=self._write, **writer_kwargs)
+
+    def __enter__(self):
+        """Pass."""
+        return self
+
+    def __exit__(self, *exc_info):
+        """Pass."""
+        self.close()
+
+    @property
+    def extension(self):
+        """Get the file extension for this export."""
+        return extension(self.fmt)
+
+    def filename(self, prefix):
+        """Build a filename for this export."""
+        return prefix + self.extension
+
+    def write_rows(self, rows):
+        """Consume rows and encode each one as it arrives."""
+        self.writer.start()
+
+        for row in rows:
+            if self.context_max is None or self.row_count < self.context_max:
+                self.context.append(context_row(row))
+            self.writer.write_row(row)
+            self.row_count += 1
+
+        self.writer.finish()
+
+        if self.compress:
+            self._out.close()
+
+        self.size = self.fh.tell()
+        self.fh.seek(0)
+        return self
+
+    def close(self):
+        """Release the spooled file."""
+        self.fh.close()
+
+    def _write(self, value):
+        self._out.write(value.encode("utf-8"))
@@ -0,0 +1,215 @@
+"""Bounded worker pool for slow commands."""
+import logging
+import queue
+import threading
+import time
+
+WORKERS = 4
+""":obj:`int`: Default number of worker threads."""
+
+QUEUE_SIZE = 32
+""":obj:`int`: Default number of jobs that can wait for a worker."""
+
+WHEN_FULL = ["reject", "wait", "inline"]
+""":obj:`list` of :obj:`str`: What to do with a job when the queue is full.
+
+* reject: raise :exc:`JobPoolFull`
+* wait: block the caller until there is room in the queue
+* inline: run the job in the caller's thread
+"""
+
+BATCH_SIZE = 1000
+""":obj:`int`: Default number of items per batch in :func:`run_batches`."""
+
+BATCH_WORKERS = 4
+""":obj:`int`: Default number of batches to run at the same time."""
+
+PROGRESS_INTERVAL = 15
+""":obj:`int`: Default minimum seconds between progress updates."""
+
+logger = logging.getLogger(__name__)
+
+
+class JobPoolFull(Exception):
+    """Pass."""
+
+
+class JobPool(object):
+    """Fixed number of worker threads pulling jobs from a bounded queue."""
+
+    def __init__(
+        self, workers=WORKERS, queue_size=QUEUE_SIZE, when_full=WHEN_FULL[0], name="job"
+    ):
+        """Pass."""
+        if when_full not in WHEN_FULL:
+            msg = "Invalid when_full {when_full!r}, valid values: {valid}"
+            msg = msg.format(when_full=when_full, valid=", ".join(WHEN_FULL))
+            raise ValueError(msg)
+
+        self.workers = workers
+        self.when_full = when_full
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "inline": 0,
+        }
+        self.active = 0
+        self._lock = threading.Lock()
+        self._threads = []
+
+        for idx in range(workers):
+            thread = threading.Thread(
+                target=self._work, name="axonbot_{}_{}".format(name, idx)
+            )
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    @property
+    def pending(self):
+        """Get the number of jobs waiting for or running on a worker."""
+        return self.queue.qsize() + self.active
+
+    def submit(self, method, **kwargs):
+        """Queue method to be called with kwargs by a worker.
+
+        Returns:
+            :obj:`int`: number of jobs ahead of this one, or None if it ran inline
+
+        """
+        ahead = self.pending
+        job = (method, kwargs)
+
+        try:
+            self.queue.put(job, block=self.when_full == "wait")
+        except queue.Full:
+            if self.when_full == "inline":
+                self._count("inline")
+                method(**kwargs)
+                return None
+
+            self._count("rejected")
+            msg = "Too busy working on {pending} other requests, try again later"
+            raise JobPoolFull(msg.format(pending=ahead))
+
+        self._count("submitted")
+        return max(ahead - self.workers + 1, 0)
+
+    def _count(self, stat, active=0):
+        with self._lock:
+            self.stats[stat] = self.stats.get(stat, 0) + 1
+            self.active += active
+
+    def _work(self):
+        while True:
+            method, kwargs = self.queue.get()
+            with self._lock:
+                self.active += 1
+            try:
+                method(**kwargs)
+            except Exception:
+                logger.exception("Error running job {}".format(method))
+                self._count("failed", active=-1)
+            else:
+                self._count("completed", active=-1)
+            finally:
+                self.queue.task_done()
+
+
+class BatchResult(object):
+    """Outcome of one batch run by :func:`run_batches`."""
+
+    def __init__(self, index, start, items):
+        """Pass."""
+        self.index = index
+        self.start = start
+        self.items = items
+        self.value = None
+        self.exc = None
+
+    @property
+    def count(self):
+        """Get the number of items in this batch."""
+        return len(self.items)
+
+    @property
+    def end(self):
+        """Get the position of the last item in this batch, counting from 1."""
+        return self.start + self.count
+
+
+def run_batches(
+    method,
+    items,
+    batch_size=BATCH_SIZE,
+    workers=BATCH_WORKERS,
+    progress=None,
+    interval=PROGRESS_INTERVAL,
+    clock=time.monotonic,
+):
+    """Call method with each batch of items, running up to workers batches at once.
+
+    A batch that raises is recorded in its result instead of stopping the others.
+    If progress is supplied, it is called with the number of batches done, the
+    total number of batches, and the number of items done, at most once every
+    interval seconds while batches are still running.
+
+    Returns:
+        :obj:`list` of :obj:`BatchResult`: in the same order as items
+
+    """
+    batch_size = max(batch_size, 1)
+    results = []
+    for start in range(0, len(items), batch_size):
+        end = start + batch_size
+        results.append(
+            BatchResult(index=len(results), start=start, items=items[start:end])
+        )
+    todo = iter(results)
+    lock = threading.Lock()
+    state = {"done": 0, "items": 0, "reported": clock()}
+
+    def work():
+        while True:
+            with lock:
+                result = next(todo, None)
+            if result is None:
+                return
+
+            try:
+                result.value = method(result.items)
+            except Exception as exc:
+                logger.exception("Error running batch {}".format(result.index + 1))
+                result.exc = exc
+
+            with lock:
+                state["done"] += 1
+                state["items"] += result.count
+                done, done_items = state["done"], state["items"]
+                report = (
+                    progress is not None
+                    and done < len(results)
+                    and clock() - state["reported"] >= interval
+                )
+                if report:
+                    state["reported"] = clock()
+
+            if report:
+                try:
+                    progress(done, len(results), done_items)
+                except Exception:
+                    logger.exception("Error reporting batch progress")
+
+    threads = [
+        threading.Thread(target=work, name="axonbot_batch_{}".format(idx))
+        for idx in range(min(max(workers, 1), len(results)))
+    ]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
@@ -1,9 +1,11 @@
 """Axonbot plugin package for slack-machine."""
 import datetime
-import json
 import logging
 import platform
+import re
 import sys
+import threading
+import time
 
 import axonius_api_client
 
@@ -11,22 +13,67 @@ from machine.plugins import base
 from machine.plugins import decorators
 from machine.utils import text
 from machine.slack import MessagingClient
-from machine.singletons import Slack
+from machine.singletons import Scheduler, Slack
 
-import cachetools
 import requests
 
-TTL_CACHE = cachetools.TTLCache(maxsize=512, ttl=10 * 60)
+from . import caches
+from . import catalog
+from . import exports
+from . import jobs
+from . import mirror
+from . import netindex
+from . import routes
+from . import schedules
+from . import schema
+from . import sessions
+from . import storage
+from . import uploads
+from . import watches
 
 LABELS_CMD = "labels "
 ADD_CMD = "add "
 DELETE_CMD = "delete "
+FULL_CMD = "full"
+MORE_CMD = "more"
 
 LABELS_SUB_CMDS = [
-    {"cmd": ADD_CMD, "action": "Added", "method": "add_labels_by_rows"},
-    {"cmd": DELETE_CMD, "action": "Deleted", "method": "delete_labels_by_rows"},
+    {
+        "cmd": ADD_CMD,
+        "action": "Added",
+        "method": "add_labels_by_rows",
+        "add": True,
+        "skip": "already had them",
+    },
+    {
+        "cmd": DELETE_CMD,
+        "action": "Deleted",
+        "method": "delete_labels_by_rows",
+        "add": False,
+        "skip": "did not have them",
+    },
 ]
 
+LABELS_FAILED_MAX = 5
+
+FORMAT_RE = r"(?:\s+format=(?P<fmt>\S+))?"
+VALUE_RE = r"(?:\s+(?!format=|fresh(?:\s|$))(?P<value>\S+))?"
+FRESH_RE = r"(?P<fresh>\s+fresh)?"
+VALUES_SPLIT_RE = re.compile(r"[\s,;\"']+")
+
+BULK_MAX = 1000
+BULK_BATCH_SIZE = 50
+BULK_WORKERS = 4
+BULK_FILE_SIZE = 1024 * 1024
+BULK_NOT_FOUND_MAX = 20
+
+FIELDS_TTL = 60 * 60
+COUNT_TTL = 30
+RESULT_CACHE_SIZE = 64 * 1024 * 1024
+RESULT_CACHE_TTL = 5 * 60
+THREAD_CACHE_SIZE = 16 * 1024 * 1024
+THREAD_CACHE_TTL = 10 * 60
+
 FIELDS_DEVICE = "generic:last_seen,labels,hostname,network_interfaces"
 FIELDS_DEVICE_EXAMPLE_LIST = [FIELDS_DEVICE, "aws:aws_device_type"]
 FIELDS_DEVICE_EXAMPLE = "example device fields: {!r}".format(
@@ -39,6 +86,29 @@ FIELDS_USER_EXAMPLE = "example user fields: {!r}".format(
     ";".join(FIELDS_USER_EXAMPLE_LIST)
 )
 
+FIELDS_EXAMPLES = {"users": FIELDS_USER_EXAMPLE, "devices": FIELDS_DEVICE_EXAMPLE}
+
+NET_INDEX_REFRESH = 0
+NET_INDEX_FINDERS = {
+    "network_interfaces.ips": "find_ip",
+    "network_interfaces.mac": "find_mac",
+}
+
+MIRROR_REFRESH = 0
+
+WATCH_REMOVED_MAX = 20
+
+CHANNEL_RE = re.compile(
+    r"^(?:<#(?P<mention>[A-Z0-9]+)(?:\|[^>]*)?>|(?P<id>[CG][A-Z0-9]+))$"
+)
+
+PREVIEW_THRESHOLD = 5000
+PREVIEW_ROWS = 25
+PAGE_SIZE = axonius_api_client.constants.DEFAULT_PAGE_SIZE
+
+START_MODES = ["parallel", "serial", "lazy"]
+START_TIMEOUT = 5 * 60
+
 logger = logging.getLogger(__name__)
 
 
@@ -73,6 +143,74 @@ def splitrip(obj, split):
     return vals
 
 
+def needs_labels(row, labels, add):
+    """Check if adding or deleting labels would change a row.
+
+    Rows without a labels key are assumed to need the change.
+    """
+    if row.get("labels") is None:
+        return True
+    have = set(row["labels"])
+    if add:
+        return not set(labels).issubset(have)
+    return not have.isdisjoint(labels)
+
+
+def change_labels(row, labels, add):
+    """Get a copy of row with labels added or deleted, if it knows its labels."""
+    if row.get("labels") is None:
+        return row
+    if add:
+        new_labels = row["labels"] + [x for x in labels if x not in row["labels"]]
+    else:
+        new_labels = [x for x in row["labels"] if x not in labels]
+    return dict(row, labels=new_labels)
+
+
+def split_values(text):
+    """Split a comma, semicolon, or whitespace seperated list of values."""
+    values = {}
+    for value in VALUES_SPLIT_RE.split(text or ""):
+        if value:
+            values.setdefault(value, None)
+    return list(values)
+
+
+def stats_text(stats):
+    """Format a dict of statistics as a single line."""
+    return ", ".join(
+        "{}={}".format(k, "{:.3f}".format(v) if isinstance(v, float) else v)
+        for k, v in stats.items()
+    )
+
+
+def did_you_mean(exc):
+    """Build the 'did you mean' part of an unknown name error."""
+    suggestions = getattr(exc, "suggestions", [])
+    if not suggestions:
+        return ""
+    return "did you mean: {}? ".format(", ".join(repr(x) for x in suggestions))
+
+
+def unknown_adapter_text(adapter, exc):
+    """Build the error text for an unknown adapter name."""
+    known_names = "\n\t" + "\n\t".join(["generic"] + exc.known_names)
+    msg = "No such adapter named {adapter!r}, {hint}valid adapter names: {known_names}"
+    return msg.format(adapter=adapter, hint=did_you_mean(exc), known_names=known_names)
+
+
+def unknown_field_text(field, adapter, exc):
+    """Build the error text for an unknown field name."""
+    known_names = "\n\t" + "\n\t".join(exc.known_names)
+    msg = (
+        "No such field named {field!r} available in adapter {adapter!r}, "
+        "{hint}valid field names: {known_names}"
+    )
+    return msg.format(
+        field=field, adapter=adapter, hint=did_you_mean(exc), known_names=known_names
+    )
+
+
 class AxonError(Exception):
     """Pass."""
 
@@ -147,12 +285,101 @@ class AxonConnection(object):
             settings.get("AX_FIELDS_DEVICE", FIELDS_DEVICE) or FIELDS_DEVICE
         )
         self.https_proxy = settings.get("AX_HTTPS_PROXY")
+        self.http_pool_size = settings.get("AX_HTTP_POOL_SIZE", sessions.POOL_SIZE)
+        self.http_retries = settings.get("AX_HTTP_RETRIES", sessions.RETRIES)
+        self.http_backoff = settings.get("AX_HTTP_BACKOFF", sessions.BACKOFF)
+        self.http_connect_timeout = settings.get(
+            "AX_HTTP_CONNECT_TIMEOUT", sessions.CONNECT_TIMEOUT
+        )
+        self.http_read_timeout = settings.get(
+            "AX_HTTP_READ_TIMEOUT", sessions.READ_TIMEOUT
+        )
+        self.keepalive = settings.get("AX_KEEPALIVE", sessions.KEEPALIVE)
+        self.session_stats = {
+            "checks": 0,
+            "check_errors": 0,
+            "reauths": 0,
+            "reauth_errors": 0,
+            "reauth_seconds": 0.0,
+            "max_reauth_seconds": 0.0,
+        }
+        self.reauth_lock = threading.Lock()
+        self.reauth_last = 0
+        self.fields_ttl = settings.get("AX_FIELDS_TTL", FIELDS_TTL)
+        # keyed by object type, so users and devices fields are fetched at once
+        self.fields_cache = caches.SingleFlightCache(ttl=self.fields_ttl)
+        self.fields_stats = self.fields_cache.stats
+        self.start_mode = settings.get("AX_START_MODE", START_MODES[0])
+        self.start_timeout = settings.get("AX_START_TIMEOUT", START_TIMEOUT)
+        self.start_timings = {}
+        self.start_errors = {}
+        self.api_types = {}
+        self.ready = {"users": threading.Event(), "devices": threading.Event()}
+
+    def start(self, mode=None):
+        """Login, then set up users and devices.
+
+        Modes:
+            serial: set up users then devices, wait for both.
+            parallel: set up users and devices at the same time, wait for both.
+            lazy: set up users and devices at the same time in the background,
+                anything that uses :attr:`users` or :attr:`devices` will wait for
+                that type to finish.
+        """
+        mode = mode or self.start_mode
+        if mode not in START_MODES:
+            msg = "Invalid start mode {mode!r}, valid modes: {modes}"
+            msg = msg.format(mode=mode, modes=", ".join(START_MODES))
+            raise AxonError(msg=msg, exc=None)
+
+        self.start_dt = datetime.datetime.utcnow()
+        self._timed(phase="login", method=self.login)
+
+        types = [
+            ("users", axonius_api_client.api.Users, self.user_fields),
+            ("devices", axonius_api_client.api.Devices, self.device_fields),
+        ]
 
-    def start(self):
+        if mode == "serial":
+            for name, api_cls, fields in types:
+                self._start_type(name=name, api_cls=api_cls, fields=fields)
+        else:
+            for name, api_cls, fields in types:
+                thread = threading.Thread(
+                    target=self._start_type,
+                    kwargs={"name": name, "api_cls": api_cls, "fields": fields},
+                    name="axonbot_start_{}".format(name),
+                )
+                thread.daemon = True
+                thread.start()
+
+        if mode != "lazy":
+            for name, api_cls, fields in types:
+                self.wait_ready(name=name)
+
+        self.start_timings["start"] = self._elapsed(self.start_dt)
+
+        if self.keepalive:
+            thread = threading.Thread(target=self._keepalive, name="axonbot_keepalive")
+            thread.daemon = True
+            thread.start()
+
+    def login(self):
         """Pass."""
         logging.getLogger("axonius_api_client").setLevel(self.log_level)
 
-        self.http_client = axonius_api_client.http.HttpClient(url=self.url)
+        self.http_client = sessions.ReauthHttpClient(
+            url=self.url,
+            connect_timeout=self.http_connect_timeout,
+            response_timeout=self.http_read_timeout,
+        )
+        self.http_adapter = sessions.PooledAdapter(
+            pool_size=self.http_pool_size,
+            retries=self.http_retries,
+            backoff=self.http_backoff,
+        )
+        self.http_client.session.mount("https://", self.http_adapter)
+        self.http_client.session.mount("http://", self.http_adapter)
         self.http_client.session.proxies = {}
         if self.https_proxy:
             self.http_client.session.proxies["https"] = self.https_proxy
@@ -161,29 +388,137 @@ class AxonConnection(object):
             self.auth_method = axonius_api_client.auth.AuthKey(
                 http_client=self.http_client, key=self.ax_key, secret=self.ax_secret
             )
-            self.auth_method.login()
+            self._login()
         except requests.exceptions.ConnectTimeout as exc:
             msg = "Unable to connect to Axonius Instance using {client}: {exc}"
             msg = msg.format(client=self.http_client, exc=exc)
             raise AxonError(msg=msg, exc=exc)
 
-        self.users = axonius_api_client.api.Users(auth=self.auth_method)
-        self.users._type = "users"
-        self.users._fields_example = FIELDS_USER_EXAMPLE
-        self.users.response_fields = self.parse_fields(
-            api_type=self.users, fields=self.user_fields, example=FIELDS_USER_EXAMPLE
-        )
+        self.http_client.reauth = self.reauth
+
+    def reauth(self, reason=None):
+        """Drop open connections and log in to the Axonius instance again.
+
+        Failures within a few seconds of the last re-login reuse it instead of
+        logging in again, so requests that fail together only log in once.
+        """
+        with self.reauth_lock:
+            if time.monotonic() - self.reauth_last < sessions.REAUTH_MIN_INTERVAL:
+                return
+
+            m = "Logging in to Axonius again after {reason}"
+            logger.warning(m.format(reason=reason))
+            start = time.monotonic()
+            try:
+                self.http_adapter.poolmanager.clear()
+                if self.auth_method.is_logged_in:
+                    self.auth_method.logout()
+                self._login()
+            except Exception:
+                self.session_stats["reauth_errors"] += 1
+                raise
+
+            # only a login that worked holds off the next one
+            self.reauth_last = time.monotonic()
+            took = self.reauth_last - start
+            self.session_stats["reauths"] += 1
+            self.session_stats["reauth_seconds"] = took
+            self.session_stats["max_reauth_seconds"] = max(
+                self.session_stats["max_reauth_seconds"], took
+            )
+
+    def _login(self):
+        # logout clears the session headers, so they are set before every login
+        self.http_client.session.headers["Accept-Encoding"] = sessions.ACCEPT_ENCODING
+        self.auth_method.login()
+
+    def _keepalive(self):
+        while True:
+            time.sleep(self.keepalive)
+            self._count_session(stat="checks")
+            try:
+                # the cheapest request there is: the ID of one device
+                self.get_page(
+                    api_type=self.devices,
+                    query=None,
+                    fields=["internal_axon_id"],
+                    offset=0,
+                    page_size=1,
+                )
+            except Exception as exc:
+                self._count_session(stat="check_errors")
+                logger.warning("Axonius health check failed: {}".format(exc))
+
+    def _count_session(self, stat):
+        with self.reauth_lock:
+            self.session_stats[stat] += 1
+
+    @property
+    def users(self):
+        """Get the users API object, waiting for it to finish setting up."""
+        return self.wait_ready(name="users")
+
+    @property
+    def devices(self):
+        """Get the devices API object, waiting for it to finish setting up."""
+        return self.wait_ready(name="devices")
+
+    def wait_ready(self, name, timeout=None):
+        """Wait for an API object to finish setting up and return it."""
+        timeout = self.start_timeout if timeout is None else timeout
+
+        if not self.ready[name].wait(timeout):
+            msg = "Timed out after {timeout} seconds waiting for {name} to start"
+            msg = msg.format(timeout=timeout, name=name)
+            raise AxonError(msg=msg, exc=None)
+
+        if name in self.start_errors:
+            exc = self.start_errors[name]
+            msg = "Unable to start {name}: {exc}"
+            msg = msg.format(name=name, exc=getattr(exc, "msg", exc))
+            raise AxonError(msg=msg, exc=exc)
 
-        self.devices = axonius_api_client.api.Devices(auth=self.auth_method)
-        self.devices._type = "devices"
-        self.devices._fields_example = FIELDS_DEVICE_EXAMPLE
-        self.devices.response_fields = self.parse_fields(
-            api_type=self.devices,
-            fields=self.device_fields,
-            example=FIELDS_DEVICE_EXAMPLE,
+        return self.api_types[name]
+
+    def _start_type(self, name, api_cls, fields):
+        try:
+            self._timed(
+                phase=name,
+                method=self._setup_type,
+                name=name,
+                api_cls=api_cls,
+                fields=fields,
+            )
+        except Exception as exc:
+            self.start_errors[name] = exc
+            msg = "Unable to start {name}: {exc}"
+            msg = msg.format(name=name, exc=getattr(exc, "msg", exc))
+            logger.error(msg)
+        finally:
+            self.ready[name].set()
+
+    def _setup_type(self, name, api_cls, fields):
+        example = FIELDS_EXAMPLES[name]
+        api_type = api_cls(auth=self.auth_method)
+        api_type._type = name
+        api_type._fields_example = example
+        api_type.response_fields = self.parse_fields(
+            api_type=api_type, fields=fields, example=example
         )
+        self.api_types[name] = api_type
 
-        self.start_dt = datetime.datetime.utcnow()
+    def _timed(self, phase, method, **kwargs):
+        start = datetime.datetime.utcnow()
+        try:
+            return method(**kwargs)
+        finally:
+            self.start_timings[phase] = self._elapsed(start)
+            m = "Axonius startup phase {phase!r} took {took:.2f} seconds"
+            logger.info(m.format(phase=phase, took=self.start_timings[phase]))
+
+    @staticmethod
+    def _elapsed(start):
+        return (datetime.datetime.utcnow() - start).total_seconds()
 
     def parse_fields(self, api_type, fields, example):
         """Pass."""
@@ -202,13 +537,36 @@ class AxonConnection(object):
                     new_fields[new_adapter] = []
 
                 if new_field not in new_fields[new_adapter]:
-                    new_fields[adapter].append(new_field)
+                    new_fields[new_adapter].append(new_field)
         return new_fields
 
+    def get_index(self, api_type, refresh=False):
+        """Get the field index for api_type, fetching fields at most once per TTL."""
+        index, _ = self.fields_cache.get(
+            key=api_type._type,
+            fetch=lambda: self._fetch_index(api_type=api_type),
+            refresh=refresh,
+        )
+        return index
+
+    def _fetch_index(self, api_type):
+        # the API client caches fields forever, clear it so we fetch a fresh copy
+        api_type._fields = None
+        index = schema.FieldIndex(known_fields=api_type.get_fields())
+
+        m = "Fetched {api_type} fields, cache stats: {stats}"
+        m = m.format(api_type=api_type._type, stats=self.fields_stats)
+        logger.debug(m)
+        return index
+
+    def get_fields(self, api_type, refresh=False):
+        """Get the field schema for api_type, fetching it at most once per TTL."""
+        return self.get_index(api_type=api_type, refresh=refresh).known_fields
+
     def find_field(self, api_type, adapter, field):
         """Pass."""
         try:
-            known_fields = api_type.get_fields()
+            index = self.get_index(api_type=api_type)
         except Exception as exc:
             msg = "Error fetching {api_type} fields: {exc}"
             msg = msg.format(api_type=api_type._type, exc=exc)
@@ -216,35 +574,11 @@ class AxonConnection(object):
             raise AxonError(msg, exc)
 
         try:
-            if adapter != "generic":
-                known_adapters = list(known_fields["specific"].keys())
-                adapter = axonius_api_client.api.utils.find_adapter(
-                    name=adapter, known_names=known_adapters
-                )
+            return index.find_field(name=field, adapter=adapter)
         except axonius_api_client.api.exceptions.UnknownAdapterName as exc:
-            known_names = "\n\t" + "\n\t".join(["generic"] + exc.known_names)
-            msg = (
-                "No such adapter named {adapter!r}, valid adapter names: {known_names}"
-            )
-            msg = msg.format(adapter=adapter, known_names=known_names)
-            raise AxonError(msg, exc)
-        except Exception as exc:
-            msg = "Error finding {api_type} adapter named {adapter!r}: {exc}"
-            msg = msg.format(api_type=api_type._type, adapter=adapter, exc=exc)
-            logger.exception(msg)
-            raise AxonError(msg, exc)
-
-        try:
-            field = axonius_api_client.api.utils.find_field(
-                name=field, adapter=adapter, fields=known_fields
-            )
+            raise AxonError(unknown_adapter_text(adapter=adapter, exc=exc), exc)
         except axonius_api_client.api.exceptions.UnknownFieldName as exc:
-            known_names = "\n\t" + "\n\t".join(exc.known_names)
-            msg = (
-                "No such field named {field!r} available in adapter {adapter!r}, "
-                "valid field names: {known_names}"
-            )
-            msg = msg.format(field=field, adapter=adapter, known_names=known_names)
+            msg = unknown_field_text(field=field, adapter=exc.adapter, exc=exc)
             raise AxonError(msg, exc)
         except Exception as exc:
             msg = "Error finding field {field!r} for adapter {adapter!r}: {exc}"
@@ -252,7 +586,43 @@ class AxonConnection(object):
             logger.exception(msg)
             raise AxonError(msg, exc)
 
-        return adapter, field
+    def get_page(self, api_type, query, fields, offset, page_size):
+        """Get one page of rows matching query, starting at offset."""
+        params = {"skip": offset, "limit": page_size, "fields": ",".join(fields)}
+        if query:
+            params["filter"] = query
+
+        router = getattr(axonius_api_client.api.routers.ApiV1, api_type._type)
+        response = self.http_client(method="get", path=router.root, params=params)
+        if response.status_code != 200:
+            raise axonius_api_client.api.exceptions.ResponseError(
+                response=response, exc=None, details=True, bodies=True
+            )
+        return response.json()["assets"]
+
+    def get_rows(self, api_type, query, fields, count=None, page_size=PAGE_SIZE):
+        """Get the rows matching query a page at a time.
+
+        With the count of matches already known, paging stops once that many rows
+        are seen, else it stops at the first page that is not full. Either way no
+        count is requested here.
+        """
+        offset = 0
+        while count is None or offset < count:
+            if count is not None:
+                page_size = min(page_size, count - offset)
+            page = self.get_page(
+                api_type=api_type,
+                query=query,
+                fields=fields,
+                offset=offset,
+                page_size=page_size,
+            )
+            for row in page:
+                yield row
+            offset += len(page)
+            if len(page) < page_size:
+                return
 
 
 @decorators.required_settings(["AX_URL", "AX_KEY", "AX_SECRET"])
@@ -262,9 +632,95 @@ class AxonBotSlack(base.MachineBasePlugin):
     def init(self):
         """Pass."""
         self.api = AxonConnection(settings=self.settings)
+        self.counts = caches.SingleFlightCache(
+            ttl=self.settings.get("AX_COUNT_TTL", COUNT_TTL)
+        )
+        self.jobs = jobs.JobPool(
+            workers=self.settings.get("AX_WORKERS", jobs.WORKERS),
+            queue_size=self.settings.get("AX_WORKER_QUEUE", jobs.QUEUE_SIZE),
+            when_full=self.settings.get("AX_WORKER_FULL", jobs.WHEN_FULL[0]),
+        )
+        self.results = caches.ResultCache(
+            maxsize=self.settings.get("AX_RESULT_CACHE_SIZE", RESULT_CACHE_SIZE),
+            ttl=self.settings.get("AX_RESULT_CACHE_TTL", RESULT_CACHE_TTL),
+        )
+        thread_cache_size = self.settings.get("AX_THREAD_CACHE_SIZE", THREAD_CACHE_SIZE)
+        thread_cache_ttl = self.settings.get("AX_THREAD_CACHE_TTL", THREAD_CACHE_TTL)
+        if self.settings.get("AX_STORAGE") == "sqlite":
+            self.threads = storage.SqliteThreadCache(
+                maxsize=thread_cache_size,
+                ttl=thread_cache_ttl,
+                path=self.settings.get("AX_STORAGE_PATH", storage.PATH),
+            )
+        else:
+            self.threads = caches.ThreadCache(
+                maxsize=thread_cache_size, ttl=thread_cache_ttl
+            )
+        self.net_index = netindex.NetIndex(
+            fetch=self._net_index_rows,
+            refresh=self.settings.get("AX_NET_INDEX_REFRESH", NET_INDEX_REFRESH),
+        )
+        mirror_refresh = self.settings.get("AX_MIRROR_REFRESH", MIRROR_REFRESH)
+        self.mirror = None
+        if mirror_refresh:
+            self.mirror = mirror.Mirror(
+                fetch=self._mirror_fetch,
+                refresh=mirror_refresh,
+                path=self.settings.get("AX_MIRROR_PATH", mirror.PATH),
+            )
+        self.saved_queries = catalog.SavedQueryCatalog(
+            fetch=self._saved_query_rows,
+            refresh=self.settings.get("AX_SAVED_QUERY_REFRESH", catalog.REFRESH),
+        )
+        self.watches = watches.Scheduler(
+            poll=self._poll_watch,
+            failed=self._watch_failed,
+            workers=self.settings.get("AX_WATCH_WORKERS", watches.WORKERS),
+            max_failures=self.settings.get(
+                "AX_WATCH_MAX_FAILURES", watches.MAX_FAILURES
+            ),
+        )
+        if self.settings.get("AX_STORAGE") == "sqlite":
+            schedule_store = schedules.SqliteStore(
+                db=storage.SqliteDb(
+                    path=self.settings.get("AX_STORAGE_PATH", storage.PATH),
+                    schema=schedules.SCHEMA,
+                )
+            )
+        else:
+            schedule_store = schedules.PluginStore(storage=self.storage)
+        self.reports = schedules.ReportScheduler(
+            run=self._run_report,
+            store=schedule_store,
+            scheduler=Scheduler.get_instance(),
+            workers=self.settings.get("AX_SCHEDULE_WORKERS", schedules.WORKERS),
+            jitter=self.settings.get("AX_SCHEDULE_JITTER", schedules.JITTER),
+        )
+        self.uploads = uploads.UploadQueue(
+            send=lambda **kwargs: Slack.get_instance().api_call(**kwargs),
+            rate=self.settings.get("AX_UPLOAD_RATE", uploads.RATE),
+            burst=self.settings.get("AX_UPLOAD_BURST", uploads.BURST),
+            retries=self.settings.get("AX_UPLOAD_RETRIES", uploads.RETRIES),
+        )
+        self.router = routes.Router(self)
+        self.bot_id = None
+        self.thread_events = {"handled": 0, "skipped": 0}
+        self.thread_events_lock = threading.Lock()
         self.api.start()
-        m = "Axonius connected: {auth_method}!"
-        m = m.format(auth_method=self.api.auth_method)
+        if self.net_index.refresh:
+            self.net_index.start()
+        if self.mirror:
+            self.mirror.start()
+        if self.saved_queries.refresh:
+            self.saved_queries.start(api_types=["users", "devices"])
+        self.reports.load()
+        m = "Axonius connected: {auth_method}! Startup timings: {timings}"
+        m = m.format(
+            auth_method=self.api.auth_method,
+            timings=", ".join(
+                "{}={:.2f}s".format(k, v) for k, v in self.api.start_timings.items()
+            ),
+        )
         text.announce(m)
 
     @property
@@ -293,7 +749,12 @@ class AxonBotSlack(base.MachineBasePlugin):
         uptime = datetime.datetime.utcnow() - self.api.start_dt
         return "Uptime: *{}*".format(format(uptime).split(".")[0])
 
-    @decorators.respond_to(regex=r"^hello$")
+    @decorators.respond_to(regex=r"")
+    def route_message(self, msg):
+        # every command is matched by self.router, no docstring to keep it out of help
+        self.router.dispatch(msg)
+
+    @routes.route(regex=r"^hello$")
     def hello(self, msg):
         """hello: Get a friendly message from skynet"""
         send_text = [
@@ -307,180 +768,509 @@ class AxonBotSlack(base.MachineBasePlugin):
         send_text = "\n".join(send_text)
         msg.reply(send_text)
 
-    @decorators.respond_to(regex=r"^count device$")
-    def count_device(self, msg):
-        """count device: Get the count of all devices in the system."""
-        count = self.api.devices.get_count()
-        send_text = "Total devices: {count}"
-        send_text = send_text.format(count=count)
+    @routes.route(regex=r"^stats$")
+    def stats(self, msg):
+        """stats: Get cache and worker statistics"""
+        send_text = [
+            "Thread cache: {count} threads, {size} of {maxsize} bytes, {stats}",
+            "Result cache: {results_size} of {results_maxsize} bytes, {results}",
+            "Count cache: {counts}",
+            "Fields cache: {fields}",
+            "Thread messages: {thread_events}",
+            "Network index: {net_index_size}, {net_index}",
+            "Mirror: {mirror}",
+            "Saved queries: {saved_queries}",
+            "Axonius HTTP: {http}",
+            "Axonius session: retried={retried}, {session}",
+            "Watches: {watch_count} active, {watches}",
+            "Reports: {report_count} scheduled, {reports}",
+            "Uploads: {upload_count} pending, {uploads}",
+            "Workers: {pending} pending, {jobs}",
+            "Commands: {router}",
+        ]
+        send_text = "\n".join(send_text).format(
+            count=len(self.threads),
+            size=self.threads.currsize,
+            maxsize=self.threads.maxsize,
+            stats=stats_text(self.threads.stats),
+            results_size=self.results.currsize,
+            results_maxsize=self.results.maxsize,
+            results=stats_text(self.results.stats),
+            counts=stats_text(self.counts.stats),
+            fields=stats_text(self.api.fields_stats),
+            thread_events=stats_text(self.thread_events),
+            net_index_size=stats_text(self.net_index.size),
+            net_index=stats_text(self.net_index.stats),
+            mirror=stats_text(self.mirror.stats) if self.mirror else "disabled",
+            saved_queries=stats_text(self.saved_queries.stats),
+            http=stats_text(self.api.http_adapter.stats),
+            retried=self.api.http_client.retried,
+            session=stats_text(self.api.session_stats),
+            watch_count=len(self.watches.watches),
+            watches=stats_text(self.watches.stats),
+            report_count=len(self.reports.schedules),
+            reports=stats_text(self.reports.stats),
+            upload_count=self.uploads.pending,
+            uploads=stats_text(self.uploads.stats),
+            pending=self.jobs.pending,
+            jobs=stats_text(self.jobs.stats),
+            router=stats_text(self.router.stats),
+        )
+        for route in self.router.routes:
+            if route.stats["calls"]:
+                line = "\n\t{name}: {stats}, avg_seconds={avg:.3f}"
+                send_text += line.format(
+                    name=route.name,
+                    stats=stats_text(route.stats),
+                    avg=route.stats["seconds"] / route.stats["calls"],
+                )
         msg.reply(send_text, in_thread=True)
 
-    @decorators.respond_to(regex=r"^count user$")
-    def count_user(self, msg):
-        """count user: Get the count of all users in the system."""
-        count = self.api.users.get_count()
-        send_text = "Total users: {count}"
-        send_text = send_text.format(count=count)
-        msg.reply(send_text, in_thread=True)
+    @routes.route(regex=r"^count device(?P<fresh> fresh)?$")
+    def count_device(self, msg, fresh=None):
+        """count device: Get the count of all devices in the system (add *fresh* to skip the cache and the mirror)."""  # noqa
+        self._count(msg=msg, api_type=self.api.devices, fresh=bool(fresh))
+
+    @routes.route(regex=r"^count user(?P<fresh> fresh)?$")
+    def count_user(self, msg, fresh=None):
+        """count user: Get the count of all users in the system (add *fresh* to skip the cache and the mirror)."""  # noqa
+        self._count(msg=msg, api_type=self.api.users, fresh=bool(fresh))
+
+    @routes.route(regex=r"^fields refresh$")
+    def fields_refresh(self, msg):
+        """fields refresh: Re-fetch the known fields for users and devices from Axonius."""  # noqa
+        lines = []
+        for api_type in [self.api.users, self.api.devices]:
+            try:
+                known_fields = self.api.get_fields(api_type=api_type, refresh=True)
+            except Exception as exc:
+                line = "Error fetching {api_type} fields: {exc}"
+                line = line.format(api_type=api_type._type, exc=exc)
+                logger.exception(line)
+            else:
+                line = "Refreshed {api_type} fields for {count} adapters"
+                line = line.format(
+                    api_type=api_type._type, count=len(known_fields["specific"]) + 1
+                )
+            lines.append(line)
 
-    @decorators.respond_to(regex=r"^fields user$")
+        line = "Field cache: {hits} hits, {misses} misses, {refreshes} refreshes"
+        lines.append(line.format(**self.api.fields_stats))
+        msg.reply("\n".join(lines), in_thread=True)
+
+    @routes.route(regex=r"^fields user$")
     def fields_user(self, msg):
         """fields user: Show the fields that will be returned in responses."""
         send_text = self._build_fields_text(api_type=self.api.users)
         msg.reply(send_text, in_thread=True)
 
-    @decorators.respond_to(regex=r"^fields user add (?P<adapter>\S+) (?P<field>\S+)")
+    @routes.route(regex=r"^fields user add (?P<adapter>\S+) (?P<field>\S+)")
     def fields_user_add(self, msg, adapter, field):
         """fields user add [adapter] [field]: Add an adapters field for user responses."""  # noqa
         self._field_add(msg=msg, api_type=self.api.users, adapter=adapter, field=field)
 
-    @decorators.respond_to(regex=r"^fields user delete (?P<adapter>\S+) (?P<field>\S+)")
+    @routes.route(regex=r"^fields user delete (?P<adapter>\S+) (?P<field>\S+)")
     def fields_user_delete(self, msg, adapter, field):
         """fields user delete [adapter] [field]: Delete an adapters field for user responses."""  # noqa
         self._field_del(msg=msg, api_type=self.api.users, adapter=adapter, field=field)
 
-    @decorators.respond_to(regex=r"^fields device$")
+    @routes.route(regex=r"^fields device$")
     def fields_device(self, msg):
         """fields device: Show the fields that will be returned in responses."""  # noqa
         send_text = self._build_fields_text(api_type=self.api.devices)
         msg.reply(send_text, in_thread=True)
 
-    @decorators.respond_to(regex=r"^fields device add (?P<adapter>\S+) (?P<field>\S+)")
+    @routes.route(regex=r"^fields device add (?P<adapter>\S+) (?P<field>\S+)")
     def fields_device_add(self, msg, adapter, field):
         """fields device add [adapter] [field]: Add an adapters field for device responses."""  # noqa
         self._field_add(
             msg=msg, api_type=self.api.devices, adapter=adapter, field=field
         )
 
-    @decorators.respond_to(
-        regex=r"^fields device delete (?P<adapter>\S+) (?P<field>\S+)"
-    )
+    @routes.route(regex=r"^fields device delete (?P<adapter>\S+) (?P<field>\S+)")
     def fields_device_delete(self, msg, adapter, field):
         """fields device delete [adapter] [field]: Delete an adapters field for device responses."""  # noqa
         self._field_del(
             msg=msg, api_type=self.api.devices, adapter=adapter, field=field
         )
 
-    @decorators.respond_to(regex=r"^get user query ```(?P<value>.*)```")
-    def user_by_query(self, msg, value):
+    @routes.route(regex=r"^get user query ```(?P<value>.*)```" + FORMAT_RE)
+    def user_by_query(self, msg, value, fmt=None):
         """get user query [value]: Get users by a query generated by Axonius, value must be fenced with triple backticks"""  # noqa
-        self._fetch_query(api_type=self.api.users, query=value, msg=msg)
+        self._submit(
+            msg=msg,
+            method=self._fetch_query,
+            api_type=self.api.users,
+            query=value,
+            fmt=fmt,
+        )
 
-    @decorators.respond_to(regex=r"^get user username (?P<value>\S+)")
-    def user_by_username(self, msg, value):
-        """get user username [value]: Get users by username (prefix value with *re=* to use regex)"""  # noqa
-        self._fetch_by(
+    @routes.route(regex=r"^get user username" + VALUE_RE + FORMAT_RE + FRESH_RE)
+    def user_by_username(self, msg, value=None, fmt=None, fresh=None):
+        """get user username [value]: Get users by username (comma seperate values or attach a file of values, prefix a single value with *re=* to use regex, add *fresh* to skip local copies)"""  # noqa
+        self._submit(
+            method=self._fetch_by,
             api_type=self.api.users,
             value_name="username",
             value=value,
             field="username",
             field_adapter="generic",
             msg=msg,
+            fmt=fmt,
+            fresh=bool(fresh),
         )
 
-    @decorators.respond_to(regex=r"^get user email (?P<value>\S+)")
-    def user_by_email(self, msg, value):
-        """get user email [value]: Get users by email (prefix value with *re=* to use regex)"""  # noqa
-        self._fetch_by(
+    @routes.route(regex=r"^get user email" + VALUE_RE + FORMAT_RE + FRESH_RE)
+    def user_by_email(self, msg, value=None, fmt=None, fresh=None):
+        """get user email [value]: Get users by email (comma seperate values or attach a file of values, prefix a single value with *re=* to use regex, add *fresh* to skip local copies)"""  # noqa
+        self._submit(
+            method=self._fetch_by,
             api_type=self.api.users,
             value_name="email",
             value=value,
             field="mail",
             field_adapter="generic",
             msg=msg,
+            fmt=fmt,
+            fresh=bool(fresh),
         )
 
-    @decorators.respond_to(regex=r"^get device query ```(?P<value>.*)```")
-    def device_by_query(self, msg, value):
+    @routes.route(regex=r"^get device query ```(?P<value>.*)```" + FORMAT_RE)
+    def device_by_query(self, msg, value, fmt=None):
         """get device query [value]: Get devices by a query generated by Axonius, value must be fenced with triple backticks"""  # noqa
-        self._fetch_query(api_type=self.api.devices, query=value, msg=msg)
+        self._submit(
+            msg=msg,
+            method=self._fetch_query,
+            api_type=self.api.devices,
+            query=value,
+            fmt=fmt,
+        )
 
-    @decorators.respond_to(regex=r"^saved query users (?P<value>\S.*)")
-    def get_by_saved_query_users(self, msg, value):
+    @routes.route(regex=r"^saved query users (?P<value>\S.*?)" + FORMAT_RE + "$")
+    def get_by_saved_query_users(self, msg, value, fmt=None):
         """saved query users [value]: Get all of the users from a saved query"""
-        self._get_by_saved_query(msg=msg, api_type=self.api.users, value=value)
+        self._submit(
+            msg=msg,
+            method=self._get_by_saved_query,
+            api_type=self.api.users,
+            value=value,
+            fmt=fmt,
+        )
 
-    @decorators.respond_to(regex=r"^saved query devices (?P<value>\S.*)")
-    def get_by_saved_query_devices(self, msg, value):
+    @routes.route(regex=r"^saved query devices (?P<value>\S.*?)" + FORMAT_RE + "$")
+    def get_by_saved_query_devices(self, msg, value, fmt=None):
         """saved query devices [value]: Get all of the devices from a saved query"""
-        self._get_by_saved_query(msg=msg, api_type=self.api.devices, value=value)
+        self._submit(
+            msg=msg,
+            method=self._get_by_saved_query,
+            api_type=self.api.devices,
+            value=value,
+            fmt=fmt,
+        )
 
-    @decorators.respond_to(regex=r"^saved query devices$")
+    @routes.route(regex=r"^saved query devices$")
     def get_device_saved_queries(self, msg):
         """saved query devices: Get a list of all saved queries for devices"""
         self._get_saved_queries(msg=msg, api_type=self.api.devices)
 
-    @decorators.respond_to(regex=r"^saved query users$")
+    @routes.route(regex=r"^saved query users$")
     def get_user_aved_queries(self, msg):
         """saved query users: Get a list of all saved queries for users"""
         self._get_saved_queries(msg=msg, api_type=self.api.users)
 
-    @decorators.respond_to(regex=r"^get device hostname (?P<value>\S+)")
-    def device_by_hostname(self, msg, value):
-        """get device hostname [value]: Get devices by hostname (prefix value with *re=* to use regex)"""  # noqa
-        self._fetch_by(
+    @routes.route(
+        regex=r"^watch saved query users (?P<value>\S.*?) every (?P<interval>\S+)"
+        + FORMAT_RE
+        + "$"
+    )
+    def watch_saved_query_users(self, msg, value, interval, fmt=None):
+        """watch saved query users [value] every [interval]: Post the users that are added, changed, or removed from a saved query every interval, like 15m"""  # noqa
+        self._watch_saved_query(
+            msg=msg, api_type=self.api.users, value=value, interval=interval, fmt=fmt
+        )
+
+    @routes.route(
+        regex=r"^watch saved query devices (?P<value>\S.*?) every (?P<interval>\S+)"
+        + FORMAT_RE
+        + "$"
+    )
+    def watch_saved_query_devices(self, msg, value, interval, fmt=None):
+        """watch saved query devices [value] every [interval]: Post the devices that are added, changed, or removed from a saved query every interval, like 15m"""  # noqa
+        self._watch_saved_query(
+            msg=msg, api_type=self.api.devices, value=value, interval=interval, fmt=fmt
+        )
+
+    @routes.route(regex=r"^watches$")
+    def list_watches(self, msg):
+        """watches: Get a list of the saved queries being watched"""
+        send_text = []
+        for watch in list(self.watches.watches.values()):
+            line = (
+                "Watch {id}: {api_type} saved query {name!r} every {interval}s, {stats}"
+            )
+            line = line.format(
+                id=watch.id,
+                api_type=watch.api_type,
+                name=watch.name,
+                interval=watch.interval,
+                stats=stats_text(watch.stats),
+            )
+            send_text.append(line)
+        send_text = "\n".join(send_text) or "No saved queries are being watched"
+        msg.reply(send_text, in_thread=True)
+
+    @routes.route(regex=r"^unwatch (?P<watch_id>\d+)$")
+    def unwatch(self, msg, watch_id):
+        """unwatch [id]: Stop watching a saved query"""
+        watch = self.watches.remove(int(watch_id))
+        if watch is None:
+            send_text = "No watch {watch_id} found, see *watches*"
+            send_text = send_text.format(watch_id=watch_id)
+        else:
+            send_text = "Stopped watch {id} of saved query {name!r}"
+            send_text = send_text.format(id=watch.id, name=watch.name)
+        msg.reply(send_text, in_thread=True)
+
+    @routes.route(
+        regex=r"^schedule saved query users (?P<value>\S.*?) cron "
+        + r"(?P<cron>\S+ \S+ \S+ \S+ \S+)(?: in (?P<channel>\S+))?"
+        + FORMAT_RE
+        + "$"
+    )
+    def schedule_saved_query_users(self, msg, value, cron, channel=None, fmt=None):
+        """schedule saved query users [value] cron [minute hour day month weekday] in [#channel]: Post all of the users from a saved query on a cron schedule, to this channel if no channel is supplied"""  # noqa
+        self._schedule_saved_query(
+            msg=msg,
+            api_type=self.api.users,
+            value=value,
+            cron=cron,
+            channel=channel,
+            fmt=fmt,
+        )
+
+    @routes.route(
+        regex=r"^schedule saved query devices (?P<value>\S.*?) cron "
+        + r"(?P<cron>\S+ \S+ \S+ \S+ \S+)(?: in (?P<channel>\S+))?"
+        + FORMAT_RE
+        + "$"
+    )
+    def schedule_saved_query_devices(self, msg, value, cron, channel=None, fmt=None):
+        """schedule saved query devices [value] cron [minute hour day month weekday] in [#channel]: Post all of the devices from a saved query on a cron schedule, to this channel if no channel is supplied"""  # noqa
+        self._schedule_saved_query(
+            msg=msg,
+            api_type=self.api.devices,
+            value=value,
+            cron=cron,
+            channel=channel,
+            fmt=fmt,
+        )
+
+    @routes.route(regex=r"^schedules$")
+    def list_schedules(self, msg):
+        """schedules: Get a list of the scheduled saved query reports"""
+        send_text = []
+        self.reports.sync()
+        for schedule in sorted(self.reports.schedules.values(), key=lambda x: x["id"]):
+            line = "Report {id}: {api_type} saved query {name!r} at `{cron}` in "
+            line += "<#{channel}>, next run {next_run}, {stats}"
+            line = line.format(
+                next_run=format(self.reports.next_run(schedule)).split(".")[0],
+                stats=stats_text(self.reports.runs.get(schedule["id"], {})),
+                **schedule
+            )
+            send_text.append(line)
+        send_text = "\n".join(send_text) or "No saved query reports are scheduled"
+        msg.reply(send_text, in_thread=True)
+
+    @routes.route(regex=r"^unschedule (?P<schedule_id>\d+)$")
+    def unschedule(self, msg, schedule_id):
+        """unschedule [id]: Stop a scheduled saved query report"""
+        schedule = self.reports.remove(int(schedule_id))
+        if schedule is None:
+            send_text = "No report {schedule_id} found, see *schedules*"
+            send_text = send_text.format(schedule_id=schedule_id)
+        else:
+            send_text = "Stopped report {id} of saved query {name!r}"
+            send_text = send_text.format(**schedule)
+        msg.reply(send_text, in_thread=True)
+
+    @routes.route(regex=r"^get device hostname" + VALUE_RE + FORMAT_RE + FRESH_RE)
+    def device_by_hostname(self, msg, value=None, fmt=None, fresh=None):
+        """get device hostname [value]: Get devices by hostname (comma seperate values or attach a file of values, prefix a single value with *re=* to use regex, add *fresh* to skip local copies)"""  # noqa
+        self._submit(
+            method=self._fetch_by,
             api_type=self.api.devices,
             value_name="hostname",
             value=value,
             field="hostname",
             field_adapter="generic",
             msg=msg,
+            fmt=fmt,
+            fresh=bool(fresh),
         )
 
-    @decorators.respond_to(regex=r"^get device mac (?P<value>\S+)")
-    def device_by_mac(self, msg, value):
-        """get device mac [value]: Get devices by MAC address (prefix value with *re=* to use regex)"""  # noqa
-        self._fetch_by(
+    @routes.route(regex=r"^get device mac" + VALUE_RE + FORMAT_RE + FRESH_RE)
+    def device_by_mac(self, msg, value=None, fmt=None, fresh=None):
+        """get device mac [value]: Get devices by MAC address (comma seperate values or attach a file of values, prefix a single value with *re=* to use regex, add *fresh* to skip local copies)"""  # noqa
+        self._submit(
+            method=self._fetch_by,
             api_type=self.api.devices,
             value_name="MAC Address",
             value=value,
             field="network_interfaces.mac",
             field_adapter="generic",
             msg=msg,
+            fmt=fmt,
+            fresh=bool(fresh),
         )
 
-    @decorators.respond_to(regex=r"^get device ip (?P<value>\S+)")
-    def device_by_ip(self, msg, value):
-        """get device ip [value]: Get devices by ip (prefix value with *re=* to use regex)"""  # noqa
-        self._fetch_by(
+    @routes.route(regex=r"^get device ip" + VALUE_RE + FORMAT_RE + FRESH_RE)
+    def device_by_ip(self, msg, value=None, fmt=None, fresh=None):
+        """get device ip [value]: Get devices by ip (comma seperate values or attach a file of values, prefix a single value with *re=* to use regex, add *fresh* to skip local copies)"""  # noqa
+        self._submit(
+            method=self._fetch_by,
             api_type=self.api.devices,
             value_name="IP Address",
             value=value,
             field="network_interfaces.ips",
             field_adapter="generic",
             msg=msg,
+            fmt=fmt,
+            fresh=bool(fresh),
+        )
+
+    @routes.route(regex=r"^get device subnet (?P<value>\S+)" + FORMAT_RE)
+    def device_by_subnet(self, msg, value, fmt=None):
+        """get device subnet [value]: Get devices with an IP in a CIDR range, such as 10.1.0.0/16 (needs the network index)"""  # noqa
+        self._submit(
+            method=self._fetch_subnet, msg=msg, value=value, fmt=fmt,
         )
 
     @decorators.process("message")
     def handle_thread(self, event):
-        """thread commands: labels add|remove foo1,foo2,foo3."""
-        if "thread_ts" not in event:
+        """thread commands: labels add|remove foo1,foo2,foo3, more, full."""
+        # runs for every message the bot can see, so check the cheap things first
+        thread_ts = event.get("thread_ts")
+        if thread_ts is None or event.get("user") in (None, self._bot_id):
+            self._count_event("skipped")
             return
-        if event["user"] == self.retrieve_bot_info()["id"]:
+
+        # threads the bot did not upload a result into are not its business,
+        # even when someone types a thread command in them
+        if not self.threads.has(thread_ts):
+            self._count_event("skipped")
             return
 
+        check = event.get("text", "").strip().lower()
+        is_labels = check.startswith(LABELS_CMD)
+        is_full = check == FULL_CMD
+        is_more = check == MORE_CMD
+
+        self._count_event("handled")
         msg = self._gen_message(event)
 
-        check = msg.text.lower()
-        if check.startswith(LABELS_CMD):
-            self._handle_labels(event, msg)
+        if is_labels:
+            self._submit(msg=msg, method=self._handle_labels, event=event)
+        elif is_full:
+            self._submit(msg=msg, method=self._handle_full, event=event)
+        elif is_more:
+            self._submit(msg=msg, method=self._handle_more, event=event)
         else:
             send_text = [
                 "Thread commands:",
                 "\t*labels add* label1,label2,label3",
                 "\t*labels delete* label1,label2,label3",
+                "\t*more*: get the next page of objects after a preview",
+                "\t*full*: get all objects after a preview",
             ]
             msg.reply("\n".join(send_text), in_thread=True)
 
+    @property
+    def _bot_id(self):
+        if self.bot_id is None:
+            self.bot_id = self.retrieve_bot_info()["id"]
+        return self.bot_id
+
+    def _count_event(self, stat):
+        with self.thread_events_lock:
+            self.thread_events[stat] += 1
+
+    def _submit(self, msg, method, **kwargs):
+        try:
+            ahead = self.jobs.submit(
+                method=self._run_job, msg=msg, job=method, kwargs=kwargs
+            )
+        except jobs.JobPoolFull as exc:
+            msg.reply(format(exc), in_thread=True)
+            return
+
+        if ahead is None:
+            return
+
+        send_text = "Working on it..."
+        if ahead:
+            send_text = "Working on it, {ahead} requests ahead of this one..."
+        msg.reply(send_text.format(ahead=ahead), in_thread=True)
+
+    def _run_job(self, msg, job, kwargs):
+        try:
+            job(msg=msg, **kwargs)
+        except Exception as exc:
+            send_text = "Error running {job}: {exc}"
+            send_text = send_text.format(job=job.__name__.strip("_"), exc=exc)
+            logger.exception(send_text)
+            msg.reply(send_text, in_thread=True)
+
+    def _handle_full(self, event, msg):
+        cache_entry = self.threads.get(msg.thread_ts)
+        if cache_entry is None or not cache_entry["request"]:
+            send_text = (
+                "No objects requested or objects have expired, get an object first!"
+            )
+            msg.reply(send_text, in_thread=True)
+            return
+
+        api_type = getattr(self.api, cache_entry["api_type"])
+        self._fetch_export(
+            msg=msg, api_type=api_type, request=cache_entry["request"], full=True
+        )
+
+    def _label_rows(self, api_type, request):
+        # context was only kept for the first rows of a big export
+        request = dict(request, manual_fields=list(exports.CONTEXT_KEYS))
+        return list(self._request_rows(api_type=api_type, request=request))
+
+    def _handle_more(self, event, msg):
+        cache_entry = self.threads.get(msg.thread_ts)
+        if cache_entry is None or not cache_entry["request"]:
+            send_text = (
+                "No objects requested or objects have expired, get an object first!"
+            )
+            msg.reply(send_text, in_thread=True)
+            return
+
+        api_type = getattr(self.api, cache_entry["api_type"])
+        request = cache_entry["request"]
+        if request["offset"] >= request["total"]:
+            send_text = "No more {api_type}, all {total} have been returned"
+            send_text = send_text.format(
+                api_type=api_type._type, total=request["total"]
+            )
+            msg.reply(send_text, in_thread=True)
+            return
+
+        self._upload_page(msg=msg, api_type=api_type, request=request)
+
     def _handle_labels(self, event, msg):
-        if msg.thread_ts not in TTL_CACHE:
+        cache_entry = self.threads.get(msg.thread_ts)
+        if cache_entry is None:
             send_text = (
                 "No objects requested or objects have expired, get an object first!"
             )
             msg.reply(send_text, in_thread=True)
             return
 
-        cache_entry = TTL_CACHE[msg.thread_ts]
+        api_type = getattr(self.api, cache_entry["api_type"])
 
         cmd = lstrip(msg.text, LABELS_CMD)
 
@@ -507,26 +1297,149 @@ class AxonBotSlack(base.MachineBasePlugin):
             msg.reply(send_text, in_thread=True)
             return
 
-        change_method = getattr(cache_entry["api_type"], label_sub_cmd["method"])
-        changed = change_method(rows=cache_entry["rows"], labels=label_list)
+        change_method = getattr(api_type, label_sub_cmd["method"])
+        add = label_sub_cmd["add"]
+        rows = cache_entry["rows"]
+        if cache_entry["row_count"] > len(rows):
+            try:
+                rows = self._label_rows(
+                    api_type=api_type, request=cache_entry["request"]
+                )
+            except Exception as exc:
+                send_text = "Error fetching {api_type} to label: {exc}"
+                send_text = send_text.format(api_type=api_type._type, exc=exc)
+                logger.exception(send_text)
+                msg.reply(send_text, in_thread=True)
+                return
+
+        total = len(rows)
+        rows = [x for x in rows if needs_labels(x, label_list, add)]
+        skipped = total - len(rows)
+
+        if not rows:
+            send_text = "Nothing to do, all {skipped} {api_type} {skip}"
+            send_text = send_text.format(
+                skipped=skipped, api_type=api_type._type, skip=label_sub_cmd["skip"]
+            )
+            msg.reply(send_text, in_thread=True)
+            return
+
+        def change(batch):
+            return change_method(rows=batch, labels=label_list)
+
+        def progress(done, total, done_rows):
+            send_text = "{action} labels: {done} of {total} batches done ({rows})"
+            send_text = send_text.format(
+                action=label_sub_cmd["action"],
+                done=done,
+                total=total,
+                rows="{} of {} {}".format(done_rows, len(rows), api_type._type),
+            )
+            msg.reply(send_text, in_thread=True)
+
+        results = jobs.run_batches(
+            method=change,
+            items=rows,
+            batch_size=self.settings.get("AX_LABEL_BATCH_SIZE", jobs.BATCH_SIZE),
+            workers=self.settings.get("AX_LABEL_WORKERS", jobs.BATCH_WORKERS),
+            progress=progress,
+            interval=self.settings.get("AX_LABEL_PROGRESS", jobs.PROGRESS_INTERVAL),
+        )
+        self.results.invalidate(api_type._type)
+
+        failed = [x for x in results if x.exc is not None]
+        changed = sum(x.value or 0 for x in results if x.exc is None)
+
+        if not cache_entry["trimmed"]:
+            done = set(
+                x["internal_axon_id"]
+                for result in results
+                if result.exc is None
+                for x in result.items
+            )
+            new_rows = [
+                change_labels(x, label_list, add)
+                if x["internal_axon_id"] in done
+                else x
+                for x in cache_entry["rows"]
+            ]
+            self.threads.update(key=msg.thread_ts, rows=new_rows)
+
         send_text = "{action} labels {labels!r} on {changed} {api_type}"
+        if skipped:
+            send_text += ", skipped {skipped} that {skip}"
         send_text = send_text.format(
             action=label_sub_cmd["action"],
             labels=", ".join(label_list),
             changed=changed,
-            api_type=cache_entry["api_type"]._type,
+            api_type=api_type._type,
+            skipped=skipped,
+            skip=label_sub_cmd["skip"],
         )
+
+        if failed:
+            lines = [
+                send_text,
+                "{failed} of {total} batches failed, {rows} {api_type} not changed:",
+            ]
+            lines[1] = lines[1].format(
+                failed=len(failed),
+                total=len(results),
+                rows=sum(x.count for x in failed),
+                api_type=api_type._type,
+            )
+            for result in failed[:LABELS_FAILED_MAX]:
+                line = "\tbatch {index} ({start}-{end}): {exc}"
+                lines.append(
+                    line.format(
+                        index=result.index + 1,
+                        start=result.start + 1,
+                        end=result.end,
+                        exc=result.exc,
+                    )
+                )
+            if len(failed) > LABELS_FAILED_MAX:
+                lines.append("\t...")
+            send_text = "\n".join(lines)
+
         msg.reply(send_text, in_thread=True)
         return
 
+    def _count(self, msg, api_type, fresh):
+        info = None if fresh else self._mirror_info(api_type=api_type)
+        if info:
+            send_text = "Total {api_type}: {count} (from the mirror built {age:.0f} "
+            send_text += "seconds ago, add *fresh* to count live)"
+            send_text = send_text.format(api_type=api_type._type, **info)
+            msg.reply(send_text, in_thread=True)
+            return
+
+        count, age = self.counts.get(
+            key=api_type._type, fetch=api_type.get_count, refresh=fresh
+        )
+        if age:
+            when = "cached {age:.0f} seconds ago, add *fresh* to re-count"
+        else:
+            when = "counted just now"
+        send_text = "Total {api_type}: {count} ({when})"
+        send_text = send_text.format(
+            api_type=api_type._type, count=count, when=when.format(age=age)
+        )
+        msg.reply(send_text, in_thread=True)
+
     def _gen_message(self, event):
         return base.Message(MessagingClient(), event, self._fq_name)
 
-    def _fetch_query(self, api_type, query, msg):
+    def _fetch_query(self, api_type, query, msg, fmt=None):
+        fmt = self._check_format(msg=msg, fmt=fmt)
+        if not fmt:
+            return
+
+        request = self._build_request(
+            api_type=api_type, query=query, fmt=fmt, cache_key=["query", query.strip()]
+        )
         try:
-            rows = list(
-                api_type.get(query=query, row_count_min=1, **api_type.response_fields)
-            )
+            self._fetch_export(msg=msg, api_type=api_type, request=request)
         except axonius_api_client.api.exceptions.TooFewObjectsFound:
             send_text = "No {api_type} found using query {query!r}"
             send_text = send_text.format(api_type=api_type._type, query=query)
@@ -536,29 +1449,109 @@ class AxonBotSlack(base.MachineBasePlugin):
             send_text = send_text.format(api_type=api_type._type, query=query, exc=exc)
             logger.exception(send_text)
             msg.reply(send_text, in_thread=True)
-        else:
-            TTL_CACHE[msg.thread_ts] = {"api_type": api_type, "rows": rows}
-            json_rows = json.dumps(rows, indent=2)
-            filename = "{api_type}_{dt}.json".format(api_type=api_type._type, dt=now())
-            self._upload_file_reply(msg=msg, filename=filename, content=json_rows)
 
-    def _fetch_by(self, api_type, value_name, value, field, field_adapter, msg):
-        kwargs = {}
-        kwargs.update(api_type.response_fields)
-        kwargs["field"] = field
-        kwargs["field_adapter"] = field_adapter
-        kwargs["row_count_min"] = 1
-        kwargs["row_count_max"] = None
-
-        if value.lower().startswith("re="):
-            kwargs["value"] = lstrip(value, "re=").strip()
-            kwargs["regex"] = True
+    def _fetch_by(
+        self,
+        api_type,
+        value_name,
+        value,
+        field,
+        field_adapter,
+        msg,
+        fmt=None,
+        fresh=False,
+    ):
+        fmt = self._check_format(msg=msg, fmt=fmt)
+        if not fmt:
+            return
+
+        regex = value is not None and value.lower().startswith("re=")
+        if regex and msg._msg_event.get("files"):
+            send_text = "A *re=* value can not be used with attached files"
+            msg.reply(send_text, in_thread=True)
+            return
+
+        # a regex can have commas of its own, such as {1,3}, so it is never split
+        bulk = value is None or "," in value or msg._msg_event.get("files")
+        if bulk and not regex:
+            try:
+                values = split_values(value) + self._attached_values(msg=msg)
+            except Exception as exc:
+                send_text = "Error reading attached files: {exc}"
+                send_text = send_text.format(exc=exc)
+                logger.exception(send_text)
+                msg.reply(send_text, in_thread=True)
+                return
+
+            if not values:
+                send_text = "No {value_name} values supplied or found in attached files"
+                msg.reply(send_text.format(value_name=value_name), in_thread=True)
+                return
+
+            self._fetch_bulk(
+                api_type=api_type,
+                value_name=value_name,
+                values=values,
+                field=field,
+                field_adapter=field_adapter,
+                msg=msg,
+                fmt=fmt,
+            )
+            return
+
+        if regex:
+            value = lstrip(value, "re=").strip()
         else:
-            kwargs["value"] = value.strip()
-            kwargs["regex"] = False
+            value = value.strip()
+
+        what = "with {value_name} {value!r}".format(value_name=value_name, value=value)
+        finder = NET_INDEX_FINDERS.get(field)
+        if finder and not regex and not fresh and self.net_index.ready:
+            ids = getattr(self.net_index, finder)(value)
+            if ids:
+                self._fetch_ids(
+                    msg=msg,
+                    api_type=api_type,
+                    ids=ids,
+                    fmt=fmt,
+                    what=what,
+                    cache_key=["net_index", field, value],
+                )
+                return
+
+        indexed = mirror.INDEXED.get(api_type._type, [])
+        info = None
+        if field in indexed and not regex and not fresh:
+            info = self._mirror_info(api_type=api_type)
+        if info:
+            rows = self.mirror.find(api_type=api_type._type, field=field, value=value)
+            if rows:
+                self._upload_local_rows(
+                    msg=msg,
+                    api_type=api_type,
+                    rows=rows,
+                    fmt=fmt,
+                    what=what,
+                    source="mirror",
+                    age=info["age"],
+                )
+                return
 
         try:
-            rows = api_type.get_by_field_value(**kwargs)
+            query = self._build_field_query(
+                api_type=api_type,
+                field=field,
+                field_adapter=field_adapter,
+                value=value,
+                regex=regex,
+            )
+            request = self._build_request(
+                api_type=api_type,
+                query=query,
+                fmt=fmt,
+                cache_key=["field", field_adapter, field, value, regex],
+            )
+            self._fetch_export(msg=msg, api_type=api_type, request=request)
         except axonius_api_client.api.exceptions.TooFewObjectsFound:
             send_text = "No {api_type} matching {value_name} {value!r} found"
             send_text = send_text.format(
@@ -574,24 +1567,502 @@ class AxonBotSlack(base.MachineBasePlugin):
             )
             logger.exception(send_text)
             msg.reply(send_text, in_thread=True)
+
+    def _net_index_rows(self):
+        return self.api.devices.get(manual_fields=netindex.FIELDS)
+
+    def _fetch_subnet(self, msg, value, fmt=None):
+        fmt = self._check_format(msg=msg, fmt=fmt)
+        if not fmt:
+            return
+
+        if not self.net_index.ready:
+            if self.net_index.refresh:
+                send_text = "The network index is still being built, try again later"
+            else:
+                send_text = "The network index is disabled, see AX_NET_INDEX_REFRESH"
+            msg.reply(send_text, in_thread=True)
+            return
+
+        try:
+            ids = self.net_index.find_subnet(value)
+        except ValueError as exc:
+            send_text = "Invalid subnet {value!r}: {exc}"
+            msg.reply(send_text.format(value=value, exc=exc), in_thread=True)
+            return
+
+        what = "in subnet {value}".format(value=value)
+        if not ids:
+            send_text = "No devices found {what} in the network index from "
+            send_text += "{age:.0f} seconds ago"
+            send_text = send_text.format(what=what, age=self.net_index.age)
+            msg.reply(send_text, in_thread=True)
+            return
+
+        self._fetch_ids(
+            msg=msg,
+            api_type=self.api.devices,
+            ids=ids,
+            fmt=fmt,
+            what=what,
+            cache_key=["subnet", value],
+            fresh_hint=False,
+        )
+
+    def _fetch_ids(self, msg, api_type, ids, fmt, what, cache_key, fresh_hint=True):
+        """Fetch the objects the network index matched, with the response fields."""
+        initial_comment = "Matched {count} {api_type} {what} in the network index "
+        initial_comment += "from {age:.0f} seconds ago"
+        if fresh_hint:
+            initial_comment += ", add *fresh* to look up live"
+        initial_comment = initial_comment.format(
+            count=len(ids), api_type=api_type._type, what=what, age=self.net_index.age
+        )
+        request = self._build_request(
+            api_type=api_type, query=None, fmt=fmt, cache_key=cache_key, ids=ids
+        )
+        try:
+            self._fetch_export(
+                msg=msg,
+                api_type=api_type,
+                request=request,
+                initial_comment=initial_comment,
+            )
+        except Exception as exc:
+            send_text = "Error fetching {api_type} {what}: {exc}"
+            send_text = send_text.format(api_type=api_type._type, what=what, exc=exc)
+            logger.exception(send_text)
+            msg.reply(send_text, in_thread=True)
+
+    def _upload_local_rows(self, msg, api_type, rows, fmt, what, source, age):
+        initial_comment = "Found {count} {api_type} {what} in the {source} from "
+        initial_comment += "{age:.0f} seconds ago, add *fresh* to look up live"
+        initial_comment = initial_comment.format(
+            count=len(rows), api_type=api_type._type, what=what, source=source, age=age
+        )
+        export = self._export_rows(api_type=api_type, rows=rows, fmt=fmt)
+        self._upload_export(
+            msg=msg, api_type=api_type, export=export, initial_comment=initial_comment,
+        )
+
+    def _mirror_fetch(self, name):
+        api_type = getattr(self.api, name)
+        fields = {k: list(v) for k, v in api_type.response_fields.items()}
+        request = self._build_request(
+            api_type=api_type, query=None, fmt=None, cache_key=[]
+        )
+        return fields, self._request_rows(api_type=api_type, request=request)
+
+    def _mirror_info(self, api_type):
+        if self.mirror is None:
+            return None
+        return self.mirror.info(
+            api_type=api_type._type, fields=api_type.response_fields
+        )
+
+    def _attached_values(self, msg):
+        """Get the values from the text files attached to a message."""
+        max_size = self.settings.get("AX_BULK_FILE_SIZE", BULK_FILE_SIZE)
+        headers = {
+            "Authorization": "Bearer {}".format(self.settings["SLACK_API_TOKEN"])
+        }
+        values = []
+
+        for attached in msg._msg_event.get("files", []):
+            if attached.get("size", 0) > max_size:
+                error = "File {name!r} is {size} bytes, the maximum is {max_size}"
+                error = error.format(max_size=max_size, **attached)
+                raise ValueError(error)
+
+            response = requests.get(
+                attached["url_private_download"], headers=headers, timeout=30
+            )
+            response.raise_for_status()
+            values += split_values(response.content.decode("utf-8"))
+        return values
+
+    def _fetch_bulk(self, api_type, value_name, values, field, field_adapter, msg, fmt):
+        """Look up many values with batched OR queries run in parallel."""
+        bulk_max = self.settings.get("AX_BULK_MAX", BULK_MAX)
+        if len(values) > bulk_max:
+            send_text = "Too many {value_name} values ({count}), the maximum is {max}"
+            send_text = send_text.format(
+                value_name=value_name, count=len(values), max=bulk_max
+            )
+            msg.reply(send_text, in_thread=True)
+            return
+
+        try:
+            index = self.api.get_index(api_type=api_type)
+            field_adapter, fq_field = index.find_field(
+                name=field, adapter=field_adapter
+            )
+            fields = axonius_api_client.api.utils.validate_fields(
+                known_fields=index.known_fields, **api_type.response_fields
+            )
+        except Exception as exc:
+            send_text = "Error fetching {api_type} matching {value_name}: {exc}"
+            send_text = send_text.format(
+                api_type=api_type._type, value_name=value_name, exc=exc
+            )
+            logger.exception(send_text)
+            msg.reply(send_text, in_thread=True)
+            return
+
+        # the queried field is needed to tell which values were found
+        if fq_field not in fields:
+            fields.append(fq_field)
+
+        def fetch(batch):
+            query = " or ".join(
+                "({})".format(
+                    self._build_field_query(
+                        api_type=api_type,
+                        field=field,
+                        field_adapter=field_adapter,
+                        value=value,
+                        regex=False,
+                    )
+                )
+                for value in batch
+            )
+            return list(
+                self.api.get_rows(api_type=api_type, query=query, fields=fields)
+            )
+
+        results = jobs.run_batches(
+            method=fetch,
+            items=values,
+            batch_size=self.settings.get("AX_BULK_BATCH_SIZE", BULK_BATCH_SIZE),
+            workers=self.settings.get("AX_BULK_WORKERS", BULK_WORKERS),
+        )
+
+        rows = {}
+        seen = set()
+        for result in results:
+            for row in result.value or []:
+                rows.setdefault(row["internal_axon_id"], row)
+                for key, found in exports.flatten(row).items():
+                    if key.endswith(fq_field):
+                        seen.update(format(x).lower() for x in found)
+
+        failed = [v for x in results if x.exc is not None for v in x.items]
+        not_found = [
+            v
+            for x in results
+            if x.exc is None
+            for v in x.items
+            if v.lower() not in seen
+        ]
+
+        lines = ["Found {rows} {api_type} matching {found} of {count} {value_name}"]
+        if failed:
+            lines.append("Errors fetching {failed} {value_name}: {exc}")
+        if not_found:
+            lines.append("Not found: {not_found}")
+        initial_comment = "\n".join(lines).format(
+            rows=len(rows),
+            api_type=api_type._type,
+            found=len(values) - len(not_found) - len(failed),
+            count=len(values),
+            value_name=value_name,
+            failed=len(failed),
+            exc="; ".join(set(format(x.exc) for x in results if x.exc is not None)),
+            not_found=", ".join(not_found[:BULK_NOT_FOUND_MAX])
+            + (", ..." if len(not_found) > BULK_NOT_FOUND_MAX else ""),
+        )
+
+        if rows:
+            export = self._export_rows(
+                api_type=api_type, rows=iter(rows.values()), fmt=fmt
+            )
+            self._upload_export(
+                msg=msg,
+                api_type=api_type,
+                export=export,
+                initial_comment=initial_comment,
+            )
+        else:
+            msg.reply(initial_comment, in_thread=True)
+
+        if len(not_found) > BULK_NOT_FOUND_MAX:
+            prefix = "{api_type}_not_found_{dt}".format(
+                api_type=api_type._type, dt=now()
+            )
+            self._upload_file_reply(
+                msg=msg, filename=prefix + ".txt", content="\n".join(not_found)
+            )
+
+    def _build_field_query(self, api_type, field, field_adapter, value, regex):
+        if regex:
+            query = '{field} == regex("{value}", "i")'
+        else:
+            query = '{field} == "{value}"'
+
+        # values end up inside a quoted string of the query
+        value = value.replace("\\", "\\\\").replace('"', '\\"')
+        index = self.api.get_index(api_type=api_type)
+        field_adapter, field = index.find_field(name=field, adapter=field_adapter)
+        return query.format(field=field, value=value)
+
+    def _check_format(self, msg, fmt):
+        fmt = fmt or self.settings.get("AX_EXPORT_FORMAT", exports.DEFAULT_FORMAT)
+        try:
+            exports.parse_format(fmt)
+        except exports.ExportError as exc:
+            msg.reply(format(exc), in_thread=True)
+            return None
+        return fmt
+
+    def _build_request(
+        self, api_type, query, fmt, cache_key, manual_fields=None, ids=None
+    ):
+        return {
+            "query": query,
+            "fields": api_type.response_fields,
+            "manual_fields": manual_fields,
+            "fmt": fmt,
+            "cache_key": cache_key,
+            "ids": ids,
+        }
+
+    def _ids_query(self, ids):
+        return " or ".join('(internal_axon_id == "{}")'.format(x) for x in ids)
+
+    def _request_fields(self, api_type, request):
+        if request["manual_fields"]:
+            return request["manual_fields"]
+        return axonius_api_client.api.utils.validate_fields(
+            known_fields=self.api.get_fields(api_type=api_type), **request["fields"]
+        )
+
+    def _page_rows(self, api_type, request, offset, page_size):
+        """Get one page of rows for a request, starting at offset."""
+        ids = request.get("ids")
+        if ids is not None:
+            end = offset + page_size
+            return list(
+                self._request_rows(
+                    api_type=api_type, request=dict(request, ids=ids[offset:end])
+                )
+            )
+
+        return self.api.get_page(
+            api_type=api_type,
+            query=request["query"],
+            fields=self._request_fields(api_type=api_type, request=request),
+            offset=offset,
+            page_size=page_size,
+        )
+
+    def _request_rows(self, api_type, request, count=None):
+        """Get every row for a request, paging up to count if it is known."""
+        fields = self._request_fields(api_type=api_type, request=request)
+        ids = request.get("ids")
+        if ids is None:
+            return self.api.get_rows(
+                api_type=api_type, query=request["query"], fields=fields, count=count
+            )
+        return self._ids_rows(api_type=api_type, ids=ids, fields=fields)
+
+    def _ids_rows(self, api_type, ids, fields):
+        # fetched in batches to keep each query short
+        batch_size = self.settings.get("AX_BULK_BATCH_SIZE", BULK_BATCH_SIZE)
+        for start in range(0, len(ids), batch_size):
+            end = start + batch_size
+            batch = ids[start:end]
+            for row in self.api.get_rows(
+                api_type=api_type,
+                query=self._ids_query(batch),
+                fields=fields,
+                count=len(batch),
+            ):
+                yield row
+
+    def _fetch_export(self, msg, api_type, request, full=False, initial_comment=""):
+        """Upload the export for a request, or a preview of it if it is too big.
+
+        Returns:
+            :obj:`int`: number of rows uploaded
+
+        Raises:
+            :exc:`axonius_api_client.api.exceptions.TooFewObjectsFound`: if nothing
+                matches the query of the request.
+
+        """
+        fmt = request["fmt"]
+        result_key = (
+            api_type._type,
+            fmt,
+            caches.ResultCache.fields_key(request["fields"]),
+        ) + tuple(request["cache_key"])
+
+        export = self.results.get(key=result_key)
+        if export is not None:
+            m = "Using cached export of {count} {api_type} rows from {age:.0f}s ago"
+            m = m.format(
+                count=export.row_count, api_type=api_type._type, age=export.age
+            )
+            logger.debug(m)
+            request = dict(request, offset=export.row_count, total=export.row_count)
+            return self._upload_export(
+                msg=msg,
+                api_type=api_type,
+                export=export,
+                request=request,
+                initial_comment=initial_comment or None,
+            )
+
+        if request.get("ids") is not None:
+            count = len(request["ids"])
+        else:
+            count = api_type.get_count(query=request["query"])
+        if not count:
+            raise axonius_api_client.api.exceptions.TooFewObjectsFound(
+                value=request["query"],
+                value_type="query",
+                object_type=api_type._type,
+                row_count_total=count,
+                row_count_min=1,
+            )
+
+        threshold = self.settings.get("AX_PREVIEW_THRESHOLD", PREVIEW_THRESHOLD)
+        if full or not threshold or count <= threshold:
+            rows = self._request_rows(api_type=api_type, request=request, count=count)
+            # labels fetch the IDs again when they need more rows than this
+            export = self._export_rows(
+                api_type=api_type,
+                rows=rows,
+                fmt=fmt,
+                cache_key=result_key,
+                context_max=self.settings.get("AX_PREVIEW_ROWS", PREVIEW_ROWS),
+            )
+            request = dict(request, offset=export.row_count, total=export.row_count)
+            return self._upload_export(
+                msg=msg,
+                api_type=api_type,
+                export=export,
+                request=request,
+                initial_comment=initial_comment or None,
+            )
+
+        request = dict(request, offset=0, total=count)
+        found = "Found {count} {api_type}, which is more than {threshold}. "
+        found = found.format(count=count, api_type=api_type._type, threshold=threshold)
+        initial_comment = initial_comment + ". " + found if initial_comment else found
+        return self._upload_page(
+            msg=msg, api_type=api_type, request=request, initial_comment=initial_comment
+        )
+
+    def _upload_page(self, msg, api_type, request, initial_comment=""):
+        """Upload the next page of a request and move its offset past it."""
+        offset = request["offset"]
+        page_size = self.settings.get("AX_PREVIEW_ROWS", PREVIEW_ROWS)
+        rows = self._page_rows(
+            api_type=api_type, request=request, offset=offset, page_size=page_size
+        )
+        export = self._export_rows(api_type=api_type, rows=rows, fmt=request["fmt"])
+        if request.get("ids") is not None:
+            # a page of IDs has fewer rows if devices were removed since the index
+            request = dict(request, offset=min(offset + page_size, request["total"]))
         else:
-            TTL_CACHE[msg.thread_ts] = {"api_type": api_type, "rows": rows}
-            json_rows = json.dumps(rows, indent=2)
-            filename = "{api_type}_{dt}.json".format(api_type=api_type._type, dt=now())
-            self._upload_file_reply(msg=msg, filename=filename, content=json_rows)
+            request = dict(request, offset=offset + export.row_count)
+
+        showing = "Showing {start}-{end} of {total}, reply *{full}* in this "
+        showing += "thread to get all of them"
+        if request["offset"] < request["total"]:
+            showing += ", or *{more}* to get the next page"
+        initial_comment += showing.format(
+            start=offset + 1,
+            end=request["offset"],
+            total=request["total"],
+            full=FULL_CMD,
+            more=MORE_CMD,
+        )
+        return self._upload_export(
+            msg=msg,
+            api_type=api_type,
+            export=export,
+            request=request,
+            initial_comment=initial_comment,
+        )
+
+    def _export_rows(self, api_type, rows, fmt=None, cache_key=None, context_max=None):
+        fmt = fmt or self.settings.get("AX_EXPORT_FORMAT", exports.DEFAULT_FORMAT)
+
+        export = exports.RowExport(
+            fmt=fmt,
+            spool_max_size=self.settings.get(
+                "AX_EXPORT_SPOOL_SIZE", exports.SPOOL_MAX_SIZE
+            ),
+            context_max=context_max,
+        )
+        try:
+            export.write_rows(rows)
+        except Exception:
+            export.close()
+            raise
+
+        m = "Exported {count} {api_type} rows into {size} bytes of {fmt}"
+        m = m.format(
+            count=export.row_count,
+            api_type=api_type._type,
+            size=export.size,
+            fmt=export.extension,
+        )
+        logger.debug(m)
+
+        if cache_key is not None:
+            self.results.put(key=cache_key, api_type=api_type._type, export=export)
+        return export
+
+    def _upload_export(self, msg, api_type, export, request=None, initial_comment=None):
+        # the upload queue closes the export once it is sent
+        try:
+            self.threads.put(
+                key=msg.thread_ts,
+                api_type=api_type._type,
+                rows=export.context,
+                request=request,
+                row_count=export.row_count,
+            )
+            prefix = "{api_type}_{dt}".format(api_type=api_type._type, dt=now())
+            filename = export.filename(prefix=prefix)
+
+            if getattr(export, "age", None):
+                cached = "Cached result from {age:.0f} seconds ago"
+                cached = cached.format(age=export.age)
+                initial_comment = (
+                    initial_comment + ". " + cached if initial_comment else cached
+                )
+
+            self._upload_file_reply(
+                msg=msg,
+                filename=filename,
+                fileobj=export.fh,
+                initial_comment=initial_comment,
+                close=export.close,
+            )
+        except Exception:
+            export.close()
+            raise
+        return export.row_count
 
     def _upload_file_reply(
         self,
         msg,
         filename,
-        content,
+        content=None,
+        fileobj=None,
         in_thread=True,
         initial_comment=None,
         filetype=None,
+        close=None,
     ):
         kwargs = {}
         kwargs["method"] = "files.upload"
-        kwargs["content"] = content
+        if fileobj is None:
+            kwargs["content"] = content
         kwargs["filename"] = filename
         kwargs["title"] = filename
         kwargs["channels"] = [msg.channel.id]
@@ -601,16 +2072,45 @@ class AxonBotSlack(base.MachineBasePlugin):
             kwargs["initial_comment"] = initial_comment
         if in_thread and msg.thread_ts:
             kwargs["thread_ts"] = msg.thread_ts
-        instance = Slack.get_instance()
-        response = instance.api_call(**kwargs)
+
+        upload = uploads.Upload(
+            kwargs=kwargs,
+            fileobj=fileobj,
+            done=lambda x: self._upload_done(msg=msg, upload=x),
+            failed=lambda x, error: self._upload_failed(msg=msg, upload=x, error=error),
+            close=close,
+        )
+        ahead = self.uploads.submit(upload)
+        if ahead:
+            send_text = "Upload of {filename!r} is queued behind {ahead} other uploads"
+            send_text = send_text.format(filename=filename, ahead=ahead)
+            msg.reply(send_text, in_thread=in_thread)
+
+    def _upload_done(self, msg, upload):
         send_text = "Uploaded {filename!r} to channel {channel} in thread {thread}"
         send_text = send_text.format(
-            filename=filename,
+            filename=upload.kwargs["filename"],
             channel=msg.channel.id,
-            thread=kwargs.get("thread_ts", None),
+            thread=upload.kwargs.get("thread_ts", None),
         )
         text.announce(send_text)
-        return response
+
+        send_text = "Uploaded {filename!r}"
+        if upload.ahead or upload.tries > 1:
+            send_text += " in {seconds:.0f} seconds, {tries} tries"
+        send_text = send_text.format(
+            filename=upload.kwargs["filename"],
+            seconds=time.monotonic() - upload.queued,
+            tries=upload.tries,
+        )
+        msg.reply(send_text, in_thread="thread_ts" in upload.kwargs)
+
+    def _upload_failed(self, msg, upload, error):
+        send_text = "Failed to upload {filename!r} after {tries} tries: {error}"
+        send_text = send_text.format(
+            filename=upload.kwargs["filename"], tries=upload.tries, error=error
+        )
+        msg.reply(send_text, in_thread="thread_ts" in upload.kwargs)
 
     def _build_fields_text(self, api_type):
         lines = ["Current fields for {api_type}:".format(api_type=api_type._type)]
@@ -626,32 +2126,13 @@ class AxonBotSlack(base.MachineBasePlugin):
 
     def _find_field(self, api_type, adapter, field, msg):
         try:
-            known_fields = api_type.get_fields()
-            if adapter != "generic":
-                known_adapters = list(known_fields["specific"].keys())
-                adapter = axonius_api_client.api.utils.find_adapter(
-                    name=adapter, known_names=known_adapters
-                )
-            field = axonius_api_client.api.utils._find_field(
-                name=field, adapter=adapter, fields=known_fields
-            )
-            return adapter, field
+            index = self.api.get_index(api_type=api_type)
+            return index.find_field(name=field, adapter=adapter)
         except axonius_api_client.api.exceptions.UnknownAdapterName as exc:
-            known_names = "\n\t" + "\n\t".join(["generic"] + exc.known_names)
-            send_text = (
-                "No such adapter named {adapter!r}, valid adapter names: {known_names}"
-            )
-            send_text = send_text.format(adapter=adapter, known_names=known_names)
+            send_text = unknown_adapter_text(adapter=adapter, exc=exc)
             msg.reply(send_text, in_thread=True)
         except axonius_api_client.api.exceptions.UnknownFieldName as exc:
-            known_names = "\n\t" + "\n\t".join(exc.known_names)
-            send_text = (
-                "No such field named {field!r} available in adapter {adapter!r}, "
-                "valid field names: {known_names}"
-            )
-            send_text = send_text.format(
-                field=field, adapter=adapter, known_names=known_names
-            )
+            send_text = unknown_field_text(field=field, adapter=exc.adapter, exc=exc)
             msg.reply(send_text, in_thread=True)
         except Exception as exc:
             send_text = "Error finding field {field!r} for adapter {adapter!r}: {exc}"
@@ -681,6 +2162,7 @@ class AxonBotSlack(base.MachineBasePlugin):
             )
         else:
             api_type.response_fields[adapter].append(field)
+            self.results.invalidate(api_type=api_type._type)
 
             send_text = "Added field {field!r} for adapter {adapter!r} for {api_type}"
             send_text = send_text.format(
@@ -701,17 +2183,19 @@ class AxonBotSlack(base.MachineBasePlugin):
             msg.reply(exc.msg, in_thread=True)
             return
 
-        if adapter not in api_type._get_fields:
+        if adapter not in api_type.response_fields:
             send_text = "Adapter {adapter!r} is not in the current {api_type} fields!"
             send_text = send_text.format(
                 adapter=adapter, field=field, api_type=api_type._type
             )
-        elif field in api_type._get_fields[adapter]:
-            idx = api_type._get_fields[adapter].index(field)
-            api_type._get_fields[adapter].pop(idx)
+        elif field in api_type.response_fields[adapter]:
+            idx = api_type.response_fields[adapter].index(field)
+            api_type.response_fields[adapter].pop(idx)
 
-            if not api_type._get_fields[adapter]:
-                del api_type._get_fields[adapter]
+            if not api_type.response_fields[adapter]:
+                del api_type.response_fields[adapter]
+
+            self.results.invalidate(api_type=api_type._type)
 
             send_text = "Removed field {field!r} for adapter {adapter!r} for {api_type}"
             send_text = send_text.format(
@@ -731,8 +2215,11 @@ class AxonBotSlack(base.MachineBasePlugin):
         fields_text = self._build_fields_text(api_type=api_type)
         msg.reply(fields_text, in_thread=True)
 
+    def _saved_query_rows(self, name):
+        return list(getattr(self.api, name).get_saved_query())
+
     def _get_saved_queries(self, msg, api_type):
-        sqs = api_type.get_saved_query()
+        sqs = self.saved_queries.rows(api_type=api_type._type)
         lines = ["Saved Queries for {api_type}:".format(api_type=api_type._type)]
 
         for sq in sqs:
@@ -741,22 +2228,281 @@ class AxonBotSlack(base.MachineBasePlugin):
         send_text = "\n".join(lines)
         msg.reply(send_text, in_thread=True)
 
-    def _get_by_saved_query(self, api_type, msg, value):
-        try:
-            sq = api_type.get_saved_query_by_name(name=value, regex=False, only1=True)
-            rows = list(
-                api_type.get(
-                    query=sq["view"]["query"]["filter"],
-                    manual_fields=sq["view"]["fields"],
-                )
+    def _saved_query_request(self, api_type, value, fmt):
+        """Build the request for the objects in a saved query.
+
+        Raises:
+            :exc:`axonius_api_client.api.exceptions.ObjectNotFound`: if there is
+                no saved query named value.
+            :exc:`axonbot_slack.catalog.AmbiguousName`: if value matches more than
+                one saved query.
+
+        """
+        sq = self._find_saved_query(api_type=api_type, value=value)
+        return self._build_request(
+            api_type=api_type,
+            query=sq["view"]["query"]["filter"],
+            fmt=fmt,
+            cache_key=["saved_query", sq["name"]],
+            manual_fields=sq["view"]["fields"],
+        )
+
+    def _find_saved_query(self, api_type, value):
+        sq = self.saved_queries.find(api_type=api_type._type, name=value)
+        if sq is None:
+            raise axonius_api_client.api.exceptions.ObjectNotFound(
+                value=value,
+                value_type="name",
+                object_type="Saved Query for {}".format(api_type._type),
             )
+        return sq
+
+    def _watch_saved_query(self, msg, api_type, value, interval, fmt=None):
+        fmt = self._check_format(msg=msg, fmt=fmt)
+        if not fmt:
+            return
+
+        try:
+            seconds = watches.parse_interval(interval)
+        except ValueError as exc:
+            msg.reply(format(exc), in_thread=True)
+            return
+
+        min_interval = self.settings.get("AX_WATCH_MIN_INTERVAL", watches.MIN_INTERVAL)
+        if seconds < min_interval:
+            send_text = "Interval {interval} is too short, the minimum is {min}s"
+            send_text = send_text.format(interval=interval, min=min_interval)
+            msg.reply(send_text, in_thread=True)
+            return
+
+        try:
+            sq = self._find_saved_query(api_type=api_type, value=value)
         except axonius_api_client.api.exceptions.ObjectNotFound:
             send_text = "No saved query {value} for {api_type} found"
             send_text = send_text.format(api_type=api_type._type, value=value)
             msg.reply(send_text, in_thread=True)
             return
+        except catalog.AmbiguousName as exc:
+            msg.reply(format(exc), in_thread=True)
+            return
+
+        value = sq["name"]
+        watch = self.watches.add(
+            api_type=api_type._type, name=value, interval=seconds, msg=msg, fmt=fmt
+        )
+        send_text = "Watching {api_type} saved query {name!r} every {interval} as "
+        send_text += "watch {id}, send *unwatch {id}* to stop"
+        send_text = send_text.format(
+            api_type=api_type._type, name=value, interval=interval, id=watch.id
+        )
+        msg.reply(send_text, in_thread=True)
+
+    def _schedule_saved_query(self, msg, api_type, value, cron, channel=None, fmt=None):
+        fmt = self._check_format(msg=msg, fmt=fmt)
+        if not fmt:
+            return
+
+        if channel:
+            match = CHANNEL_RE.match(channel)
+            if not match:
+                send_text = "Invalid channel {channel!r}, use a #channel link"
+                msg.reply(send_text.format(channel=channel), in_thread=True)
+                return
+            channel = match.group("mention") or match.group("id")
         else:
-            TTL_CACHE[msg.thread_ts] = {"api_type": api_type, "rows": rows}
-            json_rows = json.dumps(rows, indent=2)
-            filename = "{api_type}_{dt}.json".format(api_type=api_type._type, dt=now())
-            self._upload_file_reply(msg=msg, filename=filename, content=json_rows)
+            channel = msg.channel.id
+
+        try:
+            sq = self._find_saved_query(api_type=api_type, value=value)
+        except axonius_api_client.api.exceptions.ObjectNotFound:
+            send_text = "No saved query {value} for {api_type} found"
+            send_text = send_text.format(api_type=api_type._type, value=value)
+            msg.reply(send_text, in_thread=True)
+            return
+        except catalog.AmbiguousName as exc:
+            msg.reply(format(exc), in_thread=True)
+            return
+
+        try:
+            schedule = self.reports.add(
+                api_type=api_type._type,
+                name=sq["name"],
+                cron=cron,
+                channel=channel,
+                fmt=fmt,
+                user=msg.sender.id,
+            )
+        except ValueError as exc:
+            msg.reply(format(exc), in_thread=True)
+            return
+
+        send_text = "Scheduled report {id} of {api_type} saved query {name!r} at "
+        send_text += "`{cron}` in <#{channel}>, next run {next_run}, send "
+        send_text += "*unschedule {id}* to stop"
+        send_text = send_text.format(
+            next_run=format(self.reports.next_run(schedule)).split(".")[0], **schedule
+        )
+        msg.reply(send_text, in_thread=True)
+
+    def _run_report(self, schedule):
+        """Post a scheduled report and upload its rows in the thread of that post.
+
+        Returns:
+            :obj:`int`: number of rows uploaded, or None if the saved query was not
+                found
+
+        """
+        api_type = getattr(self.api, schedule["api_type"])
+        send_text = "Scheduled report {id}: {api_type} saved query {name!r}"
+        response = self.say_webapi(
+            channel=schedule["channel"], text=send_text.format(**schedule)
+        )
+        if not response.get("ok"):
+            msg = "Unable to post report to {channel}: {error}"
+            msg = msg.format(channel=schedule["channel"], error=response.get("error"))
+            raise AxonError(msg=msg, exc=None)
+
+        event = {
+            "channel": schedule["channel"],
+            "ts": response["ts"],
+            "user": schedule["user"],
+            "text": "",
+        }
+        msg = self._gen_message(event)
+        try:
+            return self._get_by_saved_query(
+                api_type=api_type,
+                msg=msg,
+                value=schedule["name"],
+                fmt=schedule["fmt"],
+                full=True,
+            )
+        except Exception as exc:
+            send_text = "Error running scheduled report {id}: {exc}"
+            send_text = send_text.format(id=schedule["id"], exc=exc)
+            logger.exception(send_text)
+            msg.reply(send_text, in_thread=True)
+            raise
+
+    def _poll_watch(self, watch):
+        msg = watch.msg
+        api_type = getattr(self.api, watch.api_type)
+
+        try:
+            request = self._saved_query_request(
+                api_type=api_type, value=watch.name, fmt=watch.fmt
+            )
+        except axonius_api_client.api.exceptions.ObjectNotFound:
+            self.watches.remove(watch.id)
+            send_text = "No saved query {name} for {api_type} found, stopped watch {id}"
+            send_text = send_text.format(
+                name=watch.name, api_type=api_type._type, id=watch.id
+            )
+            msg.reply(send_text, in_thread=True)
+            return
+
+        first = watch.hashes is None
+        rows = self._request_rows(api_type=api_type, request=request)
+        watch.hashes, added, changed, removed = watches.diff_rows(
+            rows=rows, hashes=watch.hashes
+        )
+
+        if watch.removed:
+            return
+
+        if first:
+            send_text = "Watch {id}: {count} {api_type} in saved query {name!r}, "
+            send_text += "changes will be posted here"
+            send_text = send_text.format(
+                id=watch.id,
+                count=len(watch.hashes),
+                api_type=api_type._type,
+                name=watch.name,
+            )
+            msg.reply(send_text, in_thread=True)
+            return
+
+        if not (added or changed or removed):
+            m = "No changes to {api_type} saved query {name!r} for watch {id}"
+            logger.debug(
+                m.format(api_type=api_type._type, name=watch.name, id=watch.id)
+            )
+            return
+
+        watch.stats["changes"] += 1
+        initial_comment = "Watch {id}: {added} added, {changed} changed, {removed} "
+        initial_comment += "removed {api_type} in saved query {name!r}"
+        if removed:
+            initial_comment += ", removed: {ids}"
+        initial_comment = initial_comment.format(
+            id=watch.id,
+            added=len(added),
+            changed=len(changed),
+            removed=len(removed),
+            api_type=api_type._type,
+            name=watch.name,
+            ids=", ".join(removed[:WATCH_REMOVED_MAX])
+            + (", ..." if len(removed) > WATCH_REMOVED_MAX else ""),
+        )
+
+        rows = [dict(x, watch_change="added") for x in added]
+        rows += [dict(x, watch_change="changed") for x in changed]
+        if rows:
+            export = self._export_rows(api_type=api_type, rows=rows, fmt=watch.fmt)
+            self._upload_export(
+                msg=msg,
+                api_type=api_type,
+                export=export,
+                initial_comment=initial_comment,
+            )
+        else:
+            msg.reply(initial_comment, in_thread=True)
+
+        if len(removed) > WATCH_REMOVED_MAX:
+            prefix = "{api_type}_removed_{dt}".format(api_type=api_type._type, dt=now())
+            self._upload_file_reply(
+                msg=msg, filename=prefix + ".txt", content="\n".join(removed)
+            )
+
+    def _watch_failed(self, watch, exc, delay):
+        send_text = "Watch {id}: error polling saved query {name!r}: {exc}"
+        send_text = send_text.format(
+            id=watch.id, name=watch.name, exc=getattr(exc, "msg", exc)
+        )
+        if delay is None:
+            stopped = ", stopped watch after {failures} failed polls in a row"
+            send_text += stopped.format(failures=watch.failures)
+        else:
+            trying = ", trying again in {delay} seconds"
+            send_text += trying.format(delay=delay)
+        watch.msg.reply(send_text, in_thread=True)
+
+    def _get_by_saved_query(self, api_type, msg, value, fmt=None, full=False):
+        """Upload the objects in a saved query.
+
+        Returns:
+            :obj:`int`: number of rows uploaded, or None if the saved query or the
+                format was not found
+
+        """
+        fmt = self._check_format(msg=msg, fmt=fmt)
+        if not fmt:
+            return None
+
+        try:
+            request = self._saved_query_request(api_type=api_type, value=value, fmt=fmt)
+            return self._fetch_export(
+                msg=msg, api_type=api_type, request=request, full=full
+            )
+        except axonius_api_client.api.exceptions.ObjectNotFound:
+            send_text = "No saved query {value} for {api_type} found"
+            send_text = send_text.format(api_type=api_type._type, value=value)
+            msg.reply(send_text, in_thread=True)
+        except catalog.AmbiguousName as exc:
+            msg.reply(format(exc), in_thread=True)
+        except axonius_api_client.api.exceptions.TooFewObjectsFound:
+            send_text = "No {api_type} found using saved query {value}"
+            send_text = send_text.format(api_type=api_type._type, value=value)
+            msg.reply(send_text, in_thread=True)
+            return 0
+        return None
@@ -0,0 +1,193 @@
+"""Local SQLite copy of every user and device for lookups without Axonius."""
+import json
+import logging
+import threading
+import time
+
+from . import exports
+from . import storage
+
+PATH = "axonbot_slack_mirror.sqlite3"
+""":obj:`str`: Default path of the mirror database file."""
+
+CHUNK_SIZE = 1000
+""":obj:`int`: Rows inserted with each statement while a copy is replaced."""
+
+INDEXED = {"devices": ["hostname"], "users": ["username", "mail"]}
+""":obj:`dict`: Fields of each asset type that can be looked up in the mirror."""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS mirror_meta (
+    api_type TEXT PRIMARY KEY,
+    fields TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    built REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS mirror_rows (
+    api_type TEXT NOT NULL,
+    axon_id TEXT NOT NULL,
+    row TEXT NOT NULL,
+    PRIMARY KEY (api_type, axon_id)
+);
+CREATE TABLE IF NOT EXISTS mirror_values (
+    api_type TEXT NOT NULL,
+    field TEXT NOT NULL,
+    value TEXT NOT NULL,
+    axon_id TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS mirror_values_lookup
+    ON mirror_values (api_type, field, value);
+"""
+
+logger = logging.getLogger(__name__)
+
+
+def indexed_values(row, fields):
+    """Get the field, value pairs of a row for the fields that are looked up."""
+    pairs = set()
+    for key, values in exports.flatten(row).items():
+        for field in fields:
+            if key == field or key.endswith("." + field):
+                pairs.update((field, format(x)) for x in values if x is not None)
+    return pairs
+
+
+class Mirror(object):
+    """Users and devices copied to a :class:`axonbot_slack.storage.SqliteDb`.
+
+    Every refresh seconds a daemon thread fetches every asset of each type and
+    replaces its copy in one transaction, so lookups see either the old copy or
+    the new one. Rows are inserted chunk_size at a time as they are fetched, so
+    the whole inventory is never held in memory. Each copy remembers the response
+    fields it was fetched with, and is not used once the response fields change.
+    Processes that share a file skip refreshing a copy that another process
+    refreshed recently.
+    """
+
+    def __init__(
+        self, fetch, refresh, path=PATH, chunk_size=CHUNK_SIZE, clock=time.time
+    ):
+        """Pass."""
+        self.fetch = fetch
+        self.refresh = refresh
+        self.chunk_size = chunk_size
+        self.clock = clock
+        self.db = storage.SqliteDb(path=path, schema=SCHEMA)
+        self.stats = {
+            "builds": 0,
+            "errors": 0,
+            "hits": 0,
+            "misses": 0,
+            "build_seconds": 0.0,
+        }
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Refresh the mirror now and then every refresh seconds in a daemon thread."""
+        self._thread = threading.Thread(target=self._run, name="axonbot_mirror")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def info(self, api_type, fields):
+        """Get the count and age of the copy of api_type.
+
+        Returns:
+            :obj:`dict`: with count and age, or None if there is no copy or the
+                copy was fetched with different response fields
+
+        """
+        row = self.db.execute(
+            "SELECT fields, count, built FROM mirror_meta WHERE api_type = ?",
+            (api_type,),
+        ).fetchone()
+        if row is None or row[0] != json.dumps(fields, sort_keys=True):
+            return None
+        return {"count": row[1], "age": self.clock() - row[2]}
+
+    def find(self, api_type, field, value):
+        """Get the rows of api_type with a value for an indexed field."""
+        rows = self.db.execute(
+            "SELECT DISTINCT r.row FROM mirror_values v JOIN mirror_rows r "
+            "ON r.api_type = v.api_type AND r.axon_id = v.axon_id "
+            "WHERE v.api_type = ? AND v.field = ? AND v.value = ?",
+            (api_type, field, value),
+        ).fetchall()
+        self._count("hits" if rows else "misses")
+        return [json.loads(x[0]) for x in rows]
+
+    def build(self, api_type):
+        """Fetch every asset of api_type and replace its copy."""
+        start = self.clock()
+        fields, rows = self.fetch(api_type)
+        indexed = INDEXED.get(api_type, [])
+
+        count = 0
+        with self.db.transaction() as conn:
+            conn.execute("DELETE FROM mirror_rows WHERE api_type = ?", (api_type,))
+            conn.execute("DELETE FROM mirror_values WHERE api_type = ?", (api_type,))
+
+            axon_rows = []
+            values = []
+            for row in rows:
+                axon_id = row["internal_axon_id"]
+                axon_rows.append((api_type, axon_id, json.dumps(row)))
+                values.extend(
+                    (api_type, field, value, axon_id)
+                    for field, value in indexed_values(row, indexed)
+                )
+                count += 1
+                if len(axon_rows) >= self.chunk_size:
+                    self._insert(conn=conn, axon_rows=axon_rows, values=values)
+                    axon_rows = []
+                    values = []
+            self._insert(conn=conn, axon_rows=axon_rows, values=values)
+
+            conn.execute(
+                "INSERT OR REPLACE INTO mirror_meta (api_type, fields, count, built) "
+                "VALUES (?, ?, ?, ?)",
+                (api_type, json.dumps(fields, sort_keys=True), count, self.clock()),
+            )
+
+        took = self.clock() - start
+        with self._lock:
+            self.stats["builds"] += 1
+            self.stats["build_seconds"] = took
+
+        m = "Mirrored {count} {api_type} in {took:.2f}s"
+        logger.info(m.format(count=count, api_type=api_type, took=took))
+
+    def _insert(self, conn, axon_rows, values):
+        conn.executemany(
+            "INSERT OR REPLACE INTO mirror_rows (api_type, axon_id, row) "
+            "VALUES (?, ?, ?)",
+            axon_rows,
+        )
+        conn.executemany(
+            "INSERT INTO mirror_values (api_type, field, value, axon_id) "
+            "VALUES (?, ?, ?, ?)",
+            values,
+        )
+
+    def _built(self, api_type):
+        row = self.db.execute(
+            "SELECT built FROM mirror_meta WHERE api_type = ?", (api_type,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _run(self):
+        while True:
+            for api_type in INDEXED:
+                built = self._built(api_type)
+                if built is not None and self.clock() - built < self.refresh:
+                    continue
+                try:
+                    self.build(api_type)
+                except Exception:
+                    self._count("errors")
+                    logger.exception("Error mirroring {}".format(api_type))
+            time.sleep(self.refresh)
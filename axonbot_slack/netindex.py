@@ -0,0 +1,196 @@
+"""In memory index of device network interfaces for fast IP, MAC, and subnet lookups."""
+import bisect
+import ipaddress
+import logging
+import re
+import threading
+import time
+
+from . import exports
+
+FIELDS = [
+    "specific_data.data.network_interfaces.ips",
+    "specific_data.data.network_interfaces.mac",
+]
+""":obj:`list` of :obj:`str`: Device fields fetched to build the index."""
+
+IPS_POSTFIX = "network_interfaces.ips"
+""":obj:`str`: Postfix of the flattened row keys that hold IP addresses."""
+
+MAC_POSTFIX = "network_interfaces.mac"
+""":obj:`str`: Postfix of the flattened row keys that hold MAC addresses."""
+
+MAC_STRIP_RE = re.compile(r"[^0-9a-fA-F]")
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_ip(value):
+    """Parse an IP address into its version and integer value.
+
+    Raises:
+        :exc:`ValueError`: if value is not an IP address.
+
+    """
+    ip = ipaddress.ip_address(format(value).strip())
+    return ip.version, int(ip)
+
+
+def normalize_mac(value):
+    """Normalize a MAC address to upper case hex pairs seperated by colons.
+
+    Raises:
+        :exc:`ValueError`: if value is not a MAC address.
+
+    """
+    digits = MAC_STRIP_RE.sub("", format(value)).upper()
+    if len(digits) != 12:
+        raise ValueError("Invalid MAC address {!r}".format(value))
+    return ":".join(a + b for a, b in zip(digits[::2], digits[1::2]))
+
+
+class _Snapshot(object):
+    """One build of the index, replaced as a whole on every refresh."""
+
+    def __init__(self, rows, built):
+        """Pass."""
+        self.built = built
+        self.ids = set()
+        self.ips = {}
+        self.macs = {}
+        self.ranges = {4: [], 6: []}
+
+        for row in rows:
+            axon_id = row["internal_axon_id"]
+            self.ids.add(axon_id)
+            for key, values in exports.flatten(row).items():
+                if key.endswith(IPS_POSTFIX):
+                    self._add(values, normalize_ip, self.ips, axon_id)
+                elif key.endswith(MAC_POSTFIX):
+                    self._add(values, normalize_mac, self.macs, axon_id)
+
+        for (version, number), ids in self.ips.items():
+            self.ranges[version].extend((number, x) for x in ids)
+        self.keys = {}
+        for version, pairs in self.ranges.items():
+            pairs.sort()
+            self.keys[version] = [x[0] for x in pairs]
+
+    @staticmethod
+    def _add(values, normalize, into, axon_id):
+        for value in values:
+            try:
+                key = normalize(value)
+            except ValueError:
+                continue
+            ids = into.setdefault(key, [])
+            if axon_id not in ids:
+                ids.append(axon_id)
+
+
+class NetIndex(object):
+    """Device IPs and MACs mapped to device IDs, rebuilt in the background.
+
+    Exact IPs and MACs are dict lookups. Subnets are looked up with a binary
+    search over the sorted integer values of every IP, which finds every address
+    in a CIDR range without a tree node per bit. Each refresh fetches every
+    device with :data:`FIELDS` and swaps in a new snapshot when it is done, so
+    lookups never wait on a refresh. Lookups return internal_axon_id values,
+    so the devices can be fetched with whatever fields the caller needs.
+    """
+
+    def __init__(self, fetch, refresh, clock=time.monotonic):
+        """Pass."""
+        self.fetch = fetch
+        self.refresh = refresh
+        self.clock = clock
+        self.stats = {"builds": 0, "errors": 0, "lookups": 0, "build_seconds": 0.0}
+        self._snapshot = None
+        self._thread = None
+
+    @property
+    def ready(self):
+        """Check if the index has been built at least once."""
+        return self._snapshot is not None
+
+    @property
+    def age(self):
+        """Get the number of seconds since the index was built."""
+        return self.clock() - self._snapshot.built
+
+    @property
+    def size(self):
+        """Get the number of devices, IPs, and MACs in the index."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {"devices": 0, "ips": 0, "macs": 0}
+        return {
+            "devices": len(snapshot.ids),
+            "ips": len(snapshot.ips),
+            "macs": len(snapshot.macs),
+        }
+
+    def start(self):
+        """Build the index now and then every refresh seconds in a daemon thread."""
+        self._thread = threading.Thread(target=self._run, name="axonbot_net_index")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def build(self):
+        """Fetch every device and replace the index."""
+        start = self.clock()
+        snapshot = _Snapshot(rows=self.fetch(), built=self.clock())
+        self._snapshot = snapshot
+        self.stats["builds"] += 1
+        self.stats["build_seconds"] = self.clock() - start
+
+        m = "Built network index of {devices} devices, {ips} IPs, {macs} MACs"
+        m += " in {seconds:.2f}s"
+        logger.info(m.format(seconds=self.stats["build_seconds"], **self.size))
+
+    def find_ip(self, value):
+        """Get the IDs of devices with an IP address."""
+        return self._find(value=value, normalize=normalize_ip, attr="ips")
+
+    def find_mac(self, value):
+        """Get the IDs of devices with a MAC address."""
+        return self._find(value=value, normalize=normalize_mac, attr="macs")
+
+    def find_subnet(self, value):
+        """Get the IDs of devices with an IP address in a CIDR range.
+
+        Raises:
+            :exc:`ValueError`: if value is not a CIDR range.
+
+        """
+        network = ipaddress.ip_network(value.strip(), strict=False)
+        snapshot = self._snapshot
+        self.stats["lookups"] += 1
+
+        keys = snapshot.keys[network.version]
+        pairs = snapshot.ranges[network.version]
+        lo = bisect.bisect_left(keys, int(network.network_address))
+        hi = bisect.bisect_right(keys, int(network.broadcast_address))
+
+        ids = {}
+        for _, axon_id in pairs[lo:hi]:
+            ids.setdefault(axon_id, None)
+        return list(ids)
+
+    def _find(self, value, normalize, attr):
+        snapshot = self._snapshot
+        self.stats["lookups"] += 1
+        try:
+            key = normalize(value)
+        except ValueError:
+            return []
+        return list(getattr(snapshot, attr).get(key, []))
+
+    def _run(self):
+        while True:
+            try:
+                self.build()
+            except Exception:
+                self.stats["errors"] += 1
+                logger.exception("Error building network index")
+            time.sleep(self.refresh)
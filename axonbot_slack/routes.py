@@ -0,0 +1,139 @@
+"""Single command router for the methods of a plugin."""
+import inspect
+import re
+import threading
+import time
+
+LITERAL_RE = re.compile(r"[^\\()\[\]{}?*+|$.^]*")
+""":obj:`re.Pattern`: Leading part of a regex pattern without any special chars."""
+
+KEY_WORDS = 2
+""":obj:`int`: Number of leading words used to look up the routes to try."""
+
+
+def route(regex, flags=re.IGNORECASE):
+    """Mark a plugin method as a command handled by :class:`Router`.
+
+    Works like :func:`machine.plugins.decorators.respond_to`, and keeps the method
+    docstring in the help output, but the regex is only tried against messages
+    that start with the same words.
+    """
+
+    def route_decorator(f):
+        f.metadata = getattr(f, "metadata", {})
+        f.metadata.setdefault("plugin_actions", {})
+        f.routes = getattr(f, "routes", []) + [re.compile(regex, flags)]
+        return f
+
+    return route_decorator
+
+
+def literal_words(pattern):
+    """Get the leading words of a regex pattern that every match must start with."""
+    pattern = pattern[1:] if pattern.startswith("^") else pattern
+    literal = LITERAL_RE.match(pattern).group(0)
+    words = literal.lower().split()
+    end = len(literal)
+    rest = pattern[end:]
+
+    # the last word may continue into the next part of the pattern
+    if words and not literal[-1:].isspace() and not rest.startswith("$"):
+        words = words[:-1]
+    return tuple(words[:KEY_WORDS])
+
+
+def message_words(text):
+    """Get the leading words of a message used to look up routes."""
+    return tuple(text.lower().split(None, KEY_WORDS)[:KEY_WORDS])
+
+
+class Route(object):
+    """A compiled regex and the method it dispatches to."""
+
+    def __init__(self, regex, method):
+        """Pass."""
+        self.regex = regex
+        self.method = method
+        self.name = method.__name__
+        self.key = literal_words(regex.pattern)
+        self.stats = {"calls": 0, "errors": 0, "seconds": 0.0, "max_seconds": 0.0}
+
+
+class Router(object):
+    """Dispatch messages to the :func:`route` methods of an object.
+
+    Routes are grouped by the leading literal words of their pattern, so a
+    message is only matched against the few routes that start with the same
+    words no matter how many commands there are. The first route that matches
+    is called with the named groups of the match as keyword arguments.
+    """
+
+    def __init__(self, obj, clock=time.monotonic):
+        """Pass."""
+        self.clock = clock
+        self.routes = []
+        self.table = {}
+        self.stats = {"messages": 0, "unmatched": 0, "lookup_seconds": 0.0}
+        self._lock = threading.Lock()
+
+        for name, func in inspect.getmembers(type(obj), inspect.isfunction):
+            for regex in getattr(func, "routes", []):
+                self.add(Route(regex=regex, method=getattr(obj, name)))
+
+    def add(self, new_route):
+        """Add a route to the table."""
+        self.routes.append(new_route)
+        self.table.setdefault(new_route.key, []).append(new_route)
+
+    def find(self, text):
+        """Find the route that matches text.
+
+        Returns:
+            :obj:`tuple` of :obj:`Route`, :obj:`re.Match`, or None, None
+
+        """
+        words = message_words(text)
+        for size in range(len(words), -1, -1):
+            for candidate in self.table.get(words[:size], []):
+                match = candidate.regex.search(text)
+                if match:
+                    return candidate, match
+        return None, None
+
+    def dispatch(self, msg):
+        """Call the method for the route that matches the text of msg.
+
+        Returns:
+            :obj:`bool`: if a route matched
+
+        """
+        start = self.clock()
+        found, match = self.find(msg.text or "")
+        lookup = self.clock() - start
+
+        with self._lock:
+            self.stats["messages"] += 1
+            self.stats["lookup_seconds"] += lookup
+            if found is None:
+                self.stats["unmatched"] += 1
+
+        if found is None:
+            return False
+
+        start = self.clock()
+        try:
+            found.method(msg, **match.groupdict())
+        except Exception:
+            self._count(found, start, error=True)
+            raise
+        self._count(found, start)
+        return True
+
+    def _count(self, found, start, error=False):
+        took = self.clock() - start
+        with self._lock:
+            stats = found.stats
+            stats["calls"] += 1
+            stats["errors"] += 1 if error else 0
+            stats["seconds"] += took
+            stats["max_seconds"] = max(stats["max_seconds"], took)
@@ -0,0 +1,419 @@
+"""Saved query reports run on cron schedules."""
+import datetime
+import json
+import logging
+import re
+import threading
+import time
+
+from apscheduler.jobstores.base import JobLookupError
+from apscheduler.triggers.cron import CronTrigger
+
+from . import jobs
+
+WORKERS = 2
+""":obj:`int`: Default number of reports that can run at the same time."""
+
+JITTER = 60
+""":obj:`int`: Default maximum random seconds added to the start of each report."""
+
+MISFIRE_GRACE = 5 * 60
+""":obj:`int`: Seconds a report can start late before the run is skipped."""
+
+STORAGE_KEY = "schedules"
+""":obj:`str`: Plugin storage key that schedules are saved under."""
+
+SYNC_INTERVAL = 60
+""":obj:`int`: Seconds between loads of schedules changed by other bot processes."""
+
+CLAIM_TTL = 7 * 24 * 60 * 60
+""":obj:`int`: Seconds that claimed runs are kept in a shared store."""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS schedules (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    schedule TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS schedule_runs (
+    schedule_id INTEGER NOT NULL,
+    fire_time TEXT NOT NULL,
+    claimed REAL NOT NULL,
+    PRIMARY KEY (schedule_id, fire_time)
+);
+"""
+
+DAY_NAMES = ["sun", "mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+DAY_RE = re.compile(r"^(?P<start>\*|\d+)(?:-(?P<end>\d+))?(?:/(?P<step>\d+))?$")
+
+logger = logging.getLogger(__name__)
+
+
+def cron_days(value):
+    """Convert a crontab day of week field, where 0 and 7 are Sunday, to day names.
+
+    The cron trigger counts days from Monday, so numbers are changed to names
+    to keep the meaning they have in a crontab.
+
+    Raises:
+        :exc:`ValueError`: if a day number is not 0 to 7.
+
+    """
+    if value == "*":
+        return value
+
+    days = []
+    for part in value.split(","):
+        match = DAY_RE.match(part)
+        if not match:
+            days.append(part)
+            continue
+
+        start, end, step = match.group("start", "end", "step")
+        if start == "*":
+            start, end = 0, 6
+        else:
+            start = int(start)
+            end = int(end) if end else (6 if step else start)
+        if not 0 <= start <= end <= 7:
+            raise ValueError("Invalid day of week {!r}, use 0 to 7".format(part))
+
+        for day in range(start, end + 1, int(step or 1)):
+            if DAY_NAMES[day] not in days:
+                days.append(DAY_NAMES[day])
+    return ",".join(days)
+
+
+def cron_trigger(expr, jitter=None):
+    """Build a trigger from a crontab expression of minute hour day month day_of_week.
+
+    Raises:
+        :exc:`ValueError`: if expr is not a valid crontab expression.
+
+    """
+    values = expr.split()
+    if len(values) != 5:
+        msg = "Invalid cron expression {expr!r}, need 5 fields: "
+        msg += "minute hour day month day_of_week"
+        raise ValueError(msg.format(expr=expr))
+
+    minute, hour, day, month, day_of_week = values
+    return CronTrigger(
+        minute=minute,
+        hour=hour,
+        day=day,
+        month=month,
+        day_of_week=cron_days(day_of_week),
+        jitter=jitter or None,
+    )
+
+
+def next_run(trigger):
+    """Get the next time a trigger fires, without jitter."""
+    return trigger.get_next_fire_time(None, datetime.datetime.now(trigger.timezone))
+
+
+def last_run(trigger, now, window):
+    """Get the last time a trigger fired, without jitter, up to window seconds ago.
+
+    Every process that runs a schedule gets the same time for the same run, even
+    though each one adds its own jitter.
+    """
+    fire = trigger.get_next_fire_time(None, now - datetime.timedelta(seconds=window))
+    last = None
+    while fire is not None and fire <= now:
+        last = fire
+        fire = trigger.get_next_fire_time(fire, fire + datetime.timedelta(seconds=1))
+    return last or now.replace(second=0, microsecond=0)
+
+
+class PluginStore(object):
+    """Schedules saved in slack-machine plugin storage, for a single bot process."""
+
+    shared = False
+
+    def __init__(self, storage):
+        """Pass."""
+        self.storage = storage
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Get every saved schedule."""
+        saved = self.storage.get(STORAGE_KEY) or {}
+        return list(saved.get("schedules", {}).values())
+
+    def add(self, schedule):
+        """Save a schedule with the next ID and return it."""
+        with self._lock:
+            saved = self.storage.get(STORAGE_KEY) or {}
+            schedule = dict(schedule, id=saved.get("next_id", 1))
+            schedules = dict(saved.get("schedules", {}))
+            schedules[schedule["id"]] = schedule
+            saved = {"next_id": schedule["id"] + 1, "schedules": schedules}
+            self.storage.set(STORAGE_KEY, saved)
+        return schedule
+
+    def remove(self, schedule_id):
+        """Delete a schedule, or return None if there is no schedule_id."""
+        with self._lock:
+            saved = self.storage.get(STORAGE_KEY) or {}
+            schedules = dict(saved.get("schedules", {}))
+            schedule = schedules.pop(schedule_id, None)
+            if schedule is not None:
+                saved = dict(saved, schedules=schedules)
+                self.storage.set(STORAGE_KEY, saved)
+        return schedule
+
+    def claim(self, schedule_id, fire_time):
+        """Claim a run, always granted since no other process runs the schedules."""
+        return True
+
+
+class SqliteStore(object):
+    """Schedules saved in a :class:`axonbot_slack.storage.SqliteDb` shared by processes.
+
+    IDs are handed out by the database, so processes that add schedules at the
+    same time never get the same ID. Every process runs every schedule, and
+    before a run is sent its schedule ID and cron time are inserted into a
+    table where they are unique, so only the first process to claim a run sends
+    it.
+    """
+
+    shared = True
+
+    def __init__(self, db, clock=time.time):
+        """Pass."""
+        self.db = db
+        self.clock = clock
+
+    def load(self):
+        """Get every saved schedule."""
+        rows = self.db.execute("SELECT id, schedule FROM schedules").fetchall()
+        return [dict(json.loads(x[1]), id=x[0]) for x in rows]
+
+    def add(self, schedule):
+        """Save a schedule with the next ID and return it."""
+        with self.db.transaction() as conn:
+            cursor = conn.execute(
+                "INSERT INTO schedules (schedule) VALUES (?)", (json.dumps(schedule),)
+            )
+        return dict(schedule, id=cursor.lastrowid)
+
+    def remove(self, schedule_id):
+        """Delete a schedule, or return None if there is no schedule_id."""
+        with self.db.transaction() as conn:
+            row = conn.execute(
+                "SELECT schedule FROM schedules WHERE id = ?", (schedule_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("DELETE FROM schedules WHERE id = ?", (schedule_id,))
+            conn.execute(
+                "DELETE FROM schedule_runs WHERE schedule_id = ?", (schedule_id,)
+            )
+        return dict(json.loads(row[0]), id=schedule_id)
+
+    def claim(self, schedule_id, fire_time):
+        """Claim the run of a schedule at fire_time for this process.
+
+        Returns:
+            :obj:`bool`: False if another process claimed the run first or the
+                schedule was removed
+
+        """
+        now = self.clock()
+        with self.db.transaction() as conn:
+            found = conn.execute(
+                "SELECT 1 FROM schedules WHERE id = ?", (schedule_id,)
+            ).fetchone()
+            if found is None:
+                return False
+            conn.execute(
+                "DELETE FROM schedule_runs WHERE claimed < ?", (now - CLAIM_TTL,)
+            )
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO schedule_runs (schedule_id, fire_time, claimed) "
+                "VALUES (?, ?, ?)",
+                (schedule_id, fire_time.isoformat(), now),
+            )
+        return cursor.rowcount == 1
+
+
+class ReportScheduler(object):
+    """Run saved query reports on cron schedules, limiting how many run at once.
+
+    Each schedule is a cron job in the slack-machine scheduler. When it fires,
+    up to jitter seconds late, the run is claimed in the store and handed to a
+    :class:`axonbot_slack.jobs.JobPool` of workers threads, so reports that are
+    due at the same time wait for each other instead of all running at once.
+    With a shared store, schedules added or removed by other processes are
+    loaded every sync seconds, and each run is sent by only one process.
+    """
+
+    def __init__(
+        self,
+        run,
+        store,
+        scheduler,
+        workers=WORKERS,
+        jitter=JITTER,
+        sync=SYNC_INTERVAL,
+        clock=time.monotonic,
+    ):
+        """Pass."""
+        self.run = run
+        self.store = store
+        self.scheduler = scheduler
+        self.workers = workers
+        self.jitter = jitter
+        self.sync_interval = sync
+        self.clock = clock
+        self.schedules = {}
+        self.runs = {}
+        self.stats = {"runs": 0, "errors": 0, "skipped": 0, "claimed_elsewhere": 0}
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def load(self):
+        """Add the jobs for the saved schedules, and keep them in step if shared."""
+        self.sync()
+        if self.store.shared and self.sync_interval:
+            self.scheduler.add_job(
+                self.sync,
+                trigger="interval",
+                seconds=self.sync_interval,
+                id="axonbot_schedule_sync",
+                replace_existing=True,
+                coalesce=True,
+            )
+
+    def sync(self):
+        """Add jobs for new saved schedules and remove the jobs of deleted ones."""
+        try:
+            saved = {x["id"]: x for x in self.store.load()}
+        except Exception:
+            logger.exception("Error loading schedules")
+            return
+
+        for schedule_id in [x for x in self.schedules if x not in saved]:
+            self._remove_job(schedule_id)
+
+        for schedule_id, schedule in saved.items():
+            if schedule_id in self.schedules:
+                continue
+            try:
+                self._add_job(schedule)
+            except Exception:
+                m = "Error loading schedule {id} of saved query {name!r}"
+                logger.exception(m.format(**schedule))
+
+    def add(self, api_type, name, cron, channel, fmt, user):
+        """Add and save a schedule.
+
+        Returns:
+            :obj:`dict`: the schedule
+
+        Raises:
+            :exc:`ValueError`: if cron is not a valid crontab expression.
+
+        """
+        cron_trigger(cron)
+        schedule = self.store.add(
+            {
+                "api_type": api_type,
+                "name": name,
+                "cron": cron,
+                "channel": channel,
+                "fmt": fmt,
+                "user": user,
+            }
+        )
+        self._add_job(schedule)
+        return schedule
+
+    def remove(self, schedule_id):
+        """Remove a schedule, or return None if there is no schedule_id."""
+        schedule = self.store.remove(schedule_id)
+        self._remove_job(schedule_id)
+        return schedule
+
+    def next_run(self, schedule):
+        """Get the next time a schedule runs, without jitter."""
+        return next_run(cron_trigger(schedule["cron"]))
+
+    def _job_id(self, schedule_id):
+        return "axonbot_schedule_{}".format(schedule_id)
+
+    def _add_job(self, schedule):
+        trigger = cron_trigger(schedule["cron"], jitter=self.jitter)
+        with self._lock:
+            self.scheduler.add_job(
+                self._fire,
+                trigger=trigger,
+                args=[schedule["id"]],
+                id=self._job_id(schedule["id"]),
+                replace_existing=True,
+                coalesce=True,
+                misfire_grace_time=MISFIRE_GRACE,
+            )
+            self.schedules[schedule["id"]] = schedule
+            self.runs.setdefault(
+                schedule["id"], {"runs": 0, "errors": 0, "rows": 0, "seconds": 0.0}
+            )
+
+    def _remove_job(self, schedule_id):
+        with self._lock:
+            self.schedules.pop(schedule_id, None)
+            self.runs.pop(schedule_id, None)
+
+        try:
+            self.scheduler.remove_job(self._job_id(schedule_id))
+        except JobLookupError:
+            pass
+
+    def _fire(self, schedule_id):
+        with self._lock:
+            if self._pool is None:
+                self._pool = jobs.JobPool(
+                    workers=self.workers, queue_size=0, name="schedule"
+                )
+        self._pool.submit(method=self._run, schedule_id=schedule_id)
+
+    def _claim(self, schedule):
+        trigger = cron_trigger(schedule["cron"])
+        fire_time = last_run(
+            trigger=trigger,
+            now=datetime.datetime.now(trigger.timezone),
+            window=self.jitter + MISFIRE_GRACE + 60,
+        )
+        return self.store.claim(schedule_id=schedule["id"], fire_time=fire_time)
+
+    def _run(self, schedule_id):
+        schedule = self.schedules.get(schedule_id)
+        if schedule is None:
+            with self._lock:
+                self.stats["skipped"] += 1
+            return
+
+        if not self._claim(schedule):
+            with self._lock:
+                self.stats["claimed_elsewhere"] += 1
+            return
+
+        start = self.clock()
+        rows = None
+        try:
+            rows = self.run(schedule)
+        finally:
+            took = self.clock() - start
+            with self._lock:
+                runs = self.runs.get(schedule_id, {})
+                runs["runs"] = runs.get("runs", 0) + 1
+                runs["errors"] = runs.get("errors", 0) + int(rows is None)
+                runs["rows"] = rows or 0
+                runs["seconds"] = took
+                self.stats["runs"] += 1
+                self.stats["errors"] += int(rows is None)
+
+            m = "Ran schedule {id} of {api_type} saved query {name!r}: "
+            m += "{rows} rows in {took:.2f}s"
+            logger.info(m.format(rows=rows, took=took, **schedule))
@@ -0,0 +1,135 @@
+"""Precomputed name index over the field schema of an Axonius instance."""
+import difflib
+
+from axonius_api_client import constants
+from axonius_api_client.api import exceptions
+
+GENERIC = "generic"
+""":obj:`str`: Name used for the generic (correlated) adapter."""
+
+ADAPTER_POSTFIX = "_adapter"
+""":obj:`str`: Postfix of every adapter name in the schema."""
+
+FIELD_ALIASES = {
+    GENERIC: {
+        "ip": "network_interfaces.ips",
+        "ips": "network_interfaces.ips",
+        "mac": "network_interfaces.mac",
+        "email": "mail",
+    }
+}
+""":obj:`dict`: Short names per adapter mapped to the field name they stand for."""
+
+SUGGEST_MAX = 5
+""":obj:`int`: Maximum number of 'did you mean' suggestions to offer."""
+
+
+def normalize(name):
+    """Normalize a name for use as an index key."""
+    return name.strip().lower()
+
+
+def suggest(name, choices):
+    """Get the names in choices that are closest to name."""
+    return difflib.get_close_matches(normalize(name), choices, n=SUGGEST_MAX)
+
+
+class FieldIndex(object):
+    """Dict lookups from adapter and field names to their canonical names.
+
+    Built once from :meth:`axonius_api_client.api.models.UserDeviceBase.get_fields`
+    so that resolving a name does not need to scan every adapter and field. Keys are
+    lowercased, and fields are indexed by fully qualified name, by name with the
+    adapter prefix stripped, by title, and by any :data:`FIELD_ALIASES`.
+    """
+
+    def __init__(self, known_fields):
+        """Pass."""
+        self.known_fields = known_fields
+        self.adapters = {GENERIC: GENERIC}
+        self.adapter_names = []
+        self.fields = {}
+        self.field_names = {}
+
+        self._add_adapter(
+            adapter=GENERIC,
+            prefix=constants.GENERIC_FIELD_PREFIX,
+            container=known_fields[GENERIC],
+        )
+        self.fields[GENERIC].setdefault("adapters", "adapters")
+        self.fields[GENERIC].setdefault("labels", "labels")
+
+        for adapter, container in known_fields["specific"].items():
+            short = adapter[: -len(ADAPTER_POSTFIX)]
+            self.adapters[normalize(adapter)] = adapter
+            self.adapters.setdefault(normalize(short), adapter)
+            self.adapter_names.append(short)
+            self._add_adapter(
+                adapter=adapter,
+                prefix=constants.ADAPTER_FIELD_PREFIX.format(adapter_name=adapter),
+                container=container,
+            )
+
+        self.adapter_names.sort()
+
+    def find_adapter(self, name):
+        """Resolve an adapter name to the name used in the schema.
+
+        Raises:
+            :exc:`exceptions.UnknownAdapterName`: with 'did you mean' suggestions.
+
+        """
+        found = self.adapters.get(normalize(name))
+        if found is None:
+            exc = exceptions.UnknownAdapterName(
+                name=name, known_names=self.adapter_names
+            )
+            exc.suggestions = suggest(name, [GENERIC] + self.adapter_names)
+            raise exc
+        return found
+
+    def find_field(self, name, adapter):
+        """Resolve an adapter and field name to the names used in the schema.
+
+        Raises:
+            :exc:`exceptions.UnknownAdapterName`: with 'did you mean' suggestions.
+            :exc:`exceptions.UnknownFieldName`: with 'did you mean' suggestions.
+
+        """
+        adapter = self.find_adapter(adapter)
+        found = self.fields[adapter].get(normalize(name))
+        if found is None:
+            exc = exceptions.UnknownFieldName(
+                name=name, adapter=adapter, known_names=self.field_names[adapter]
+            )
+            exc.suggestions = suggest(name, self.field_names[adapter])
+            raise exc
+        return adapter, found
+
+    def _add_adapter(self, adapter, prefix, container):
+        keys = {}
+        names = []
+        strip = prefix + "."
+
+        for field in container:
+            name = field["name"]
+            short = name.replace(strip, "", 1) if name.startswith(strip) else name
+            keys[normalize(name)] = name
+            keys.setdefault(normalize(short), name)
+            names.append(short)
+
+        for field in container:
+            title = field.get("title")
+            if title:
+                keys.setdefault(normalize(title), field["name"])
+                keys.setdefault(normalize(title).replace(" ", "_"), field["name"])
+
+        for alias, target in FIELD_ALIASES.get(adapter, {}).items():
+            if normalize(target) in keys:
+                keys.setdefault(alias, keys[normalize(target)])
+
+        keys["all"] = prefix
+        keys[normalize(prefix)] = prefix
+
+        self.fields[adapter] = keys
+        self.field_names[adapter] = sorted(names) + ["all", prefix]
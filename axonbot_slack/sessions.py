@@ -0,0 +1,163 @@
+"""Pooled HTTP adapter and re-login client for the Axonius session."""
+import threading
+
+import axonius_api_client
+import requests
+from urllib3.util.retry import Retry
+
+POOL_SIZE = 20
+""":obj:`int`: Default number of connections kept open to the Axonius instance."""
+
+RETRIES = 3
+""":obj:`int`: Default number of times to retry a failed request."""
+
+BACKOFF = 1
+""":obj:`int`: Default backoff factor in seconds between retries."""
+
+CONNECT_TIMEOUT = 5
+""":obj:`int`: Default seconds to wait for a connection to the Axonius instance."""
+
+READ_TIMEOUT = 60
+""":obj:`int`: Default seconds to wait for a response from the Axonius instance."""
+
+RETRY_STATUSES = [500, 502, 503, 504]
+""":obj:`list` of :obj:`int`: Response status codes that are retried."""
+
+RETRY_METHODS = frozenset(["GET", "HEAD", "OPTIONS"])
+""":obj:`frozenset` of :obj:`str`: Request methods that are retried."""
+
+ACCEPT_ENCODING = "gzip, deflate"
+""":obj:`str`: Accept-Encoding header sent with every request."""
+
+KEEPALIVE = 60
+""":obj:`int`: Default seconds between health checks of the Axonius session."""
+
+REAUTH_STATUSES = [401, 403]
+""":obj:`list` of :obj:`int`: Response status codes that cause a re-login."""
+
+REAUTH_MIN_INTERVAL = 5
+""":obj:`int`: Seconds after a re-login that other failures reuse it."""
+
+
+def build_retry(retries, backoff):
+    """Build the retry policy of :class:`PooledAdapter`."""
+    kwargs = {
+        "total": retries,
+        "connect": retries,
+        # False instead of 0 re-raises the read timeout as is, so it is not
+        # mistaken for a connection error and sent again after a re-login
+        "read": False,
+        "status": retries,
+        "backoff_factor": backoff,
+        "status_forcelist": RETRY_STATUSES,
+        "raise_on_status": False,
+    }
+    try:
+        return Retry(allowed_methods=RETRY_METHODS, **kwargs)
+    except TypeError:
+        # urllib3 before 1.26 calls it method_whitelist
+        return Retry(method_whitelist=RETRY_METHODS, **kwargs)
+
+
+class PooledAdapter(requests.adapters.HTTPAdapter):
+    """HTTP adapter with a larger connection pool and retries with backoff.
+
+    Keeps up to pool_size connections open per host, so concurrent commands
+    reuse connections instead of opening and discarding them. Connection errors
+    and 5xx responses to GET requests are retried up to retries times, sleeping
+    backoff * 2 ** (retry - 1) seconds between tries. The last 5xx response is
+    returned instead of raising, so the API client can report it. Read timeouts
+    are never retried, so a slow query is not sent again to a slow instance,
+    and POST requests like adding labels are never sent twice.
+    """
+
+    def __init__(self, pool_size=POOL_SIZE, retries=RETRIES, backoff=BACKOFF):
+        """Pass."""
+        self.counts = {"requests": 0, "errors": 0, "retries": 0, "compressed": 0}
+        self._lock = threading.Lock()
+        super().__init__(
+            pool_maxsize=pool_size,
+            max_retries=build_retry(retries=retries, backoff=backoff),
+        )
+
+    @property
+    def stats(self):
+        """Get request counts and how many requests reused a connection."""
+        connections = 0
+        sent = 0
+        pools = self.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                connections += pool.num_connections
+                sent += pool.num_requests
+
+        with self._lock:
+            stats = dict(self.counts)
+        stats["connections"] = connections
+        stats["reused"] = max(sent - connections, 0)
+        return stats
+
+    def send(self, request, **kwargs):
+        """Pass."""
+        try:
+            response = super().send(request, **kwargs)
+        except Exception:
+            self._count("errors")
+            raise
+
+        retries = getattr(response.raw, "retries", None)
+        with self._lock:
+            self.counts["requests"] += 1
+            self.counts["retries"] += len(retries.history) if retries else 0
+            if response.headers.get("Content-Encoding") in ("gzip", "deflate"):
+                self.counts["compressed"] += 1
+        return response
+
+    def _count(self, stat):
+        with self._lock:
+            self.counts[stat] += 1
+
+
+class ReauthHttpClient(axonius_api_client.http.HttpClient):
+    """HTTP client that logs in again and retries once when a request fails.
+
+    A request that gets a 401 or 403 response calls reauth, then is sent one
+    more time. So does a GET request that fails to connect, but a POST that
+    fails to connect is not sent again, since its body may already have been
+    sent. Requests sent by reauth itself are not retried. Read timeouts are not
+    retried, so a slow query is not run twice.
+    """
+
+    def __init__(self, url, reauth=None, **kwargs):
+        """Pass."""
+        super().__init__(url, **kwargs)
+        self.reauth = reauth
+        self.retried = 0
+        self._local = threading.local()
+
+    def __call__(self, path="", route="", method="get", **kwargs):
+        """Pass."""
+        kwargs.update(path=path, route=route, method=method)
+        if self.reauth is None or getattr(self._local, "active", False):
+            return super().__call__(**kwargs)
+
+        try:
+            response = super().__call__(**kwargs)
+        except requests.exceptions.ConnectionError as exc:
+            if method.upper() not in RETRY_METHODS:
+                raise
+            reason = exc
+        else:
+            if response.status_code not in REAUTH_STATUSES:
+                return response
+            reason = "{} response".format(response.status_code)
+
+        self._local.active = True
+        try:
+            self.reauth(reason=reason)
+        finally:
+            self._local.active = False
+
+        self.retried += 1
+        return super().__call__(**kwargs)
@@ -0,0 +1,309 @@
+"""SQLite backed storage shared by every bot process on a host."""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from machine.storage.backends.base import MachineBaseStorage
+
+PATH = "axonbot_slack.sqlite3"
+""":obj:`str`: Default path of the SQLite database file."""
+
+BUSY_TIMEOUT = 30
+""":obj:`int`: Seconds to wait for another process to release a lock."""
+
+ID_KEY = "internal_axon_id"
+""":obj:`str`: Row key kept when thread context is trimmed."""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS machine (
+    key TEXT PRIMARY KEY,
+    value BLOB,
+    expires REAL
+);
+CREATE INDEX IF NOT EXISTS machine_expires ON machine (expires);
+CREATE TABLE IF NOT EXISTS threads (
+    thread_ts TEXT PRIMARY KEY,
+    api_type TEXT NOT NULL,
+    rows TEXT NOT NULL,
+    row_count INTEGER,
+    request TEXT,
+    trimmed INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS threads_used ON threads (used);
+"""
+
+
+class SqliteDb(object):
+    """One SQLite connection per thread to a database file in WAL mode.
+
+    SQLite file locks make writes from several processes safe, and WAL mode lets
+    readers carry on while another process is writing. Writers that find the
+    database locked wait up to busy_timeout seconds.
+    """
+
+    def __init__(self, path=PATH, busy_timeout=BUSY_TIMEOUT, schema=SCHEMA):
+        """Pass."""
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+
+        conn = self.conn
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(schema)
+
+    @property
+    def conn(self):
+        """Get the connection for the current thread."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path, timeout=self.busy_timeout, isolation_level=None
+            )
+            self._local.conn = conn
+        return conn
+
+    def execute(self, sql, params=()):
+        """Run a single statement outside of a transaction."""
+        return self.conn.execute(sql, params)
+
+    def transaction(self):
+        """Start a write transaction, for use as a context manager."""
+        return _Transaction(self.conn)
+
+
+class _Transaction(object):
+    """Take the write lock up front so that read-then-write is atomic."""
+
+    def __init__(self, conn):
+        """Pass."""
+        self.conn = conn
+
+    def __enter__(self):
+        """Pass."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        """Pass."""
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+class SqliteStorage(MachineBaseStorage):
+    """Storage backend for slack-machine using :class:`SqliteDb`.
+
+    Selected by setting AX_STORAGE to sqlite, uses the file in AX_STORAGE_PATH.
+    """
+
+    def __init__(self, settings):
+        """Pass."""
+        super().__init__(settings)
+        self.db = SqliteDb(path=settings.get("AX_STORAGE_PATH", PATH))
+
+    def get(self, key):
+        """Pass."""
+        row = self.db.execute(
+            "SELECT value FROM machine WHERE key = ? AND "
+            "(expires IS NULL OR expires > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, expires=None):
+        """Pass."""
+        now = time.time()
+        expires_at = now + expires if expires else None
+        with self.db.transaction() as conn:
+            conn.execute("DELETE FROM machine WHERE expires <= ?", (now,))
+            conn.execute(
+                "INSERT OR REPLACE INTO machine (key, value, expires) VALUES (?, ?, ?)",
+                (key, value, expires_at),
+            )
+
+    def has(self, key):
+        """Pass."""
+        return self.get(key) is not None
+
+    def delete(self, key):
+        """Pass."""
+        self.db.execute("DELETE FROM machine WHERE key = ?", (key,))
+
+    def size(self):
+        """Pass."""
+        return os.path.getsize(self.db.path)
+
+
+class SqliteThreadCache(object):
+    """Thread context stored in a :class:`SqliteDb`, bounded by total bytes.
+
+    Behaves like :class:`axonbot_slack.caches.ThreadCache`, but entries survive a
+    restart and are shared by every bot process using the same file, so a thread
+    sub-command can be handled by a different process than the one that uploaded
+    the result. Sizes are the bytes of the JSON encoded rows. Stats only count
+    what this process has done.
+    """
+
+    def __init__(self, maxsize, ttl, path=PATH):
+        """Pass."""
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.db = SqliteDb(path=path)
+        self._add_row_count()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "trims": 0,
+            "evictions": 0,
+            "expirations": 0,
+        }
+        self._lock = threading.Lock()
+
+    def _add_row_count(self):
+        # files made before row_count was added keep their threads table
+        columns = [x[1] for x in self.db.execute("PRAGMA table_info(threads)")]
+        if "row_count" in columns:
+            return
+        try:
+            self.db.execute("ALTER TABLE threads ADD COLUMN row_count INTEGER")
+        except sqlite3.OperationalError:
+            # another process added it first
+            pass
+
+    def __len__(self):
+        """Pass."""
+        sql = "SELECT COUNT(*) FROM threads WHERE created > ?"
+        return self.db.execute(sql, (time.time() - self.ttl,)).fetchone()[0]
+
+    @property
+    def currsize(self):
+        """Get the total bytes of thread context stored."""
+        sql = "SELECT COALESCE(SUM(size), 0) FROM threads"
+        return self.db.execute(sql).fetchone()[0]
+
+    def has(self, key):
+        """Check if key has an entry that has not expired, without counting a hit."""
+        row = self.db.execute(
+            "SELECT 1 FROM threads WHERE thread_ts = ? AND created > ?",
+            (key, time.time() - self.ttl),
+        ).fetchone()
+        return row is not None
+
+    def get(self, key):
+        """Get the entry for key, or None.
+
+        Returns:
+            :obj:`dict`: with api_type, rows, row_count, request, age, and trimmed
+
+        """
+        now = time.time()
+        with self.db.transaction() as conn:
+            row = conn.execute(
+                "SELECT api_type, rows, row_count, request, trimmed, created "
+                "FROM threads "
+                "WHERE thread_ts = ?",
+                (key,),
+            ).fetchone()
+
+            if row is not None and now - row[5] >= self.ttl:
+                conn.execute("DELETE FROM threads WHERE thread_ts = ?", (key,))
+                self._count("expirations")
+                row = None
+
+            if row is None:
+                self._count("misses")
+                return None
+
+            conn.execute("UPDATE threads SET used = ? WHERE thread_ts = ?", (now, key))
+            self._count("hits")
+
+        api_type, rows, row_count, request, trimmed, created = row
+        rows = json.loads(rows)
+        if trimmed:
+            rows = [{ID_KEY: x} for x in rows]
+
+        return {
+            "api_type": api_type,
+            "rows": rows,
+            "row_count": len(rows) if row_count is None else row_count,
+            "request": json.loads(request) if request else None,
+            "age": now - created,
+            "trimmed": bool(trimmed),
+        }
+
+    def put(self, key, api_type, rows, request=None, row_count=None):
+        """Store the context rows for key, evicting others to stay in budget.
+
+        row_count is the number of rows uploaded to the thread, when context was
+        only kept for some of them.
+        """
+        now = time.time()
+        row_count = len(rows) if row_count is None else row_count
+        encoded = json.dumps(rows)
+        request = json.dumps(request) if request else None
+        size = len(encoded) + len(request or "")
+
+        with self.db.transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO threads "
+                "(thread_ts, api_type, rows, row_count, request, trimmed, size, "
+                "created, used) VALUES (?, ?, ?, ?, ?, 0, ?, ?, ?)",
+                (key, api_type, encoded, row_count, request, size, now, now),
+            )
+            self._count("stores")
+
+            expired = conn.execute(
+                "DELETE FROM threads WHERE created <= ?", (now - self.ttl,)
+            )
+            self._count("expirations", expired.rowcount)
+            self._shrink(conn)
+
+    def update(self, key, rows):
+        """Replace the rows for key without changing when it expires."""
+        encoded = json.dumps(rows)
+        with self.db.transaction() as conn:
+            conn.execute(
+                "UPDATE threads SET rows = ?, trimmed = 0, "
+                "size = ? + COALESCE(LENGTH(request), 0) WHERE thread_ts = ?",
+                (encoded, len(encoded), key),
+            )
+            self._shrink(conn)
+
+    def _count(self, stat, value=1):
+        with self._lock:
+            self.stats[stat] += value
+
+    def _shrink(self, conn):
+        currsize = conn.execute("SELECT COALESCE(SUM(size), 0) FROM threads")
+        currsize = currsize.fetchone()[0]
+        if currsize <= self.maxsize:
+            return
+
+        untrimmed = conn.execute(
+            "SELECT thread_ts, rows FROM threads WHERE trimmed = 0 ORDER BY used"
+        ).fetchall()
+
+        for key, rows in untrimmed:
+            if currsize <= self.maxsize:
+                return
+            ids = json.dumps([x[ID_KEY] for x in json.loads(rows) if ID_KEY in x])
+            conn.execute(
+                "UPDATE threads SET rows = ?, trimmed = 1, "
+                "size = ? + COALESCE(LENGTH(request), 0) WHERE thread_ts = ?",
+                (ids, len(ids), key),
+            )
+            currsize -= len(rows) - len(ids)
+            self._count("trims")
+
+        for key, size in conn.execute(
+            "SELECT thread_ts, size FROM threads ORDER BY used"
+        ).fetchall():
+            if currsize <= self.maxsize:
+                return
+            conn.execute("DELETE FROM threads WHERE thread_ts = ?", (key,))
+            currsize -= size
+            self._count("evictions")
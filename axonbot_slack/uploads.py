@@ -0,0 +1,238 @@
+"""Queue of Slack file uploads sent within the files.upload rate limit."""
+import logging
+import queue
+import threading
+import time
+
+RATE = 20
+""":obj:`int`: Default uploads per minute, the files.upload rate limit tier of Slack."""
+
+BURST = 5
+""":obj:`int`: Default number of uploads that can be sent back to back."""
+
+RETRIES = 3
+""":obj:`int`: Default number of times to retry a failed upload."""
+
+BACKOFF = 2
+""":obj:`int`: Seconds to wait before the first retry, doubled for each retry."""
+
+RETRY_AFTER = 60
+""":obj:`int`: Seconds to wait when Slack rate limits an upload without Retry-After."""
+
+RATELIMIT_RETRIES = 5
+""":obj:`int`: Default number of times to retry an upload that Slack rate limits."""
+
+RETRY_ERRORS = [
+    "internal_error",
+    "fatal_error",
+    "request_timeout",
+    "service_unavailable",
+]
+""":obj:`list` of :obj:`str`: Slack errors that are retried."""
+
+logger = logging.getLogger(__name__)
+
+
+def retry_after(headers):
+    """Get the seconds to wait from a Retry-After header, in any case."""
+    for key, value in (headers or {}).items():
+        if key.lower() == "retry-after":
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                break
+    return RETRY_AFTER
+
+
+class TokenBucket(object):
+    """Tokens added at rate per second up to burst, one taken for each request."""
+
+    def __init__(self, rate, burst, clock=time.monotonic):
+        """Pass."""
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = float(burst)
+        self.updated = clock()
+
+    def take(self):
+        """Take a token, or get the seconds until one is added.
+
+        Returns:
+            :obj:`float`: 0 if a token was taken, else seconds to wait
+
+        """
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def empty(self):
+        """Remove every token, so requests after a rate limit are spread out."""
+        self.tokens = 0.0
+        self.updated = self.clock()
+
+
+class Upload(object):
+    """A files.upload call, with callbacks for when it is sent or gives up."""
+
+    def __init__(self, kwargs, fileobj=None, done=None, failed=None, close=None):
+        """Pass."""
+        self.kwargs = kwargs
+        self.fileobj = fileobj
+        self.done = done
+        self.failed = failed
+        self.close = close
+        self.tries = 0
+        self.ratelimited = 0
+        self.ahead = 0
+        self.queued = None
+
+
+class UploadQueue(object):
+    """Send uploads one at a time from a daemon thread, within the Slack rate limit.
+
+    A token bucket of burst tokens refilled at rate per minute spaces out the
+    uploads. When Slack still answers ratelimited, the sender waits for the
+    Retry-After seconds of the response before sending anything else, up to
+    ratelimit_retries times per upload. Other errors that can pass are retried
+    up to retries times with backoff. Once an upload is sent, or gives up, its
+    callback is called and its file is closed.
+    """
+
+    def __init__(
+        self,
+        send,
+        rate=RATE,
+        burst=BURST,
+        retries=RETRIES,
+        backoff=BACKOFF,
+        ratelimit_retries=RATELIMIT_RETRIES,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        """Pass."""
+        self.send = send
+        self.bucket = TokenBucket(rate=rate / 60.0, burst=burst, clock=clock)
+        self.retries = retries
+        self.backoff = backoff
+        self.ratelimit_retries = ratelimit_retries
+        self.clock = clock
+        self.sleep = sleep
+        self.queue = queue.Queue()
+        self.active = 0
+        self.stats = {
+            "queued": 0,
+            "sent": 0,
+            "failed": 0,
+            "retries": 0,
+            "ratelimited": 0,
+            "wait_seconds": 0.0,
+        }
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def pending(self):
+        """Get the number of uploads waiting for or being sent."""
+        return self.queue.qsize() + self.active
+
+    def submit(self, upload):
+        """Queue an upload.
+
+        Returns:
+            :obj:`int`: number of uploads ahead of this one
+
+        """
+        with self._lock:
+            upload.ahead = self.pending
+            upload.queued = self.clock()
+            self.stats["queued"] += 1
+            self.queue.put(upload)
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="axonbot_upload")
+                self._thread.daemon = True
+                self._thread.start()
+        return upload.ahead
+
+    def _run(self):
+        while True:
+            upload = self.queue.get()
+            with self._lock:
+                self.active += 1
+            try:
+                self._send(upload)
+            except Exception:
+                logger.exception("Error sending upload")
+            finally:
+                with self._lock:
+                    self.active -= 1
+                if upload.close is not None:
+                    upload.close()
+                self.queue.task_done()
+
+    def _send(self, upload):
+        while True:
+            wait = self.bucket.take()
+            while wait:
+                self.sleep(wait)
+                wait = self.bucket.take()
+
+            upload.tries += 1
+            kwargs = dict(upload.kwargs)
+            if upload.fileobj is not None:
+                upload.fileobj.seek(0)
+                kwargs["file"] = upload.fileobj
+
+            try:
+                response = self.send(**kwargs)
+            except Exception as exc:
+                response = {"ok": False, "error": format(exc), "retry": True}
+
+            if response.get("ok"):
+                with self._lock:
+                    self.stats["sent"] += 1
+                    self.stats["wait_seconds"] = self.clock() - upload.queued
+                if upload.done is not None:
+                    upload.done(upload)
+                return
+
+            error = response.get("error", "unknown_error")
+            if error == "ratelimited":
+                upload.ratelimited += 1
+                self._count("ratelimited")
+                give_up = upload.ratelimited > self.ratelimit_retries
+                delay = retry_after(response.get("headers"))
+            else:
+                failures = upload.tries - upload.ratelimited
+                retry = response.get("retry", False) or error in RETRY_ERRORS
+                give_up = not retry or failures > self.retries
+                delay = self.backoff * 2 ** (failures - 1)
+
+            if give_up:
+                self._count("failed")
+                m = "Failed to upload {filename!r} after {tries} tries: {error}"
+                logger.error(
+                    m.format(
+                        filename=upload.kwargs.get("filename"),
+                        tries=upload.tries,
+                        error=error,
+                    )
+                )
+                if upload.failed is not None:
+                    upload.failed(upload, error)
+                return
+
+            if error == "ratelimited":
+                # the rate limit is for the whole workspace, so every upload waits
+                self.bucket.empty()
+            self._count("retries")
+            self.sleep(delay)
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
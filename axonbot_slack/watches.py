@@ -0,0 +1,217 @@
+"""Saved queries polled on an interval, posting only what changed."""
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+
+from . import jobs
+
+WORKERS = 2
+""":obj:`int`: Default number of watches that can poll at the same time."""
+
+MIN_INTERVAL = 60
+""":obj:`int`: Default minimum seconds between polls of a watch."""
+
+MAX_FAILURES = 5
+""":obj:`int`: Default number of failed polls in a row that stop a watch."""
+
+BACKOFF_MAX = 8
+""":obj:`int`: Most times the interval is multiplied by after failed polls."""
+
+TICK = 1
+""":obj:`int`: Seconds between checks for watches that are due."""
+
+ID_KEY = "internal_axon_id"
+""":obj:`str`: Row key used to match rows between polls."""
+
+INTERVAL_RE = re.compile(r"^(?P<count>\d+)(?P<unit>[smhd]?)$", re.IGNORECASE)
+INTERVAL_UNITS = {"": 1, "s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+
+logger = logging.getLogger(__name__)
+
+
+def parse_interval(value):
+    """Parse an interval like 90s, 15m, 2h, or 1d into seconds.
+
+    Raises:
+        :exc:`ValueError`: if value is not an interval.
+
+    """
+    match = INTERVAL_RE.match(format(value).strip())
+    if not match:
+        msg = "Invalid interval {value!r}, use a number of s, m, h, or d like 15m"
+        raise ValueError(msg.format(value=value))
+    return int(match.group("count")) * INTERVAL_UNITS[match.group("unit").lower()]
+
+
+def row_hash(row):
+    """Get a hash of the content of a row."""
+    encoded = json.dumps(row, sort_keys=True, default=str).encode()
+    return hashlib.sha1(encoded).hexdigest()
+
+
+def diff_rows(rows, hashes):
+    """Compare rows to the row hashes of a previous poll.
+
+    Only the rows that were added or changed are kept, so unchanged rows are
+    hashed and dropped as they are fetched. On the first poll, when hashes is
+    None, every row is only hashed and nothing is reported as added.
+
+    Returns:
+        :obj:`tuple` of (:obj:`dict` of row hashes by ID, :obj:`list` of added
+            rows, :obj:`list` of changed rows, :obj:`list` of removed IDs)
+
+    """
+    first = hashes is None
+    hashes = hashes or {}
+    new_hashes = {}
+    added = []
+    changed = []
+
+    for row in rows:
+        axon_id = row[ID_KEY]
+        new_hashes[axon_id] = row_hash(row)
+        if first:
+            continue
+        if axon_id not in hashes:
+            added.append(row)
+        elif hashes[axon_id] != new_hashes[axon_id]:
+            changed.append(row)
+
+    removed = [x for x in hashes if x not in new_hashes]
+    return new_hashes, added, changed, removed
+
+
+class Watch(object):
+    """A saved query polled every interval seconds for a thread."""
+
+    def __init__(self, watch_id, api_type, name, interval, msg, fmt):
+        """Pass."""
+        self.id = watch_id
+        self.api_type = api_type
+        self.name = name
+        self.interval = interval
+        self.msg = msg
+        self.fmt = fmt
+        self.hashes = None
+        self.next_run = 0
+        self.running = False
+        self.removed = False
+        self.failures = 0
+        self.stats = {"polls": 0, "changes": 0, "errors": 0, "seconds": 0.0}
+
+
+class Scheduler(object):
+    """Poll watches when they are due, limiting how many poll at once.
+
+    A daemon thread checks for due watches every tick seconds and hands them
+    to a :class:`axonbot_slack.jobs.JobPool` of workers threads. A watch is not
+    handed over again until its poll is done, and its next poll is due interval
+    seconds after that.
+
+    A poll that fails backs off by doubling the interval for each failure in a
+    row, up to :data:`BACKOFF_MAX` times, and calls failed with the watch, the
+    exception, and the seconds until it polls again. After max_failures in a
+    row the watch is removed and failed is called with None for the seconds.
+    """
+
+    def __init__(
+        self,
+        poll,
+        failed=None,
+        workers=WORKERS,
+        max_failures=MAX_FAILURES,
+        tick=TICK,
+        clock=time.monotonic,
+    ):
+        """Pass."""
+        self.poll = poll
+        self.failed = failed
+        self.max_failures = max_failures
+        self.workers = workers
+        self.tick = tick
+        self.clock = clock
+        self.watches = {}
+        self.stats = {"polls": 0, "errors": 0}
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._pool = None
+        self._thread = None
+
+    def add(self, **kwargs):
+        """Add a watch that polls right away, see :class:`Watch` for kwargs."""
+        with self._lock:
+            watch = Watch(watch_id=self._next_id, **kwargs)
+            self.watches[watch.id] = watch
+            self._next_id += 1
+
+            if self._thread is None:
+                self._pool = jobs.JobPool(
+                    workers=self.workers, queue_size=0, name="watch"
+                )
+                self._thread = threading.Thread(target=self._run, name="axonbot_watch")
+                self._thread.daemon = True
+                self._thread.start()
+        return watch
+
+    def remove(self, watch_id):
+        """Remove a watch, or return None if there is no watch with watch_id."""
+        with self._lock:
+            watch = self.watches.pop(watch_id, None)
+        if watch is not None:
+            watch.removed = True
+        return watch
+
+    def _run(self):
+        while True:
+            now = self.clock()
+            with self._lock:
+                due = [
+                    x
+                    for x in self.watches.values()
+                    if not x.running and x.next_run <= now
+                ]
+                for watch in due:
+                    watch.running = True
+
+            for watch in due:
+                self._pool.submit(method=self._poll, watch=watch)
+            time.sleep(self.tick)
+
+    def _poll(self, watch):
+        start = self.clock()
+        error = None
+        try:
+            self.poll(watch)
+        except Exception as exc:
+            error = exc
+            m = "Error polling watch {id} of saved query {name!r}"
+            logger.exception(m.format(id=watch.id, name=watch.name))
+        finally:
+            took = self.clock() - start
+            with self._lock:
+                watch.failures = 0 if error is None else watch.failures + 1
+                watch.stats["polls"] += 1
+                watch.stats["errors"] += int(error is not None)
+                watch.stats["seconds"] = took
+                self.stats["polls"] += 1
+                self.stats["errors"] += int(error is not None)
+                delay = watch.interval * min(2 ** watch.failures, BACKOFF_MAX)
+                watch.next_run = self.clock() + delay
+                watch.running = False
+
+        if error is None or watch.removed:
+            return
+
+        if self.max_failures and watch.failures >= self.max_failures:
+            self.remove(watch.id)
+            delay = None
+
+        if self.failed is not None:
+            try:
+                self.failed(watch, error, delay)
+            except Exception:
+                m = "Error reporting failed poll of watch {id}"
+                logger.exception(m.format(id=watch.id))
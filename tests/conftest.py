@@ -0,0 +1,237 @@
+"""Fixtures shared by the axonbot_slack tests."""
+import datetime
+
+import pytest
+from apscheduler.schedulers.background import BackgroundScheduler
+
+from axonbot_slack import main
+
+KNOWN_FIELDS = {
+    "generic": [
+        {"name": "internal_axon_id"},
+        {"name": "labels"},
+        {"name": "specific_data.data.hostname"},
+    ],
+    "specific": {},
+}
+
+SETTINGS = {
+    "AX_URL": "https://axonius.example",
+    "AX_KEY": "key",
+    "AX_SECRET": "secret",
+    "AX_KEEPALIVE": 0,
+    "AX_NET_INDEX_REFRESH": 0,
+    "AX_MIRROR_REFRESH": 0,
+    "AX_SAVED_QUERY_REFRESH": 0,
+    "AX_UPLOAD_RATE": 6000,
+    "AX_UPLOAD_BURST": 100,
+}
+
+
+def device_rows(count):
+    """Pass."""
+    return [
+        {
+            "internal_axon_id": "id{}".format(i),
+            "labels": ["old"] if i % 2 else [],
+            "specific_data.data.hostname": ["host{}".format(i)],
+            "specific_data.data.network_interfaces": [
+                {
+                    "ips": ["10.0.0.{}".format(i)],
+                    "mac": ["00:00:00:00:00:{:02x}".format(i)],
+                }
+            ],
+        }
+        for i in range(count)
+    ]
+
+
+class Api(object):
+    """Stands in for the users or devices API object of axonius_api_client."""
+
+    def __init__(self, api_type, rows):
+        """Pass."""
+        self._type = api_type
+        self.rows = rows
+        self.response_fields = {"generic": ["hostname", "labels"]}
+        self.counts = 0
+        self.labels = []
+
+    def get_fields(self):
+        """Pass."""
+        return KNOWN_FIELDS
+
+    def get(self, manual_fields=None, **kwargs):
+        """Pass."""
+        return iter(self.rows)
+
+    def get_count(self, query=None):
+        """Pass."""
+        self.counts += 1
+        return len(self.rows)
+
+    def add_labels_by_rows(self, rows, labels):
+        """Pass."""
+        self.labels.append(("add", [x["internal_axon_id"] for x in rows], labels))
+        return len(rows)
+
+    def delete_labels_by_rows(self, rows, labels):
+        """Pass."""
+        self.labels.append(("delete", [x["internal_axon_id"] for x in rows], labels))
+        return len(rows)
+
+
+class Response(object):
+    """Pass."""
+
+    def __init__(self, assets):
+        """Pass."""
+        self.status_code = 200
+        self.assets = assets
+
+    def json(self):
+        """Pass."""
+        return {"assets": self.assets}
+
+
+class Http(object):
+    """Answers page requests from the rows of the API objects, ignoring filters."""
+
+    url = "https://axonius.example"
+    retried = 0
+
+    def __init__(self, api_types):
+        """Pass."""
+        self.api_types = api_types
+        self.pages = []
+
+    def __call__(self, method="get", path="", params=None, **kwargs):
+        """Pass."""
+        api_type = path.split("/")[-1]
+        start = params["skip"]
+        end = start + params["limit"]
+        self.pages.append((api_type, start, params["limit"], params["fields"]))
+        return Response(self.api_types[api_type].rows[start:end])
+
+
+class Channel(object):
+    """Pass."""
+
+    id = "C1"
+
+
+class Message(object):
+    """Stands in for a slack-machine message, keeping every reply."""
+
+    def __init__(self, event):
+        """Pass."""
+        self._msg_event = event
+        self.text = event["text"]
+        self.thread_ts = event.get("thread_ts", event["ts"])
+        self.channel = Channel()
+        self.replies = []
+
+    def reply(self, text, in_thread=False):
+        """Pass."""
+        self.replies.append(text)
+
+
+class Slack(object):
+    """Stands in for the Slack client, keeping every upload."""
+
+    def __init__(self):
+        """Pass."""
+        self.uploads = []
+
+    def api_call(self, method, **kwargs):
+        """Pass."""
+        fileobj = kwargs.pop("file", None)
+        kwargs["data"] = fileobj.read() if fileobj is not None else kwargs["content"]
+        self.uploads.append(kwargs)
+        return {"ok": True, "headers": {}}
+
+
+class Storage(dict):
+    """Stands in for slack-machine plugin storage."""
+
+    def set(self, key, value):
+        """Pass."""
+        self[key] = value
+
+
+class Bot(object):
+    """Runs commands through an :class:`axonbot_slack.main.AxonBotSlack`."""
+
+    def __init__(self, plugin, http, slack):
+        """Pass."""
+        self.plugin = plugin
+        self.http = http
+        self.slack = slack
+        self.devices = plugin.api.api_types["devices"]
+        self.messages = []
+        plugin._gen_message = self.message
+
+    def command(self, text, ts="1.0"):
+        """Send a command to the bot and wait for it to finish."""
+        msg = Message({"text": text, "ts": ts, "user": "U1", "channel": "C1"})
+        self.plugin.router.dispatch(msg)
+        self.wait()
+        return msg
+
+    def thread(self, text, thread_ts="1.0", ts="2.0"):
+        """Send a message in a thread and wait for it to finish."""
+        event = {
+            "text": text,
+            "ts": ts,
+            "thread_ts": thread_ts,
+            "user": "U1",
+            "channel": "C1",
+        }
+        self.plugin.handle_thread(event)
+        self.wait()
+        return self.messages.pop() if self.messages else None
+
+    def message(self, event):
+        """Build the message for a thread event, in place of the plugin."""
+        msg = Message(event)
+        self.messages.append(msg)
+        return msg
+
+    def wait(self):
+        """Pass."""
+        self.plugin.jobs.queue.join()
+        self.plugin.uploads.queue.join()
+
+
+@pytest.fixture
+def settings():
+    """Pass."""
+    return dict(SETTINGS)
+
+
+@pytest.fixture
+def bot(monkeypatch, settings):
+    """Bot with fake Axonius and Slack connections and 25 devices."""
+    api_types = {"users": Api("users", []), "devices": Api("devices", device_rows(25))}
+    http = Http(api_types)
+    slack = Slack()
+
+    def start(self, mode=None):
+        self.api_types = api_types
+        self.http_client = http
+        self.auth_method = "fake"
+        self.start_dt = datetime.datetime.utcnow()
+        for event in self.ready.values():
+            event.set()
+
+    monkeypatch.setattr(main.AxonConnection, "start", start)
+    monkeypatch.setattr(main.Slack, "get_instance", lambda: slack)
+    monkeypatch.setattr(main.Scheduler, "get_instance", BackgroundScheduler)
+    monkeypatch.setattr(main.text, "announce", lambda msg: None)
+
+    plugin = main.AxonBotSlack.__new__(main.AxonBotSlack)
+    plugin.settings = settings
+    plugin.storage = Storage()
+    plugin.init()
+    plugin.bot_id = "BOT"
+    return Bot(plugin=plugin, http=http, slack=slack)
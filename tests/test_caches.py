@@ -0,0 +1,116 @@
+"""Tests for axonbot_slack.caches."""
+import threading
+
+import pytest
+
+from axonbot_slack import caches
+
+
+class Clock(object):
+    """Clock that only moves when told to."""
+
+    def __init__(self):
+        """Pass."""
+        self.now = 0.0
+
+    def __call__(self):
+        """Pass."""
+        return self.now
+
+
+def test_single_flight_hit_within_ttl():
+    """Pass."""
+    clock = Clock()
+    cache = caches.SingleFlightCache(ttl=10, clock=clock)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return len(calls)
+
+    assert cache.get(key="a", fetch=fetch) == (1, 0.0)
+    clock.now = 5
+    assert cache.get(key="a", fetch=fetch) == (1, 5)
+    assert len(calls) == 1
+    assert cache.stats["hits"] == 1
+    assert cache.stats["misses"] == 1
+
+
+def test_single_flight_expires_and_refreshes():
+    """Pass."""
+    clock = Clock()
+    cache = caches.SingleFlightCache(ttl=10, clock=clock)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return len(calls)
+
+    cache.get(key="a", fetch=fetch)
+    clock.now = 10
+    assert cache.get(key="a", fetch=fetch)[0] == 2
+    assert cache.get(key="a", fetch=fetch, refresh=True)[0] == 3
+    assert cache.stats["refreshes"] == 1
+
+
+def test_single_flight_shares_one_fetch():
+    """Pass."""
+    cache = caches.SingleFlightCache(ttl=10)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    def get():
+        results.append(cache.get(key="a", fetch=fetch)[0])
+
+    leader = threading.Thread(target=get)
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=get) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    while cache.stats["coalesced"] < 3:
+        threading.Event().wait(0.01)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    assert calls == [1]
+    assert results == ["value"] * 4
+
+
+def test_single_flight_errors_are_not_cached():
+    """Pass."""
+    cache = caches.SingleFlightCache(ttl=10)
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        cache.get(key="a", fetch=fail)
+    assert cache.get(key="a", fetch=lambda: "ok") == ("ok", 0.0)
+
+
+def rows(count, prefix="id"):
+    """Pass."""
+    return [
+        {"internal_axon_id": "{}{}".format(prefix, i), "hostname": "x" * 200}
+        for i in range(count)
+    ]
+
+
+def test_thread_cache_has_does_not_count():
+    """Pass."""
+    cache = caches.ThreadCache(maxsize=10 ** 6, ttl=60)
+    cache.put(key="1.0", api_type="devices", rows=rows(1))
+    assert cache.has("1.0")
+    assert not cache.has("2.0")
+    assert cache.stats["hits"] == 0
+    assert cache.stats["misses"] == 0
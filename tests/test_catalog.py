@@ -0,0 +1,112 @@
+"""Tests for axonbot_slack.catalog."""
+import pytest
+
+from axonbot_slack import catalog
+
+
+class Clock(object):
+    """Clock that only moves when told to."""
+
+    def __init__(self):
+        """Pass."""
+        self.now = 0.0
+
+    def __call__(self):
+        """Pass."""
+        return self.now
+
+
+class Fetch(object):
+    """Saved queries by object type, counting every fetch."""
+
+    def __init__(self, names):
+        """Pass."""
+        self.names = names
+        self.calls = []
+
+    def __call__(self, api_type):
+        """Pass."""
+        self.calls.append(api_type)
+        return [{"name": x} for x in self.names[api_type]]
+
+
+NAMES = {
+    "devices": ["Windows Servers", "windows servers", "Windows Laptops", "Linux"],
+    "users": ["Admins"],
+}
+
+
+@pytest.fixture
+def clock():
+    """Pass."""
+    return Clock()
+
+
+@pytest.fixture
+def fetch():
+    """Pass."""
+    return Fetch({k: list(v) for k, v in NAMES.items()})
+
+
+@pytest.fixture
+def queries(fetch, clock):
+    """Pass."""
+    return catalog.SavedQueryCatalog(fetch=fetch, clock=clock)
+
+
+@pytest.mark.parametrize(
+    "name, found",
+    [
+        ("Windows Servers", "Windows Servers"),
+        ("windows servers", "windows servers"),
+        ("LINUX", "Linux"),
+        ("windows l", "Windows Laptops"),
+        ("lin", "Linux"),
+    ],
+)
+def test_find(queries, name, found):
+    """Exact names first, then ignoring case, then by prefix."""
+    assert queries.find(api_type="devices", name=name)["name"] == found
+
+
+def test_find_ambiguous(queries):
+    """Pass."""
+    with pytest.raises(catalog.AmbiguousName) as exc:
+        queries.find(api_type="devices", name="windows")
+    assert "matches 3" in format(exc.value)
+
+    with pytest.raises(catalog.AmbiguousName):
+        queries.find(api_type="devices", name="WINDOWS SERVERS")
+
+
+def test_fetched_once_per_type(queries, fetch):
+    """Pass."""
+    queries.find(api_type="devices", name="Linux")
+    queries.find(api_type="devices", name="Windows Servers")
+    queries.find(api_type="users", name="Admins")
+    assert fetch.calls == ["devices", "users"]
+    assert [x["name"] for x in queries.rows("users")] == ["Admins"]
+
+
+def test_miss_refreshes_old_catalog(queries, fetch, clock):
+    """Pass."""
+    assert queries.find(api_type="users", name="Auditors") is None
+    assert fetch.calls == ["users"]
+
+    fetch.names["users"].append("Auditors")
+    clock.now = catalog.MISS_REFRESH - 1
+    assert queries.find(api_type="users", name="Auditors") is None
+    assert fetch.calls == ["users"]
+
+    clock.now = catalog.MISS_REFRESH
+    assert queries.find(api_type="users", name="Auditors") == {"name": "Auditors"}
+    assert fetch.calls == ["users", "users"]
+    assert queries.stats["miss_builds"] == 1
+
+
+def test_no_refresh_fetches_every_lookup(fetch, clock):
+    """Pass."""
+    queries = catalog.SavedQueryCatalog(fetch=fetch, refresh=0, clock=clock)
+    queries.find(api_type="users", name="Admins")
+    queries.find(api_type="users", name="Admins")
+    assert fetch.calls == ["users", "users"]
@@ -0,0 +1,37 @@
+"""Tests for axonbot_slack.cli."""
+import os
+
+import click.testing
+
+from axonbot_slack import cli
+
+
+def varinfo(name):
+    """Pass."""
+    return [x for x in cli.VARINFOS if x["var"] == name][0]
+
+
+def test_backoff_is_a_float():
+    """Pass."""
+    assert cli.check_var(varinfo=varinfo("AX_HTTP_BACKOFF"), value="0.5") == 0.5
+
+
+def test_config_skips_tuning_variables(monkeypatch, tmp_path):
+    """Pass."""
+    # config loads the .env file it writes into the environment
+    monkeypatch.setattr(os, "environ", dict(os.environ))
+    env = str(tmp_path / ".env")
+    required = [x for x in cli.VARINFOS if x["url"] != cli.TUNING_URL]
+    runner = click.testing.CliRunner()
+
+    result = runner.invoke(
+        cli.cli, ["--env", env, "config"], input="x\n" * len(required)
+    )
+    assert result.exit_code == 0, result.output
+    assert "AX_HTTP_BACKOFF" not in result.output
+
+    result = runner.invoke(
+        cli.cli, ["--env", env, "config", "--tuning"], input="\n" * len(cli.VARINFOS)
+    )
+    assert result.exit_code == 0, result.output
+    assert "AX_HTTP_BACKOFF" in result.output
@@ -0,0 +1,99 @@
+"""Tests for axonbot_slack.exports."""
+import gzip
+import json
+
+import pytest
+
+from axonbot_slack import exports
+
+ROWS = [
+    {
+        "internal_axon_id": "a",
+        "labels": ["x"],
+        "specific_data.data.hostname": ["web1"],
+        "specific_data.data.network_interfaces": [
+            {"ips": ["10.0.0.1"], "mac": ["aa"]},
+            {"ips": ["10.0.0.2", "10.0.0.3"], "mac": ["bb"]},
+        ],
+    },
+    {"internal_axon_id": "b", "specific_data.data.hostname": ["café"]},
+    {"internal_axon_id": "c", "nested": {"empty": [], "none": None, "list": [{}]}},
+]
+
+
+def export(rows, fmt):
+    """Pass."""
+    with exports.RowExport(fmt=fmt) as result:
+        result.write_rows(iter(rows))
+        return result.fh.read(), result
+
+
+@pytest.mark.parametrize("rows", [ROWS, ROWS[:1], []])
+def test_json_matches_json_dumps(rows):
+    """The streamed json format is byte for byte what json.dumps gives."""
+    data, _ = export(rows=rows, fmt="json")
+    assert data == json.dumps(rows, indent=2).encode("utf-8")
+
+
+@pytest.mark.parametrize("rows", [ROWS, ROWS[:1], []])
+def test_compact_matches_json_dumps(rows):
+    """Pass."""
+    data, _ = export(rows=rows, fmt="compact")
+    assert data == json.dumps(rows, separators=exports.COMPACT).encode("utf-8")
+
+
+def test_context_max():
+    """Pass."""
+    with exports.RowExport(fmt="json", context_max=2) as result:
+        result.write_rows(iter(ROWS))
+    assert result.context == [
+        {"internal_axon_id": "a", "labels": ["x"]},
+        {"internal_axon_id": "b"},
+    ]
+    assert result.row_count == 3
+
+
+def test_ndjson():
+    """Pass."""
+    data, _ = export(rows=ROWS, fmt="ndjson")
+    assert [json.loads(x) for x in data.decode("utf-8").splitlines()] == ROWS
+
+
+def test_gzip():
+    """Pass."""
+    data, result = export(rows=ROWS, fmt="json.gz")
+    assert gzip.decompress(data) == json.dumps(ROWS, indent=2).encode("utf-8")
+    assert result.filename("devices") == "devices.json.gz"
+    assert result.size == len(data)
+
+
+def test_csv_flattens_rows():
+    """Pass."""
+    data, result = export(rows=ROWS, fmt="csv")
+    lines = data.decode("utf-8").splitlines()
+    assert lines[0].startswith(
+        "internal_axon_id,labels,specific_data.data.hostname,"
+        "specific_data.data.network_interfaces.ips,"
+    )
+    assert result.row_count == 3
+
+
+def test_flatten_merges_lists():
+    """Pass."""
+    flat = exports.flatten(ROWS[0])
+    ips = flat["specific_data.data.network_interfaces.ips"]
+    assert ips == ["10.0.0.1", "10.0.0.2", "10.0.0.3"]
+
+
+@pytest.mark.parametrize(
+    "fmt, parsed", [("json", ("json", False)), (" CSV.GZ ", ("csv", True))]
+)
+def test_parse_format(fmt, parsed):
+    """Pass."""
+    assert exports.parse_format(fmt) == parsed
+
+
+def test_parse_format_invalid():
+    """Pass."""
+    with pytest.raises(exports.ExportError):
+        exports.parse_format("xml")
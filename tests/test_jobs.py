@@ -0,0 +1,49 @@
+"""Tests for axonbot_slack.jobs."""
+from axonbot_slack import jobs
+
+
+def test_run_batches_keeps_order():
+    """Pass."""
+    items = list(range(10))
+    results = jobs.run_batches(method=sum, items=items, batch_size=3, workers=4)
+
+    assert [x.items for x in results] == [[0, 1, 2], [3, 4, 5], [6, 7, 8], [9]]
+    assert [x.value for x in results] == [3, 12, 21, 9]
+    assert [(x.start, x.end, x.count) for x in results][-1] == (9, 10, 1)
+
+
+def test_run_batches_records_errors():
+    """Pass."""
+
+    def method(batch):
+        if 4 in batch:
+            raise ValueError("bad batch")
+        return len(batch)
+
+    results = jobs.run_batches(method=method, items=list(range(6)), batch_size=2)
+
+    assert [x.value for x in results] == [2, 2, None]
+    assert [x.exc is None for x in results] == [True, True, False]
+    assert isinstance(results[2].exc, ValueError)
+
+
+def test_run_batches_reports_progress():
+    """Pass."""
+    calls = []
+    jobs.run_batches(
+        method=len,
+        items=list(range(5)),
+        batch_size=2,
+        workers=1,
+        progress=lambda *args: calls.append(args),
+        interval=0,
+        clock=lambda: 0,
+    )
+
+    # the last batch is not reported, the reply with the results follows it
+    assert calls == [(1, 3, 2), (2, 3, 4)]
+
+
+def test_run_batches_without_items():
+    """Pass."""
+    assert jobs.run_batches(method=len, items=[], batch_size=0) == []
@@ -0,0 +1,199 @@
+"""Tests for axonbot_slack.main."""
+import json
+
+from axonbot_slack import main
+
+
+def test_thread_commands_need_a_known_thread(bot):
+    """Pass."""
+    for text in ["more", "full", "labels add foo", "hello"]:
+        assert bot.thread(text, thread_ts="9.0") is None
+    assert bot.plugin.thread_events == {"handled": 0, "skipped": 4}
+    assert bot.http.pages == []
+
+
+def test_thread_events_from_the_bot_are_skipped(bot):
+    """Pass."""
+    bot.command("get device query ```x```")
+    event = {"text": "more", "ts": "2.0", "thread_ts": "1.0", "user": "BOT"}
+    bot.plugin.handle_thread(event)
+    assert bot.plugin.thread_events["skipped"] == 1
+    assert bot.messages == []
+
+
+def test_thread_help_in_a_known_thread(bot):
+    """Pass."""
+    bot.command("get device query ```x```")
+    msg = bot.thread("what now")
+    assert msg.replies[0].startswith("Thread commands:")
+    assert bot.plugin.thread_events == {"handled": 1, "skipped": 0}
+
+
+def test_cached_result_keeps_the_comment(bot):
+    """Pass."""
+    bot.plugin.net_index.build()
+    bot.command("get device ip 10.0.0.1", ts="1.0")
+    bot.command("get device ip 10.0.0.1", ts="2.0")
+
+    first, cached = [x["initial_comment"] for x in bot.slack.uploads]
+    assert first.startswith("Matched 1 devices with IP Address '10.0.0.1'")
+    assert cached.startswith(first + ". Cached result from ")
+    assert len(bot.http.pages) == 1
+
+
+def test_labels_are_changed_in_batches(bot, settings):
+    """Pass."""
+    settings["AX_LABEL_BATCH_SIZE"] = 4
+    bot.command("get device query ```x```")
+
+    msg = bot.thread("labels add new")
+    assert msg.replies[-1] == "Added labels 'new' on 25 devices"
+    batches = [x[1] for x in bot.devices.labels]
+    assert [len(x) for x in batches] == [4, 4, 4, 4, 4, 4, 1]
+    assert sum(batches, []) == ["id{}".format(i) for i in range(25)]
+
+
+def test_labels_failed_batches_are_listed(bot, settings):
+    """Pass."""
+    settings["AX_LABEL_BATCH_SIZE"] = 10
+    bot.command("get device query ```x```")
+
+    def fail(rows, labels):
+        if rows[0]["internal_axon_id"] == "id10":
+            raise ValueError("no access")
+        return len(rows)
+
+    bot.devices.add_labels_by_rows = fail
+    msg = bot.thread("labels add new")
+    assert msg.replies[-1].splitlines() == [
+        "Added labels 'new' on 15 devices",
+        "1 of 3 batches failed, 10 devices not changed:",
+        "\tbatch 2 (11-20): no access",
+    ]
+
+
+def test_labels_skip_objects_already_done(bot):
+    """Pass."""
+    bot.command("get device query ```x```")
+
+    msg = bot.thread("labels add old")
+    assert msg.replies[-1] == (
+        "Added labels 'old' on 13 devices, skipped 12 that already had them"
+    )
+    assert [len(x[1]) for x in bot.devices.labels] == [13]
+
+    msg = bot.thread("labels add old", ts="3.0")
+    assert msg.replies[-1] == "Nothing to do, all 25 devices already had them"
+    assert len(bot.devices.labels) == 1
+
+
+def test_labels_refetch_ids_past_the_preview_rows(bot, settings):
+    """Pass."""
+    settings["AX_PREVIEW_ROWS"] = 5
+    bot.command("get device query ```x```")
+    entry = bot.plugin.threads.get("1.0")
+    assert (len(entry["rows"]), entry["row_count"]) == (5, 25)
+
+    msg = bot.thread("labels delete old")
+    assert msg.replies[-1] == (
+        "Deleted labels 'old' on 12 devices, skipped 13 that did not have them"
+    )
+    page = ("devices", 0, main.PAGE_SIZE, "internal_axon_id,labels")
+    assert bot.http.pages[-1] == page
+
+
+def uploaded_ids(upload):
+    """Pass."""
+    return [x["internal_axon_id"] for x in json.loads(upload["data"].decode())]
+
+
+def test_small_result_is_uploaded_with_one_page(bot):
+    """Pass."""
+    msg = bot.command("get device query ```x```")
+
+    assert bot.devices.counts == 1
+    assert [x[:3] for x in bot.http.pages] == [("devices", 0, 25)]
+    assert uploaded_ids(bot.slack.uploads[0]) == ["id{}".format(i) for i in range(25)]
+    assert bot.slack.uploads[0]["thread_ts"] == "1.0"
+    assert msg.replies[-1].startswith("Uploaded 'devices_")
+
+
+def test_big_result_is_previewed(bot, settings):
+    """Pass."""
+    settings.update(AX_PREVIEW_THRESHOLD=10, AX_PREVIEW_ROWS=5)
+    bot.command("get device query ```x```")
+
+    upload = bot.slack.uploads[0]
+    assert upload["initial_comment"] == (
+        "Found 25 devices, which is more than 10. Showing 1-5 of 25, reply *full* "
+        "in this thread to get all of them, or *more* to get the next page"
+    )
+    assert uploaded_ids(upload) == ["id0", "id1", "id2", "id3", "id4"]
+    assert [x[:3] for x in bot.http.pages] == [("devices", 0, 5)]
+
+
+def test_more_pages_through_a_preview(bot, settings):
+    """Pass."""
+    settings.update(AX_PREVIEW_THRESHOLD=10, AX_PREVIEW_ROWS=10)
+    bot.command("get device query ```x```")
+    bot.thread("more", ts="2.0")
+    msg = bot.thread("more", ts="3.0")
+
+    comments = [x["initial_comment"] for x in bot.slack.uploads]
+    assert comments[1].startswith("Showing 11-20 of 25, reply *full*")
+    assert comments[1].endswith("or *more* to get the next page")
+    assert comments[2] == (
+        "Showing 21-25 of 25, reply *full* in this thread to get all of them"
+    )
+    assert uploaded_ids(bot.slack.uploads[2]) == [
+        "id{}".format(i) for i in range(20, 25)
+    ]
+    assert bot.devices.counts == 1
+    assert msg.replies[-1].startswith("Uploaded 'devices_")
+
+    msg = bot.thread("more", ts="4.0")
+    assert msg.replies[-1] == "No more devices, all 25 have been returned"
+    assert len(bot.slack.uploads) == 3
+
+
+def test_full_uploads_every_object_after_a_preview(bot, settings):
+    """Pass."""
+    settings.update(AX_PREVIEW_THRESHOLD=10, AX_PREVIEW_ROWS=5)
+    bot.command("get device query ```x```")
+    bot.thread("full")
+
+    assert uploaded_ids(bot.slack.uploads[1]) == ["id{}".format(i) for i in range(25)]
+    assert [x[:3] for x in bot.http.pages] == [("devices", 0, 5), ("devices", 0, 25)]
+
+    bot.thread("full", ts="3.0")
+    assert len(bot.slack.uploads) == 3
+    assert bot.slack.uploads[2]["initial_comment"].startswith("Cached result from ")
+    assert len(bot.http.pages) == 2
+
+
+def test_more_and_full_need_a_request(bot):
+    """Pass."""
+    bot.plugin.threads.put(key="1.0", api_type="devices", rows=[])
+    for text in ["more", "full"]:
+        msg = bot.thread(text)
+        assert msg.replies[-1] == (
+            "No objects requested or objects have expired, get an object first!"
+        )
+
+
+def test_big_subnet_is_previewed(bot, settings):
+    """Pass."""
+    settings.update(AX_PREVIEW_THRESHOLD=10, AX_PREVIEW_ROWS=5)
+    bot.plugin.net_index.build()
+    bot.command("get device subnet 10.0.0.0/28")
+
+    upload = bot.slack.uploads[0]
+    assert upload["initial_comment"].startswith(
+        "Matched 16 devices in subnet 10.0.0.0/28 in the network index from 0 "
+        "seconds ago. Found 16 devices, which is more than 10. Showing 1-5 of 16"
+    )
+    assert len(uploaded_ids(upload)) == 5
+    assert bot.devices.counts == 0
+
+    msg = bot.command("get device subnet 10.9.0.0/16", ts="2.0")
+    assert msg.replies[-1].startswith("No devices found in subnet 10.9.0.0/16")
@@ -0,0 +1,92 @@
+"""Tests for axonbot_slack.mirror."""
+import pytest
+
+from axonbot_slack import mirror
+
+FIELDS = {"generic": ["hostname"]}
+
+
+def device(axon_id, hostname):
+    """Pass."""
+    return {
+        "internal_axon_id": axon_id,
+        "specific_data.data.hostname": [hostname, hostname.upper()],
+    }
+
+
+class Fetch(object):
+    """Yield rows one at a time, counting how many were taken."""
+
+    def __init__(self, rows, fail_after=None):
+        """Pass."""
+        self.rows = rows
+        self.fail_after = fail_after
+        self.taken = 0
+
+    def __call__(self, api_type):
+        """Pass."""
+        return FIELDS, self._rows()
+
+    def _rows(self):
+        for row in self.rows:
+            if self.fail_after is not None and self.taken >= self.fail_after:
+                raise ValueError("fetch failed")
+            self.taken += 1
+            yield row
+
+
+@pytest.fixture
+def path(tmp_path):
+    """Pass."""
+    return str(tmp_path / "mirror.sqlite3")
+
+
+def test_build_and_find(path):
+    """Pass."""
+    rows = [device("id{}".format(i), "web{}".format(i)) for i in range(5)]
+    fetch = Fetch(rows)
+    copy = mirror.Mirror(fetch=fetch, refresh=0, path=path, chunk_size=2)
+    copy.build("devices")
+
+    assert copy.find(api_type="devices", field="hostname", value="web3") == [rows[3]]
+    assert copy.find(api_type="devices", field="hostname", value="WEB3") == [rows[3]]
+    assert copy.find(api_type="devices", field="hostname", value="nope") == []
+    assert copy.info(api_type="devices", fields=FIELDS)["count"] == 5
+    assert copy.info(api_type="devices", fields={"generic": ["other"]}) is None
+    assert copy.stats["hits"] == 2
+    assert copy.stats["misses"] == 1
+
+
+def test_rebuild_replaces_copy(path):
+    """Pass."""
+    copy = mirror.Mirror(fetch=Fetch([device("a", "old")]), refresh=0, path=path)
+    copy.build("devices")
+    copy.fetch = Fetch([device("b", "new")])
+    copy.build("devices")
+
+    assert copy.find(api_type="devices", field="hostname", value="old") == []
+    assert copy.find(api_type="devices", field="hostname", value="new")
+    assert copy.info(api_type="devices", fields=FIELDS)["count"] == 1
+
+
+def test_failed_build_keeps_old_copy(path):
+    """Rows already inserted in chunks are rolled back with the rest."""
+    rows = [device("id{}".format(i), "web{}".format(i)) for i in range(5)]
+    copy = mirror.Mirror(fetch=Fetch(rows[:1]), refresh=0, path=path, chunk_size=2)
+    copy.build("devices")
+
+    copy.fetch = Fetch(rows[1:], fail_after=3)
+    with pytest.raises(ValueError):
+        copy.build("devices")
+
+    assert copy.fetch.taken == 3
+    assert copy.find(api_type="devices", field="hostname", value="web0") == [rows[0]]
+    assert copy.find(api_type="devices", field="hostname", value="web1") == []
+    assert copy.info(api_type="devices", fields=FIELDS)["count"] == 1
+
+
+def test_indexed_values():
+    """Pass."""
+    row = {"specific_data.data": {"username": ["bob", None], "mail": ["b@x"]}}
+    pairs = mirror.indexed_values(row, ["username", "mail"])
+    assert pairs == {("username", "bob"), ("mail", "b@x")}
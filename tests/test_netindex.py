@@ -0,0 +1,101 @@
+"""Tests for axonbot_slack.netindex."""
+import pytest
+
+from axonbot_slack import netindex
+
+
+def device(axon_id, *interfaces):
+    """Pass."""
+    return {
+        "internal_axon_id": axon_id,
+        "specific_data.data.network_interfaces": [
+            {"ips": ips, "mac": macs} for ips, macs in interfaces
+        ],
+    }
+
+
+ROWS = [
+    device("a", (["10.0.0.1", "fe80::1"], ["00:11:22:33:44:55"])),
+    device("b", (["10.0.0.200"], ["00-11-22-33-44-66"]), (["10.0.1.5"], [])),
+    device("c", (["10.0.0.1", "not an ip"], ["bad mac"])),
+    device("d", (["192.168.1.1"], None)),
+]
+
+
+@pytest.fixture
+def index():
+    """Pass."""
+    index = netindex.NetIndex(fetch=lambda: iter(ROWS), refresh=0)
+    index.build()
+    return index
+
+
+def test_not_ready_until_built():
+    """Pass."""
+    index = netindex.NetIndex(fetch=lambda: iter(ROWS), refresh=0)
+    assert not index.ready
+    assert index.size == {"devices": 0, "ips": 0, "macs": 0}
+    index.build()
+    assert index.ready
+    assert index.size == {"devices": 4, "ips": 5, "macs": 2}
+
+
+@pytest.mark.parametrize(
+    "value, ids",
+    [
+        ("10.0.0.1", ["a", "c"]),
+        (" 10.0.0.200 ", ["b"]),
+        ("FE80:0::1", ["a"]),
+        ("10.0.0.2", []),
+        ("not an ip", []),
+    ],
+)
+def test_find_ip(index, value, ids):
+    """Pass."""
+    assert index.find_ip(value) == ids
+
+
+@pytest.mark.parametrize(
+    "value, ids",
+    [
+        ("00:11:22:33:44:55", ["a"]),
+        ("0011.2233.4466", ["b"]),
+        ("00:11:22:33:44:77", []),
+        ("bad mac", []),
+    ],
+)
+def test_find_mac(index, value, ids):
+    """Pass."""
+    assert index.find_mac(value) == ids
+
+
+@pytest.mark.parametrize(
+    "value, ids",
+    [
+        ("10.0.0.0/24", ["a", "c", "b"]),
+        ("10.0.0.0/16", ["a", "c", "b"]),
+        ("10.0.0.128/25", ["b"]),
+        ("10.0.1.5/32", ["b"]),
+        ("10.0.0.5/24", ["a", "c", "b"]),
+        ("172.16.0.0/12", []),
+        ("fe80::/64", ["a"]),
+    ],
+)
+def test_find_subnet(index, value, ids):
+    """Matches come back in IP order, each device once."""
+    assert index.find_subnet(value) == ids
+
+
+def test_find_subnet_invalid(index):
+    """Pass."""
+    with pytest.raises(ValueError):
+        index.find_subnet("10.0.0.0/33")
+
+
+def test_rebuild_replaces_snapshot(index):
+    """Pass."""
+    index.fetch = lambda: iter(ROWS[:1])
+    index.build()
+    assert index.find_ip("10.0.0.1") == ["a"]
+    assert index.find_subnet("192.168.0.0/16") == []
+    assert index.stats["builds"] == 2
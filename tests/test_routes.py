@@ -0,0 +1,73 @@
+"""Tests for axonbot_slack.routes."""
+import pytest
+
+from axonbot_slack import routes
+
+
+@pytest.mark.parametrize(
+    "pattern, words",
+    [
+        (r"^get device hostname (?P<value>\S+)$", ("get", "device")),
+        (r"^get device (?P<what>\w+)", ("get", "device")),
+        (r"^echo", ()),
+        (r"^echo$", ("echo",)),
+        (r"^help$", ("help",)),
+        (r"^getting(?P<x>.*)", ()),
+        (r"^stats\s*$", ()),
+        (r"unwatch (?P<watch_id>\d+)$", ("unwatch",)),
+        (r"^(?:get|fetch) device", ()),
+    ],
+)
+def test_literal_words(pattern, words):
+    """Pass."""
+    assert routes.literal_words(pattern) == words
+
+
+class Plugin(object):
+    """Pass."""
+
+    def __init__(self):
+        """Pass."""
+        self.calls = []
+
+    @routes.route(regex=r"^get device hostname (?P<value>\S+)$")
+    def get_hostname(self, msg, value):
+        """Pass."""
+        self.calls.append(("hostname", value))
+
+    @routes.route(regex=r"^get device (?P<what>\w+)$")
+    def get_other(self, msg, what):
+        """Pass."""
+        self.calls.append(("other", what))
+
+    @routes.route(regex=r"^echo (?P<text>.*)$")
+    def echo(self, msg, text):
+        """Pass."""
+        self.calls.append(("echo", text))
+
+
+class Msg(object):
+    """Pass."""
+
+    def __init__(self, text):
+        """Pass."""
+        self.text = text
+
+
+def test_router_dispatch():
+    """Pass."""
+    plugin = Plugin()
+    router = routes.Router(plugin)
+
+    assert router.dispatch(Msg("get device hostname web1"))
+    assert router.dispatch(Msg("GET DEVICE count"))
+    assert router.dispatch(Msg("echo hi there"))
+    assert not router.dispatch(Msg("get user count"))
+
+    assert plugin.calls == [
+        ("hostname", "web1"),
+        ("other", "count"),
+        ("echo", "hi there"),
+    ]
+    assert router.stats["messages"] == 4
+    assert router.stats["unmatched"] == 1
@@ -0,0 +1,74 @@
+"""Tests for axonbot_slack.schedules."""
+import datetime
+
+import apscheduler.triggers.cron
+import pytest
+import pytz
+
+from axonbot_slack import schedules
+
+
+@pytest.fixture(autouse=True)
+def utc(monkeypatch):
+    """Build triggers in UTC, whatever the local zone of the host is."""
+    monkeypatch.setattr(apscheduler.triggers.cron, "get_localzone", lambda: pytz.utc)
+
+
+def localize(*args):
+    """Pass."""
+    return pytz.utc.localize(datetime.datetime(*args))
+
+
+@pytest.mark.parametrize(
+    "value, days",
+    [
+        ("*", "*"),
+        ("0", "sun"),
+        ("7", "sun"),
+        ("1-5", "mon,tue,wed,thu,fri"),
+        ("0,6", "sun,sat"),
+        ("*/2", "sun,tue,thu,sat"),
+        ("1-5/2", "mon,wed,fri"),
+        ("0,7", "sun"),
+        ("mon-fri", "mon-fri"),
+    ],
+)
+def test_cron_days(value, days):
+    """Pass."""
+    assert schedules.cron_days(value) == days
+
+
+@pytest.mark.parametrize("value", ["8", "5-1", "3-9"])
+def test_cron_days_invalid(value):
+    """Pass."""
+    with pytest.raises(ValueError):
+        schedules.cron_days(value)
+
+
+def test_cron_trigger():
+    """Pass."""
+    trigger = schedules.cron_trigger("30 9 * * 1-5")
+    start = localize(2019, 11, 1, 10, 0)
+    fire = trigger.get_next_fire_time(None, start)
+    # 2019-11-01 is a Friday, so the next run is on Monday
+    assert (fire.weekday(), fire.day, fire.hour, fire.minute) == (0, 4, 9, 30)
+
+
+@pytest.mark.parametrize("expr", ["* * * *", "* * * * * *", "61 * * * *"])
+def test_cron_trigger_invalid(expr):
+    """Pass."""
+    with pytest.raises(ValueError):
+        schedules.cron_trigger(expr)
+
+
+def test_last_run():
+    """Pass."""
+    trigger = schedules.cron_trigger("*/15 * * * *")
+    now = localize(2019, 11, 1, 10, 7, 42)
+
+    last = schedules.last_run(trigger=trigger, now=now, window=600)
+    assert last == localize(2019, 11, 1, 10, 0)
+
+    # nothing fired in the window, so the minute of now is used
+    last = schedules.last_run(trigger=trigger, now=now, window=60)
+    assert last == localize(2019, 11, 1, 10, 7)
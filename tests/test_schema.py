@@ -0,0 +1,83 @@
+"""Tests for axonbot_slack.schema."""
+import pytest
+
+from axonius_api_client.api import exceptions
+
+from axonbot_slack import schema
+
+KNOWN_FIELDS = {
+    "generic": [
+        {"name": "specific_data.data.hostname", "title": "Host Name"},
+        {"name": "specific_data.data.network_interfaces.ips", "title": "IPs"},
+        {"name": "specific_data.data.network_interfaces.mac", "title": "MAC"},
+        {"name": "specific_data.data.last_seen", "title": "Last Seen"},
+    ],
+    "specific": {
+        "aws_adapter": [
+            {
+                "name": "adapters_data.aws_adapter.aws_device_type",
+                "title": "AWS Device Type",
+            }
+        ],
+        "active_directory_adapter": [
+            {"name": "adapters_data.active_directory_adapter.ad_name"}
+        ],
+    },
+}
+
+
+@pytest.fixture
+def index():
+    """Pass."""
+    return schema.FieldIndex(known_fields=KNOWN_FIELDS)
+
+
+@pytest.mark.parametrize(
+    "name, adapter, found",
+    [
+        ("hostname", "generic", ("generic", "specific_data.data.hostname")),
+        (" HostName ", "GENERIC", ("generic", "specific_data.data.hostname")),
+        (
+            "specific_data.data.last_seen",
+            "generic",
+            ("generic", "specific_data.data.last_seen"),
+        ),
+        ("host name", "generic", ("generic", "specific_data.data.hostname")),
+        ("last_seen", "generic", ("generic", "specific_data.data.last_seen")),
+        ("ip", "generic", ("generic", "specific_data.data.network_interfaces.ips")),
+        ("labels", "generic", ("generic", "labels")),
+        (
+            "aws_device_type",
+            "aws",
+            ("aws_adapter", "adapters_data.aws_adapter.aws_device_type"),
+        ),
+        (
+            "AWS Device Type",
+            "aws_adapter",
+            ("aws_adapter", "adapters_data.aws_adapter.aws_device_type"),
+        ),
+    ],
+)
+def test_find_field(index, name, adapter, found):
+    """Pass."""
+    assert index.find_field(name=name, adapter=adapter) == found
+
+
+def test_find_adapter(index):
+    """Pass."""
+    assert index.find_adapter("Active_Directory") == "active_directory_adapter"
+    assert index.adapter_names == ["active_directory", "aws"]
+
+
+def test_unknown_adapter_suggests(index):
+    """Pass."""
+    with pytest.raises(exceptions.UnknownAdapterName) as exc:
+        index.find_adapter("awz")
+    assert "aws" in exc.value.suggestions
+
+
+def test_unknown_field_suggests(index):
+    """Pass."""
+    with pytest.raises(exceptions.UnknownFieldName) as exc:
+        index.find_field(name="hostnam", adapter="generic")
+    assert "hostname" in exc.value.suggestions
@@ -0,0 +1,88 @@
+"""Tests for axonbot_slack.sessions."""
+import axonius_api_client
+import pytest
+import requests
+
+from axonbot_slack import sessions
+
+
+class Response(object):
+    """Response with just a status code."""
+
+    def __init__(self, status_code):
+        """Pass."""
+        self.status_code = status_code
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Replace the sending of requests with answers popped from a list."""
+    sent = []
+
+    def send(self, **kwargs):
+        sent.append(kwargs["method"])
+        answer = self.answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return Response(answer)
+
+    monkeypatch.setattr(axonius_api_client.http.HttpClient, "__call__", send)
+    return sent
+
+
+def client(answers):
+    """Pass."""
+    reasons = []
+    http = sessions.ReauthHttpClient(
+        "https://axonius.example", reauth=lambda reason: reasons.append(reason)
+    )
+    http.answers = answers
+    return http, reasons
+
+
+def test_no_reauth_on_success(sent):
+    """Pass."""
+    http, reasons = client([200])
+    assert http(method="get", path="api/V1/devices").status_code == 200
+    assert sent == ["get"]
+    assert reasons == []
+
+
+@pytest.mark.parametrize("method", ["get", "post"])
+def test_reauth_and_retry_on_401(sent, method):
+    """Pass."""
+    http, reasons = client([401, 200])
+    assert http(method=method, path="api/V1/devices").status_code == 200
+    assert sent == [method, method]
+    assert reasons == ["401 response"]
+    assert http.retried == 1
+
+
+def test_get_retried_after_connection_error(sent):
+    """Pass."""
+    http, reasons = client([requests.exceptions.ConnectionError("reset"), 200])
+    assert http("api/V1/devices").status_code == 200
+    assert sent == ["get", "get"]
+    assert len(reasons) == 1
+
+
+def test_post_not_resent_after_connection_error(sent):
+    """Pass."""
+    http, reasons = client([requests.exceptions.ConnectionError("reset"), 200])
+    with pytest.raises(requests.exceptions.ConnectionError):
+        http(method="post", path="api/V1/devices/labels")
+    assert sent == ["post"]
+    assert reasons == []
+    assert http.retried == 0
+
+
+def test_requests_from_reauth_are_not_retried(sent):
+    """Pass."""
+    http, _ = client([403, 403, 200])
+
+    def reauth(reason):
+        assert http(method="post", path="api/login").status_code == 403
+
+    http.reauth = reauth
+    assert http(method="get", path="api/V1/devices").status_code == 200
+    assert sent == ["get", "post", "get"]
@@ -0,0 +1,161 @@
+"""Tests for axonbot_slack.storage."""
+import json
+import types
+
+import pytest
+
+from axonbot_slack import caches
+from axonbot_slack import storage
+
+
+class Clock(object):
+    """Clock that only moves when told to."""
+
+    def __init__(self):
+        """Pass."""
+        self.now = 1000.0
+
+    def __call__(self):
+        """Pass."""
+        return self.now
+
+
+def rows(count, prefix="id"):
+    """Pass."""
+    return [
+        {"internal_axon_id": "{}{}".format(prefix, i), "hostname": "x" * 200}
+        for i in range(count)
+    ]
+
+
+def ids(count, prefix="id"):
+    """Pass."""
+    return [x["internal_axon_id"] for x in rows(count, prefix)]
+
+
+class Backend(object):
+    """Builds one kind of thread cache and measures entries the way it does."""
+
+    def __init__(self, name, clock, path):
+        """Pass."""
+        self.name = name
+        self.clock = clock
+        self.path = path
+
+    def cache(self, maxsize, ttl=60):
+        """Pass."""
+        if self.name == "sqlite":
+            return storage.SqliteThreadCache(maxsize=maxsize, ttl=ttl, path=self.path)
+        return caches.ThreadCache(maxsize=maxsize, ttl=ttl, clock=self.clock)
+
+    def size(self, rows):
+        """Get the size of an entry for rows, with no request."""
+        if self.name == "sqlite":
+            return len(json.dumps(rows))
+        return caches.estimate_size(rows) + caches.estimate_size(None)
+
+    def trimmed_size(self, rows):
+        """Get the size of an entry for rows once trimmed to their IDs."""
+        trimmed = [x["internal_axon_id"] for x in rows]
+        if self.name == "sqlite":
+            return len(json.dumps(trimmed))
+        return caches.estimate_size(tuple(trimmed)) + caches.estimate_size(None)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, monkeypatch, tmp_path):
+    """Pass."""
+    clock = Clock()
+    monkeypatch.setattr(storage, "time", types.SimpleNamespace(time=clock))
+    return Backend(
+        name=request.param, clock=clock, path=str(tmp_path / "threads.sqlite3")
+    )
+
+
+def test_thread_cache_get_and_expire(backend):
+    """Pass."""
+    cache = backend.cache(maxsize=10 ** 6)
+    cache.put(key="1.0", api_type="devices", rows=rows(2), request={"a": 1})
+
+    entry = cache.get("1.0")
+    assert entry["api_type"] == "devices"
+    assert entry["rows"] == rows(2)
+    assert entry["request"] == {"a": 1}
+    assert not entry["trimmed"]
+
+    backend.clock.now += 60
+    assert not cache.has("1.0")
+    assert cache.get("1.0") is None
+    assert cache.stats["expirations"] == 1
+    assert len(cache) == 0
+
+
+def test_thread_cache_row_count(backend):
+    """Pass."""
+    cache = backend.cache(maxsize=10 ** 6)
+    cache.put(key="1.0", api_type="devices", rows=rows(2))
+    cache.put(key="2.0", api_type="devices", rows=rows(2), row_count=50)
+    assert cache.get("1.0")["row_count"] == 2
+    assert cache.get("2.0")["row_count"] == 50
+
+
+def test_thread_cache_trims_to_ids_before_evicting(backend):
+    """Pass."""
+    cache = backend.cache(maxsize=int(backend.size(rows(50)) * 1.5))
+    cache.put(key="1.0", api_type="devices", rows=rows(50, "a"), row_count=80)
+    backend.clock.now += 1
+    cache.put(key="2.0", api_type="devices", rows=rows(50, "b"))
+
+    old = cache.get("1.0")
+    assert old["trimmed"]
+    assert old["rows"] == [{"internal_axon_id": x} for x in ids(50, "a")]
+    assert old["row_count"] == 80
+    assert not cache.get("2.0")["trimmed"]
+    assert cache.stats["trims"] == 1
+    assert cache.currsize <= cache.maxsize
+
+
+def test_thread_cache_evicts_oldest_when_trimmed_is_too_big(backend):
+    """Pass."""
+    cache = backend.cache(maxsize=backend.trimmed_size(rows(50)) * 3 // 2)
+    cache.put(key="1.0", api_type="devices", rows=rows(50, "a"))
+    backend.clock.now += 1
+    cache.put(key="2.0", api_type="devices", rows=rows(50, "b"))
+
+    assert cache.stats["evictions"] == 1
+    assert cache.get("1.0") is None
+    assert cache.get("2.0")["rows"][-1] == {"internal_axon_id": "b49"}
+    assert cache.currsize <= cache.maxsize
+
+
+def test_sqlite_thread_cache_is_shared(tmp_path):
+    """Pass."""
+    path = str(tmp_path / "threads.sqlite3")
+    one = storage.SqliteThreadCache(maxsize=10 ** 6, ttl=60, path=path)
+    two = storage.SqliteThreadCache(maxsize=10 ** 6, ttl=60, path=path)
+    one.put(key="1.0", api_type="users", rows=rows(1))
+    assert two.get("1.0")["rows"] == rows(1)
+
+
+def test_sqlite_storage(monkeypatch, tmp_path):
+    """Pass."""
+    clock = Clock()
+    monkeypatch.setattr(storage, "time", types.SimpleNamespace(time=clock))
+    path = str(tmp_path / "machine.sqlite3")
+    store = storage.SqliteStorage(settings={"AX_STORAGE_PATH": path})
+
+    store.set("a", b"1")
+    store.set("b", b"2", expires=10)
+    assert store.get("a") == b"1"
+    assert store.has("b")
+    assert store.get("c") is None
+    assert not store.has("c")
+
+    clock.now += 10
+    assert store.get("b") is None
+    assert store.has("a")
+
+    store.delete("a")
+    assert not store.has("a")
+    assert store.size() > 0
+    assert storage.SqliteStorage(settings={"AX_STORAGE_PATH": path}).get("a") is None
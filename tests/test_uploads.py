@@ -0,0 +1,65 @@
+"""Tests for axonbot_slack.uploads."""
+import pytest
+
+from axonbot_slack import uploads
+
+
+class Clock(object):
+    """Clock that only moves when told to."""
+
+    def __init__(self):
+        """Pass."""
+        self.now = 0.0
+
+    def __call__(self):
+        """Pass."""
+        return self.now
+
+
+def test_token_bucket_burst_then_rate():
+    """Pass."""
+    clock = Clock()
+    bucket = uploads.TokenBucket(rate=2.0, burst=3, clock=clock)
+
+    assert [bucket.take() for _ in range(3)] == [0, 0, 0]
+    assert bucket.take() == pytest.approx(0.5)
+
+    clock.now = 0.5
+    assert bucket.take() == 0
+    assert bucket.take() == pytest.approx(0.5)
+
+
+def test_token_bucket_refill_stops_at_burst():
+    """Pass."""
+    clock = Clock()
+    bucket = uploads.TokenBucket(rate=1.0, burst=2, clock=clock)
+    bucket.take()
+    bucket.take()
+
+    clock.now = 100
+    assert [bucket.take() for _ in range(2)] == [0, 0]
+    assert bucket.take() == pytest.approx(1.0)
+
+
+def test_token_bucket_empty():
+    """Pass."""
+    clock = Clock()
+    bucket = uploads.TokenBucket(rate=0.5, burst=5, clock=clock)
+    bucket.empty()
+    assert bucket.take() == pytest.approx(2.0)
+
+
+@pytest.mark.parametrize(
+    "headers, seconds",
+    [
+        ({"Retry-After": "30"}, 30),
+        ({"retry-after": "7"}, 7),
+        ({"RETRY-AFTER": "1.5"}, 1.5),
+        ({"Retry-After": "soon"}, uploads.RETRY_AFTER),
+        ({}, uploads.RETRY_AFTER),
+        (None, uploads.RETRY_AFTER),
+    ],
+)
+def test_retry_after(headers, seconds):
+    """Pass."""
+    assert uploads.retry_after(headers) == seconds
@@ -0,0 +1,103 @@
+"""Tests for axonbot_slack.watches."""
+import pytest
+
+from axonbot_slack import watches
+
+
+def row(axon_id, hostname):
+    """Pass."""
+    return {"internal_axon_id": axon_id, "hostname": [hostname]}
+
+
+def test_diff_rows_first_poll():
+    """Pass."""
+    hashes, added, changed, removed = watches.diff_rows(
+        rows=iter([row("a", "h1"), row("b", "h2")]), hashes=None
+    )
+    assert sorted(hashes) == ["a", "b"]
+    assert (added, changed, removed) == ([], [], [])
+
+
+def test_diff_rows_empty_previous_poll():
+    """Pass."""
+    _, added, _, _ = watches.diff_rows(rows=[row("a", "h1")], hashes={})
+    assert added == [row("a", "h1")]
+
+
+def test_diff_rows_changes():
+    """Pass."""
+    hashes, _, _, _ = watches.diff_rows(
+        rows=[row("a", "h1"), row("b", "h2"), row("c", "h3")], hashes=None
+    )
+    new_hashes, added, changed, removed = watches.diff_rows(
+        rows=iter([row("a", "h1"), row("b", "new"), row("d", "h4")]), hashes=hashes
+    )
+
+    assert added == [row("d", "h4")]
+    assert changed == [row("b", "new")]
+    assert removed == ["c"]
+    assert new_hashes["a"] == hashes["a"]
+    assert new_hashes["b"] != hashes["b"]
+
+
+def test_row_hash_ignores_key_order():
+    """Pass."""
+    assert watches.row_hash({"a": 1, "b": 2}) == watches.row_hash({"b": 2, "a": 1})
+
+
+@pytest.mark.parametrize(
+    "value, seconds",
+    [("90", 90), ("90s", 90), ("15m", 900), ("2H", 7200), (" 1d ", 86400)],
+)
+def test_parse_interval(value, seconds):
+    """Pass."""
+    assert watches.parse_interval(value) == seconds
+
+
+@pytest.mark.parametrize("value", ["", "m", "1w", "1.5h", "-5m"])
+def test_parse_interval_invalid(value):
+    """Pass."""
+    with pytest.raises(ValueError):
+        watches.parse_interval(value)
+
+
+def test_failed_polls_back_off_then_stop():
+    """Pass."""
+    failed = []
+
+    def poll(watch):
+        raise ValueError("boom")
+
+    scheduler = watches.Scheduler(
+        poll=poll,
+        failed=lambda *args: failed.append(args),
+        max_failures=3,
+        clock=lambda: 100.0,
+    )
+    watch = watches.Watch(
+        watch_id=1, api_type="devices", name="q", interval=60, msg=None, fmt="json"
+    )
+    scheduler.watches[watch.id] = watch
+
+    next_runs = []
+    for _ in range(3):
+        scheduler._poll(watch)
+        next_runs.append(watch.next_run)
+
+    assert next_runs == [220.0, 340.0, 580.0]
+    assert [x[2] for x in failed] == [120, 240, None]
+    assert all(isinstance(x[1], ValueError) for x in failed)
+    assert watch.id not in scheduler.watches
+    assert watch.removed
+
+
+def test_poll_that_works_resets_failures():
+    """Pass."""
+    scheduler = watches.Scheduler(poll=lambda watch: None, clock=lambda: 100.0)
+    watch = watches.Watch(
+        watch_id=1, api_type="devices", name="q", interval=60, msg=None, fmt="json"
+    )
+    watch.failures = 2
+    scheduler._poll(watch)
+    assert watch.failures == 0
+    assert watch.next_run == 160.0